@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+answer_cache.py - Semantic cache for Admiral Rickover's answers
+
+Calling Gemini is the slowest and most expensive part of every question. When a
+new question means the same thing as one we already answered (cosine similarity
+of the query vectors above a threshold), we hand back the stored answer instead.
+
+Answers live in a small SQLite file so they survive restarts. Each entry keeps
+the chunk ids the answer was grounded on and the knowledge base version, and the
+least recently used entries are dropped once the cache is full.
+
+Every report_every lookups the hit, miss and eviction counts are printed to the
+log, so the threshold and size can be tuned from real traffic.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+
+class AnswerCache:
+    """Finds previously answered questions by query-vector similarity"""
+
+    def __init__(self, path, max_entries=5000, threshold=0.95, version=None, report_every=100):
+        self.path = path
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.version = version
+        self.report_every = report_every
+
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                question TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                answer TEXT NOT NULL,
+                chunk_ids TEXT NOT NULL,
+                kb_version TEXT,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.connection.commit()
+
+        self._load()
+
+    def _load(self):
+        """Read every stored vector into one matrix for fast lookups"""
+        rows = self.connection.execute("SELECT id, vector FROM answers ORDER BY id").fetchall()
+        self.row_ids = [row_id for row_id, _ in rows]
+        if rows:
+            self.vectors = np.vstack([np.frombuffer(vector, dtype=np.float32) for _, vector in rows])
+        else:
+            self.vectors = None
+
+    def check_version(self, version):
+        """Forget answers grounded on a different knowledge base version"""
+        with self.lock:
+            if version == self.version:
+                return
+            self.version = version
+            self.connection.execute("DELETE FROM answers WHERE kb_version IS NOT ?", (version,))
+            self.connection.commit()
+            self._load()
+
+    def lookup(self, query_vector):
+        """Return the closest stored answer if it is similar enough, otherwise None"""
+        query_vector = _unit_vector(query_vector)
+        found = None
+
+        with self.lock:
+            if self.vectors is not None:
+                similarities = self.vectors @ query_vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    found = self._use(self.row_ids[best], float(similarities[best]))
+
+            if found is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            lookups = self.hits + self.misses
+
+        if self.report_every and lookups % self.report_every == 0:
+            self.print_stats()
+        return found
+
+    def _use(self, row_id, similarity):
+        """Mark a stored answer as used and return it (called with the lock held)"""
+        self.connection.execute("UPDATE answers SET last_used = ?, hits = hits + 1 WHERE id = ?",
+                                (time.time(), row_id))
+        self.connection.commit()
+        question, answer, chunk_ids = self.connection.execute(
+            "SELECT question, answer, chunk_ids FROM answers WHERE id = ?", (row_id,)).fetchone()
+
+        return {
+            "question": question,
+            "answer": answer,
+            "chunk_ids": json.loads(chunk_ids),
+            "similarity": similarity,
+        }
+
+    def add(self, question, query_vector, answer, chunk_ids):
+        """Store a fresh answer together with the chunks it was based on"""
+        query_vector = _unit_vector(query_vector)
+        now = time.time()
+
+        with self.lock:
+            cursor = self.connection.execute(
+                "INSERT INTO answers (question, vector, answer, chunk_ids, kb_version, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (question, query_vector.tobytes(), answer, json.dumps(list(chunk_ids)), self.version, now, now))
+
+            self.row_ids.append(cursor.lastrowid)
+            if self.vectors is None:
+                self.vectors = query_vector[np.newaxis, :]
+            else:
+                self.vectors = np.vstack([self.vectors, query_vector])
+
+            self._evict()
+            self.connection.commit()
+
+    def _evict(self):
+        """Drop the least recently used answers until we are back under max_entries"""
+        overflow = len(self.row_ids) - self.max_entries
+        if overflow <= 0:
+            return
+
+        oldest = [row_id for (row_id,) in self.connection.execute(
+            "SELECT id FROM answers ORDER BY last_used LIMIT ?", (overflow,))]
+        self.connection.executemany("DELETE FROM answers WHERE id = ?", [(row_id,) for row_id in oldest])
+
+        removed = set(oldest)
+        keep = [i for i, row_id in enumerate(self.row_ids) if row_id not in removed]
+        self.row_ids = [self.row_ids[i] for i in keep]
+        self.vectors = self.vectors[keep] if keep else None
+        self.evictions += len(oldest)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.row_ids),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+    def print_stats(self):
+        stats = self.stats()
+        print(f"💾 Answer cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"(hit rate {stats['hit_rate']:.1%}, threshold {stats['threshold']}), "
+              f"{stats['entries']}/{stats['max_entries']} entries, {stats['evictions']} evicted")
+
+
+def _unit_vector(vector):
+    vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
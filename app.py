@@ -5,36 +5,95 @@ import streamlit as st
 import os
 import json
 import base64
-import numpy as np
-import pickle
+import time
+import asyncio
 import torch
-import google.generativeai as genai
 from google.cloud import storage
 from sentence_transformers import SentenceTransformer
 from PIL import Image
 
+from knowledge_base import download_knowledge_base, load_knowledge_base, resolve_knowledge_base_prefix
+from retrieval import RetrievalEngine, drop_duplicate_results, load_search_index
+from query_batcher import QueryBatcher
+from query_cache import QueryCache
+from answer_cache import AnswerCache
+from gemini_streaming import GeminiClient, stream_generated_text
+
+
+# Where the knowledge base lives in Cloud Storage and where we keep it on local disk
+# (no prefix = the folder the last build_features.py --upload published as the latest)
+KNOWLEDGE_BASE_PREFIX = os.environ.get("KNOWLEDGE_BASE_PREFIX", "")
+KNOWLEDGE_BASE_CACHE = os.environ.get("KNOWLEDGE_BASE_CACHE", "/tmp/nuclear_knowledge_base")
+
+# Approximate search knobs: which index ("ivf", "quantized", "exact", "low_memory", empty = what the
+# build chose), groups scanned per query (IVF), prefilter size and re-rank shortlist (quantized),
+# and corpus size below which we stay exact. Unset knobs use the settings the build measured.
+SEARCH_INDEX_TYPE = os.environ.get("SEARCH_INDEX_TYPE", "")
+ANN_NPROBE = int(os.environ["ANN_NPROBE"]) if os.environ.get("ANN_NPROBE") else None
+QUANTIZED_HAMMING_CANDIDATES = (int(os.environ["QUANTIZED_HAMMING_CANDIDATES"])
+                                if os.environ.get("QUANTIZED_HAMMING_CANDIDATES") else None)
+QUANTIZED_RERANK_FACTOR = (int(os.environ["QUANTIZED_RERANK_FACTOR"])
+                           if os.environ.get("QUANTIZED_RERANK_FACTOR") else None)
+ANN_EXACT_THRESHOLD = int(os.environ.get("ANN_EXACT_THRESHOLD", "20000"))
+
+# Keep the corpus in half precision on the GPU (halves device memory, tiny score differences)
+RETRIEVAL_FP16 = os.environ.get("RETRIEVAL_FP16", "0") == "1"
+
+# Fetch this many times top_k so there is room left after collapsing duplicate chunks
+DUPLICATE_OVERFETCH = 2
+
+# Concurrent questions are encoded together: wait at most this long / this many queries
+QUERY_BATCH_WAIT_MS = float(os.environ.get("QUERY_BATCH_WAIT_MS", "5"))
+QUERY_BATCH_MAX_SIZE = int(os.environ.get("QUERY_BATCH_MAX_SIZE", "32"))
+
+# Repeated questions skip encoding and searching: how many to remember and for how long
+QUERY_CACHE_SIZE = int(os.environ.get("QUERY_CACHE_SIZE", "2048"))
+QUERY_CACHE_TTL_SECONDS = float(os.environ.get("QUERY_CACHE_TTL_SECONDS", "3600"))
+
+# The caches print their hit/miss counters to the log every this many lookups (0 = never)
+CACHE_REPORT_EVERY = int(os.environ.get("CACHE_REPORT_EVERY", "100"))
+
+# Near-identical questions get the stored answer instead of a new Gemini call
+ANSWER_CACHE_PATH = os.environ.get("ANSWER_CACHE_PATH", "data/answer_cache.sqlite")
+ANSWER_CACHE_SIZE = int(os.environ.get("ANSWER_CACHE_SIZE", "5000"))
+ANSWER_CACHE_THRESHOLD = float(os.environ.get("ANSWER_CACHE_THRESHOLD", "0.95"))
+
+# Answer from a local fake model instead of Gemini (for testing the chat offline)
+USE_FAKE_LLM = os.environ.get("RICKOVER_FAKE_LLM", "0") == "1"
+
 
 @st.cache_resource
 def load_precomputed_embeddings():
-    """Load pre-computed embeddings from Cloud Storage"""
+    """Load pre-computed embeddings (memory-mapped) from local disk or Cloud Storage"""
     print("⚡ Loading pre-computed nuclear embeddings...")
 
     try:
-        storage_client = storage.Client(project="mylittlerickover-prod")
-        bucket = storage_client.bucket("mylittlerickover-prod-nuclear-vertex-final")
+        # A local folder wins if one is configured (handy for development)
+        kb_dir = os.environ.get("KNOWLEDGE_BASE_DIR")
+
+        if not kb_dir:
+            storage_client = storage.Client(project="mylittlerickover-prod")
+            bucket = storage_client.bucket("mylittlerickover-prod-nuclear-vertex-final")
 
-        # Use the specific pre-computed embeddings file
-        blob_name = "nuclear_embeddings_precomputed_20250802_194715.pkl"
-        blob = bucket.blob(blob_name)
+            prefix = resolve_knowledge_base_prefix(bucket, KNOWLEDGE_BASE_PREFIX)
+            print(f"📁 Loading: {prefix}")
 
-        print(f"📁 Loading: {blob_name}")
+            # Only downloads the first time, after that every replica maps the same files
+            kb_dir = download_knowledge_base(bucket, prefix, os.path.join(KNOWLEDGE_BASE_CACHE, prefix))
 
-        # Download and deserialize
-        pickled_data = blob.download_as_bytes()
-        knowledge_base = pickle.loads(pickled_data)
+        knowledge_base = load_knowledge_base(kb_dir)
+        knowledge_base['search_index'] = load_search_index(
+            knowledge_base,
+            index_type=SEARCH_INDEX_TYPE,
+            exact_threshold=ANN_EXACT_THRESHOLD,
+            nprobe=ANN_NPROBE,
+            hamming_candidates=QUANTIZED_HAMMING_CANDIDATES,
+            rerank_factor=QUANTIZED_RERANK_FACTOR
+        )
 
         print(f"✅ Loaded {knowledge_base['num_documents']} pre-computed embeddings")
         print(f"📊 Embedding dimensions: {knowledge_base['embedding_dim']}")
+        print(f"🔎 Search index: {knowledge_base['search_index'].index_type}")
 
         return knowledge_base
 
@@ -54,24 +113,76 @@ def load_embedding_model():
     return model, device
 
 
-def search_nuclear_corpus(query, knowledge_base, query_model, top_k=5):
-    """Ultra-fast vector search using pre-computed embeddings"""
+@st.cache_resource
+def load_query_batcher(_model):
+    """One shared micro-batcher so all sessions encode their questions together"""
+    return QueryBatcher(_model, max_batch_size=QUERY_BATCH_MAX_SIZE, max_wait_ms=QUERY_BATCH_WAIT_MS)
+
+
+@st.cache_resource
+def load_retrieval_engine(_knowledge_base, device):
+    """Create the search engine once so the corpus is uploaded to the device only one time"""
+    engine = RetrievalEngine(
+        _knowledge_base['embeddings'],
+        device=device,
+        use_fp16=RETRIEVAL_FP16 and device == 'cuda',
+        search_index=_knowledge_base.get('search_index')
+    )
+    print(f"🎯 Retrieval engine ready ({engine.mode})")
+    return engine
+
+
+@st.cache_resource
+def load_query_cache():
+    """One cache of recent questions shared by every session"""
+    return QueryCache(max_entries=QUERY_CACHE_SIZE, ttl_seconds=QUERY_CACHE_TTL_SECONDS,
+                      report_every=CACHE_REPORT_EVERY)
+
+
+@st.cache_resource
+def load_answer_cache():
+    """Persistent cache of Admiral Rickover's answers shared by every session"""
+    return AnswerCache(ANSWER_CACHE_PATH, max_entries=ANSWER_CACHE_SIZE, threshold=ANSWER_CACHE_THRESHOLD,
+                       report_every=CACHE_REPORT_EVERY)
+
+
+def knowledge_base_version(knowledge_base):
+    """Version string of the loaded knowledge base (the folder path if the manifest has none)"""
+    return knowledge_base['manifest'].get('version', knowledge_base['path'])
+
+
+def search_nuclear_corpus(query, knowledge_base, query_model, retrieval_engine, query_cache=None, top_k=5):
+    """Ultra-fast vector search using pre-computed embeddings
 
-    # Encode query (only step that needs computation)
-    query_embedding = query_model.encode([query], convert_to_tensor=True)
+    Returns the formatted context plus the query vector and the chunk ids that were used.
+    """
 
-    if torch.cuda.is_available():
-        # GPU-accelerated similarity computation
-        embeddings_tensor = torch.from_numpy(knowledge_base['embeddings']).cuda()
-        similarities = torch.mm(embeddings_tensor, query_embedding.T).flatten()
-        top_indices = torch.topk(similarities, top_k).indices.cpu().numpy()
-        similarity_scores = similarities[top_indices].cpu().numpy()
+    cached = None
+    if query_cache is not None:
+        # A new knowledge base means old results point at the wrong chunks
+        query_cache.check_version(knowledge_base_version(knowledge_base))
+        cached = query_cache.get(query, top_k)
+
+    if cached:
+        # Seen this question recently, reuse the vector and the ranking
+        query_vector = cached['query_vector']
+        top_indices = cached['indices']
+        similarity_scores = cached['scores']
     else:
-        # CPU fallback
-        query_np = query_embedding.cpu().numpy()
-        similarities = np.dot(knowledge_base['embeddings'], query_np.T).flatten()
-        top_indices = np.argsort(similarities)[-top_k:][::-1]
-        similarity_scores = similarities[top_indices]
+        # Encode query (only step that needs computation)
+        query_embedding = query_model.encode([query])
+
+        # Similarity + top-k against the corpus the engine already holds
+        found_indices, found_scores = retrieval_engine.search(query_embedding, top_k * DUPLICATE_OVERFETCH)
+        found = found_indices[0] >= 0
+
+        # Same text showing up several times would waste result slots and prompt tokens
+        top_indices, similarity_scores = drop_duplicate_results(
+            found_indices[0][found], found_scores[0][found], knowledge_base['documents'].content_hash, top_k)
+        query_vector = query_embedding[0]
+
+        if query_cache is not None:
+            query_cache.put(query, top_k, query_vector, top_indices, similarity_scores)
 
     # Format results for Admiral Rickover
     context_parts = [f"NUCLEAR CORPUS SEARCH RESULTS for: \"{query}\"\n"]
@@ -86,7 +197,11 @@ def search_nuclear_corpus(query, knowledge_base, query_model, top_k=5):
         context_parts.append(f"Content: {doc['content'][:800]}...")
         context_parts.append("")
 
-    return "\n".join(context_parts)
+    search_details = {
+        'query_vector': query_vector,
+        'chunk_ids': [knowledge_base['documents'].chunk_id(idx) for idx in top_indices],
+    }
+    return "\n".join(context_parts), search_details
 
 
 def load_atom_image():
@@ -224,6 +339,10 @@ def show_title():
 def get_google_api_key():
     """Get the Google API key so we can use the AI"""
 
+    # The offline fake model does not need a key
+    if USE_FAKE_LLM:
+        return "offline-test"
+
     # First, try to get the API key from environment variables
     api_key = os.environ.get("GOOGLE_API_KEY")
 
@@ -240,15 +359,61 @@ def get_google_api_key():
     return api_key
 
 
-def ask_rickover_with_rag(api_key, user_question, knowledge_base, query_model):
-    """Ask Admiral Rickover a question using RAG (Retrieval-Augmented Generation)"""
+@st.cache_resource
+def load_gemini_client(api_key):
+    """One Gemini client (configured API + model handle) reused by every chat turn"""
+    return GeminiClient(api_key, model_name='gemini-1.5-flash', fake=USE_FAKE_LLM)
+
+
+async def run_stage(stage_name, timings, function, *args):
+    """Run a blocking step in a worker thread and record how long it took"""
+    stage_start = time.perf_counter()
+    result = await asyncio.to_thread(function, *args)
+    timings[stage_name] = time.perf_counter() - stage_start
+    return result
+
+
+async def prepare_rickover_request(user_question, knowledge_base, query_model, retrieval_engine, query_cache,
+                                   gemini_client, timings):
+    """Search the corpus and get the Gemini model ready at the same time"""
+    search_result, model = await asyncio.gather(
+        run_stage('retrieval', timings, search_nuclear_corpus, user_question, knowledge_base, query_model,
+                  retrieval_engine, query_cache),
+        run_stage('model_setup', timings, gemini_client.get_model)
+    )
+    return search_result, model
 
-    try:
-        # Step 1: Search the nuclear corpus for relevant information
-        nuclear_context = search_nuclear_corpus(user_question, knowledge_base, query_model)
 
-        # Step 2: Set up the Google AI with our API key
-        genai.configure(api_key=api_key)
+def print_stage_timings(timings):
+    """One log line with every stage of a chat turn"""
+    stages = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in timings.items())
+    print(f"⏱️ Chat turn: {stages}")
+
+
+def generate_rickover_answer(gemini_client, user_question, knowledge_base, query_model, retrieval_engine,
+                             query_cache=None, answer_cache=None, timings=None):
+    """Ask Admiral Rickover a question using RAG, yielding the answer piece by piece as Gemini writes it"""
+
+    if timings is None:
+        timings = {}
+    request_start = time.perf_counter()
+
+    try:
+        # Step 1 + 2: Search the nuclear corpus while the Gemini model gets ready
+        (nuclear_context, search_details), model = asyncio.run(prepare_rickover_request(
+            user_question, knowledge_base, query_model, retrieval_engine, query_cache, gemini_client, timings))
+        timings['prepare'] = time.perf_counter() - request_start
+
+        # Already answered something that means the same thing? Skip Gemini entirely
+        if answer_cache is not None:
+            answer_cache.check_version(knowledge_base_version(knowledge_base))
+            cached_answer = answer_cache.lookup(search_details['query_vector'])
+            if cached_answer:
+                print(f"💾 Answer cache hit ({cached_answer['similarity']:.3f}): {cached_answer['question']}")
+                yield cached_answer['answer']
+                timings['end_to_end'] = time.perf_counter() - request_start
+                print_stage_timings(timings)
+                return
 
         # Step 3: Tell the AI how to act like Admiral Rickover with nuclear context
         rickover_personality = """
@@ -280,19 +445,34 @@ Instructions:
 - Always emphasize nuclear safety and procedural compliance
 """
 
-        # Step 5: Use Google's Gemini AI model
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        # Step 5: Send our enhanced prompt and pass the answer on as it streams in
+        answer_parts = []
+        for text in stream_generated_text(model, rickover_personality + "\n\n" + full_prompt, timings):
+            if not answer_parts:
+                text = text.lstrip()
+            answer_parts.append(text)
+            yield text
 
-        # Step 6: Send our enhanced prompt and get a response
-        response = model.generate_content(rickover_personality + "\n\n" + full_prompt)
+        # Step 6: Remember the answer (and what it was based on)
+        answer = "".join(answer_parts).strip()
+        if answer_cache is not None and answer and not USE_FAKE_LLM:
+            answer_cache.add(user_question, search_details['query_vector'], answer, search_details['chunk_ids'])
 
-        # Step 7: Return the AI's answer
-        answer = response.text.strip()
-        return answer
+        timings['end_to_end'] = time.perf_counter() - request_start
+        print_stage_timings(timings)
 
     except Exception as error:
         # If something goes wrong, return an error message
-        return f"Error generating response: {error}"
+        yield f"Error generating response: {error}"
+
+
+def ask_rickover_with_rag(api_key, user_question, knowledge_base, query_model, retrieval_engine,
+                          query_cache=None, answer_cache=None):
+    """Ask Admiral Rickover a question using RAG (Retrieval-Augmented Generation)"""
+    gemini_client = load_gemini_client(api_key)
+    answer = "".join(generate_rickover_answer(gemini_client, user_question, knowledge_base, query_model,
+                                              retrieval_engine, query_cache, answer_cache))
+    return answer.strip()
 
 
 def main():
@@ -307,15 +487,20 @@ def main():
     # Load Admiral Rickover's picture for the chat avatar
     rickover_picture = load_rickover_picture()
 
-    # Get the Google API key
+    # Get the Google API key and the Gemini client we keep reusing
     api_key = get_google_api_key()
+    gemini_client = load_gemini_client(api_key)
 
     # Load precomputed embeddings and query model
     with st.spinner("⚡ Loading ultra-fast nuclear knowledge base..."):
         knowledge_base = load_precomputed_embeddings()
-        query_model, device = load_embedding_model()
+        embedding_model, device = load_embedding_model()
+        query_model = load_query_batcher(embedding_model)
+        query_cache = load_query_cache()
+        answer_cache = load_answer_cache()
 
     if knowledge_base:
+        retrieval_engine = load_retrieval_engine(knowledge_base, device)
         st.success(f"🤖 RAG System Ready: {knowledge_base['num_documents']} precomputed embeddings loaded")
     else:
         st.error("❌ Failed to load precomputed embeddings")
@@ -378,24 +563,31 @@ Go ahead and ask your question-ensure it is an intelligent one!
 
         # Generate Admiral Rickover's response using RAG
         with st.chat_message("assistant", avatar=rickover_picture):
-            # Show a spinner while we're getting the response
-            with st.spinner("Admiral Rickover is consulting the nuclear knowledge base..."):
-
-                try:
-                    # Get the AI's response with RAG
-                    answer = ask_rickover_with_rag(api_key, user_question, knowledge_base, query_model)
-
-                    # Show the answer
-                    st.write(answer)
-
-                    # Add to chat history
-                    st.session_state.messages.append({"role": "assistant", "content": answer})
-
-                except Exception as error:
-                    # If something goes wrong, show an error
-                    error_message = f"⚠️ Error: {error}"
-                    st.error(error_message)
-                    st.session_state.messages.append({"role": "assistant", "content": error_message})
+            # Show a waiting note until the first words arrive, then grow the answer in place
+            answer_placeholder = st.empty()
+            answer_placeholder.markdown("*Admiral Rickover is consulting the nuclear knowledge base...*")
+
+            try:
+                # Get the AI's response with RAG, piece by piece
+                timings = {}
+                answer = ""
+                for text in generate_rickover_answer(gemini_client, user_question, knowledge_base, query_model,
+                                                     retrieval_engine, query_cache, answer_cache, timings):
+                    answer += text
+                    answer_placeholder.markdown(answer + "▌")
+
+                # Show the final answer
+                answer = answer.strip()
+                answer_placeholder.markdown(answer)
+
+                # Add to chat history
+                st.session_state.messages.append({"role": "assistant", "content": answer})
+
+            except Exception as error:
+                # If something goes wrong, show an error
+                error_message = f"⚠️ Error: {error}"
+                answer_placeholder.error(error_message)
+                st.session_state.messages.append({"role": "assistant", "content": error_message})
 
 
 
@@ -0,0 +1,5 @@
+"""
+collectors - Shared code for collecting the nuclear corpus from Wikipedia and the NRC
+
+Used by setup.py and scripts/make_dataset.py, which only hold the topic and URL lists.
+"""
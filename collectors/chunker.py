@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+collectors/chunker.py - Turn collected documents into the corpus JSONL, one chunk at a time
+
+Reads the documents made by create_enhanced_wikipedia_content() and
+create_enhanced_nrc_content(), splits them on their section headings and packs
+each section's paragraphs into chunks of about CHUNK_MAX_CHARS characters. Every
+chunk is written to the JSONL file as soon as it's made, so only one document is
+ever in memory, never the whole corpus.
+
+The embedding model only reads the first 256 word pieces of a chunk, and the
+rest would be left out of its embedding while still showing up in the retrieved
+context. Given the model's tokenizer (load_tokenizer()), any chunk over
+CHUNK_MAX_TOKENS is packed again smaller until it fits; without it the
+character cap is set low enough for most text.
+
+Chunk ids are stable: they come from the document's URL plus the section and
+chunk number, so re-chunking an unchanged document gives the same ids.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+# all-MiniLM-L6-v2 stops reading at 256 word pieces. Plain English is ~4.5 characters a
+# piece, but numbers, units, acronyms and chemical names split into many short pieces
+# (~3 characters each), so 850 characters keeps most technical text under the limit
+CHUNK_MAX_CHARS = 850
+CHUNK_MIN_CHARS = 200  # a smaller tail is merged into the chunk before it
+CHUNK_MAX_TOKENS = 256  # the model's max_seq_length, counting [CLS] and [SEP]
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+HEADER_END = "==================================="
+HEADING_PATTERN = re.compile(r"^=== (.+?) ===$")
+LABEL_PATTERN = re.compile(r"^(ARTICLE SUMMARY|FULL ARTICLE CONTENT|RELATED CATEGORIES|RELATED NUCLEAR TOPICS):$")
+SENTENCE_END_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+# Lists of names, not text worth retrieving
+SKIPPED_SECTIONS = {"RELATED CATEGORIES", "RELATED NUCLEAR TOPICS"}
+
+SOURCE_PREFIXES = {"wikipedia": "wiki", "nrc": "nrc"}
+
+
+def parse_header(lines):
+    """Read the 'Key: value' header lines up to the ===== line, returns them as a dict"""
+    header = {}
+    for line in lines:
+        line = line.strip()
+        if line == HEADER_END:
+            break
+        if ": " in line:
+            key, value = line.split(": ", 1)
+            header[key] = value
+    return header
+
+
+def iter_sections(lines):
+    """Yield (section title, paragraphs) for the body of a document, one section at a time"""
+    title = "Introduction"
+    paragraphs = []
+    paragraph = []
+
+    for line in lines:
+        line = line.strip()
+        heading = HEADING_PATTERN.match(line) or LABEL_PATTERN.match(line)
+
+        if heading or not line:
+            if paragraph:
+                paragraphs.append(" ".join(paragraph))
+                paragraph = []
+            if heading:
+                if paragraphs:
+                    yield title, paragraphs
+                title = heading.group(1).strip()
+                paragraphs = []
+            continue
+
+        paragraph.append(line)
+
+    if paragraph:
+        paragraphs.append(" ".join(paragraph))
+    if paragraphs:
+        yield title, paragraphs
+
+
+def split_long_text(text, max_chars):
+    """Break a paragraph longer than max_chars at sentence ends (or words, for very long sentences)"""
+    pieces = []
+    for sentence in SENTENCE_END_PATTERN.split(text):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:].strip()
+        if sentence:
+            pieces.append(sentence)
+    return pieces
+
+
+def pack_paragraphs(paragraphs, max_chars=CHUNK_MAX_CHARS, min_chars=CHUNK_MIN_CHARS):
+    """Pack a section's paragraphs into chunks of at most max_chars"""
+    chunks = []
+    current = ""
+
+    for paragraph in paragraphs:
+        pieces = [paragraph] if len(paragraph) <= max_chars else split_long_text(paragraph, max_chars)
+        for piece_number, piece in enumerate(pieces):
+            # Paragraphs stay apart, pieces of one long paragraph run on
+            separator = " " if piece_number else "\n\n"
+            if current and len(current) + len(separator) + len(piece) > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = current + separator + piece if current else piece
+
+    if current:
+        # Don't leave a scrap on its own
+        if chunks and len(current) < min_chars and len(chunks[-1]) + len(current) + 2 <= max_chars + min_chars:
+            chunks[-1] = chunks[-1] + "\n\n" + current
+        else:
+            chunks.append(current)
+    return chunks
+
+
+def token_counter(tokenizer):
+    """Function giving the number of word pieces the embedding model sees for a text (special tokens included)"""
+    num_special_tokens = tokenizer.num_special_tokens_to_add()
+    return lambda text: len(tokenizer.tokenize(text)) + num_special_tokens
+
+
+def load_tokenizer(model_name=EMBEDDING_MODEL_NAME):
+    """The embedding model's tokenizer, or None (then only the character cap is used)"""
+    try:
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(model_name)
+    except (ImportError, OSError) as error:
+        print(f"⚠️ No tokenizer for {model_name} ({error}), chunking by characters only")
+        return None
+
+
+def fit_to_tokens(chunks, count_tokens, max_tokens=CHUNK_MAX_TOKENS, min_chars=CHUNK_MIN_CHARS):
+    """Pack any chunk over max_tokens again, with a character cap shrunk by how far over it was"""
+    fitted = []
+    for chunk in chunks:
+        num_tokens = count_tokens(chunk)
+        if num_tokens <= max_tokens:
+            fitted.append(chunk)
+            continue
+        smaller_max_chars = max(1, int(len(chunk) * max_tokens / num_tokens * 0.9))
+        smaller_chunks = pack_paragraphs(chunk.split("\n\n"), smaller_max_chars,
+                                         min(min_chars, smaller_max_chars // 4))
+        fitted.extend(fit_to_tokens(smaller_chunks, count_tokens, max_tokens, min_chars))
+    return fitted
+
+
+def make_chunk_id(source, url, section_number, chunk_number):
+    """Stable id: same document, section and position give the same id on every run"""
+    url_hash = hashlib.sha1(url.encode("utf-8")).hexdigest()[:10]
+    return f"{SOURCE_PREFIXES.get(source, source)}_{url_hash}_{section_number:03d}_{chunk_number:03d}"
+
+
+def iter_document_chunks(text, source, category=None, max_chars=CHUNK_MAX_CHARS, min_chars=CHUNK_MIN_CHARS,
+                         count_tokens=None, max_tokens=CHUNK_MAX_TOKENS):
+    """Yield the chunks (corpus JSONL records) of one collected document
+
+    With count_tokens (see token_counter()), no chunk is longer than max_tokens.
+    """
+    lines = iter(text.splitlines())
+    header = parse_header(lines)
+
+    title = header.get("Title", "Untitled")
+    url = header.get("Source URL", title)
+    if category:
+        category = category.replace('_', ' ').title()
+    else:
+        category = header.get("Category") or header.get("Document Category")
+
+    for section_number, (section, paragraphs) in enumerate(iter_sections(lines)):
+        if section in SKIPPED_SECTIONS:
+            continue
+        chunks = pack_paragraphs(paragraphs, max_chars, min_chars)
+        if count_tokens is not None:
+            chunks = fit_to_tokens(chunks, count_tokens, max_tokens, min_chars)
+        for chunk_number, content in enumerate(chunks):
+            yield {
+                "id": make_chunk_id(source, url, section_number, chunk_number),
+                "title": title,
+                "category": category,
+                "source": source,
+                "url": url,
+                "section": section.title() if section.isupper() else section,
+                "chunk_index": chunk_number,
+                "content": content,
+            }
+
+
+def iter_saved_documents(manifest):
+    """Yield (text, source, category) for every document the crawl manifest says we saved, one file at a time
+
+    Documents the last finished crawl didn't record (no longer in the topic lists) are stale there and left out.
+    """
+    for document in manifest.documents():
+        if not document["filepath"] or not os.path.exists(document["filepath"]):
+            continue
+        with open(document["filepath"], "r", encoding="utf-8") as file:
+            yield file.read(), document["source"], document["category"]
+
+
+def write_corpus_jsonl(documents, output_path, max_chars=CHUNK_MAX_CHARS, min_chars=CHUNK_MIN_CHARS, tokenizer=None,
+                       max_tokens=CHUNK_MAX_TOKENS):
+    """Chunk (text, source, category) documents straight into a JSONL file, returns counts
+
+    With the embedding model's tokenizer, every chunk fits in max_tokens word pieces.
+    """
+    count_tokens = token_counter(tokenizer) if tokenizer is not None else None
+    if os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    # Written next to the real file and renamed at the end, so a crash never leaves half a corpus
+    partial_path = output_path + ".partial"
+    num_documents = 0
+    num_chunks = 0
+    seen_ids = set()
+
+    with open(partial_path, "w", encoding="utf-8") as corpus_file:
+        for text, source, category in documents:
+            num_documents += 1
+            for chunk in iter_document_chunks(text, source, category, max_chars, min_chars, count_tokens, max_tokens):
+                # The same page saved under two categories gives the same chunks once
+                if chunk["id"] in seen_ids:
+                    continue
+                seen_ids.add(chunk["id"])
+                corpus_file.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+                num_chunks += 1
+
+    os.replace(partial_path, output_path)
+    return {"documents": num_documents, "chunks": num_chunks}
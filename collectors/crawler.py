@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+collectors/crawler.py - Concurrent, polite fetching for the collectors
+
+Instead of fetching one page at a time with time.sleep() in between, the
+collectors run many fetches at once on an asyncio event loop:
+  - a token bucket per host keeps us under a requests-per-second limit
+  - a semaphore bounds how many fetches are in flight overall
+  - failed fetches (connection errors, timeouts, 429 / 5xx) are retried with backoff,
+    waiting at least as long as the server's Retry-After asks (and holding back
+    the rest of that host's fetches too)
+  - the HTTP itself goes through collectors.http_client, so connections are pooled and reused
+
+The blocking work (requests, wikipediaapi) runs in worker threads through
+asyncio.to_thread, so nothing here needs an async HTTP library.
+"""
+
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+
+# Requests per second we allow ourselves per host (anything else gets DEFAULT_HOST_RATE)
+HOST_RATES = {
+    "en.wikipedia.org": 2.0,
+    "www.nrc.gov": 1.0,
+}
+DEFAULT_HOST_RATE = 1.0
+
+# Status codes worth trying again
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# Longest Retry-After we go along with, so one server can't stall the crawl for hours
+MAX_RETRY_AFTER_SECONDS = 120
+
+
+class RetryableHTTPError(Exception):
+    """Raised by a fetch function when the server said 'try again later'"""
+
+    def __init__(self, status_code, url, retry_after=None):
+        super().__init__(f"HTTP {status_code} for {url}")
+        self.status_code = status_code
+        self.url = url
+        self.retry_after = retry_after
+
+
+def retry_after_seconds(response):
+    """Seconds a response's Retry-After header (a number or an HTTP date) asks us to wait, or None"""
+    value = response.headers.get("Retry-After", "").strip()
+    if not value:
+        return None
+    if value.isdigit():
+        seconds = float(value)
+    else:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        seconds = (when - datetime.now(timezone.utc)).total_seconds()
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER_SECONDS)
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, with bursts of up to `capacity`"""
+
+    def __init__(self, rate, capacity=1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        """Hand out no tokens for the next `seconds` (the server asked us to wait)"""
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+
+def host_of(url):
+    return urlparse(url).netloc
+
+
+class AsyncCrawler:
+    """Runs blocking fetch functions concurrently with per-host rate limits and retries"""
+
+    def __init__(self, concurrency=8, host_rates=None, default_rate=DEFAULT_HOST_RATE,
+                 max_retries=3, backoff_seconds=1.0):
+        self.concurrency = concurrency
+        self.host_rates = dict(HOST_RATES if host_rates is None else host_rates)
+        self.default_rate = default_rate
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+
+        # Created inside the event loop (see run())
+        self.semaphore = None
+        self.buckets = {}
+
+        self.fetches = 0
+        self.retries = 0
+        self.failures = 0
+
+    def bucket_for(self, host):
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.host_rates.get(host, self.default_rate))
+        return self.buckets[host]
+
+    async def fetch(self, host, function, *args):
+        """Run function(*args) in a thread once the host allows it, retrying on temporary failures"""
+        for attempt in range(self.max_retries + 1):
+            await self.bucket_for(host).acquire()
+            async with self.semaphore:
+                try:
+                    self.fetches += 1
+                    return await asyncio.to_thread(function, *args)
+
+                except (RetryableHTTPError, requests.ConnectionError, requests.Timeout) as error:
+                    if attempt == self.max_retries:
+                        self.failures += 1
+                        raise
+                    self.retries += 1
+                    last_error = error
+
+            # Back off outside the semaphore so other fetches keep going
+            delay = self.backoff_seconds * (2 ** attempt) * (1 + random.random())
+            retry_after = getattr(last_error, "retry_after", None)
+            if retry_after is not None:
+                self.bucket_for(host).pause(retry_after)
+                delay = max(delay, retry_after)
+            print(f"  🔁 Retrying in {delay:.1f}s after: {last_error}")
+            await asyncio.sleep(delay)
+
+    async def _run_all(self, coroutine_functions):
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.buckets = {}
+        return await asyncio.gather(*(function() for function in coroutine_functions), return_exceptions=True)
+
+    def run(self, coroutine_functions):
+        """Run a list of no-argument coroutine functions on a fresh event loop, results in the same order"""
+        return asyncio.run(self._run_all(coroutine_functions))
+
+    def stats(self):
+        return {"fetches": self.fetches, "retries": self.retries, "failures": self.failures}
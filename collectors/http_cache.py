@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+collectors/http_cache.py - Conditional-GET cache for the collectors
+
+Remembers, per URL, the ETag / Last-Modified headers the server sent, a digest
+of the body and the file we wrote it to. The next run sends If-None-Match /
+If-Modified-Since, so an unchanged NRC page comes back as a tiny 304 and we
+don't parse or rewrite it. If a server ignores the validators, a matching body
+digest still tells us nothing changed.
+
+The MediaWiki API doesn't send validators for page queries, so Wikipedia pages
+use the page's last revision id instead: same revision, same article.
+
+Everything lives in one small SQLite file, safe to use from the crawler's
+worker threads.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+def body_digest(body):
+    """sha1 of a response body (bytes) or page text (str)"""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return hashlib.sha1(body).hexdigest()
+
+
+class HTTPCache:
+    """Validators, body digests and output files of everything we've fetched before"""
+
+    def __init__(self, path="data/cache/http_cache.sqlite"):
+        self.path = path
+        self.lock = threading.Lock()
+
+        self.not_modified = 0
+        self.unchanged = 0
+        self.stored = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                revision INTEGER,
+                digest TEXT,
+                filepath TEXT,
+                fetched_at REAL NOT NULL,
+                checked_at REAL NOT NULL
+            )
+        """)
+        self.connection.commit()
+
+    def get(self, url, filepath=None):
+        """The stored entry for a URL, but only if the file we wrote for it (filepath, if given) is still there"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT etag, last_modified, revision, digest, filepath FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None or not row[4] or not os.path.exists(row[4]):
+            return None
+        if filepath is not None and row[4] != filepath:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "revision": row[2], "digest": row[3], "filepath": row[4]}
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since for a URL we already have on disk"""
+        entry = self.get(url)
+        headers = {}
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def unchanged_response(self, url, response):
+        """The stored entry if the server said 304 or sent the same body again, otherwise None"""
+        entry = self.get(url)
+        if entry is None:
+            return None
+
+        if response.status_code == 304:
+            self.not_modified += 1
+        elif response.status_code == 200 and entry["digest"] == body_digest(response.content):
+            self.unchanged += 1
+        else:
+            return None
+
+        self.touch(url)
+        return entry
+
+    def unchanged_revision(self, url, revision, filepath=None):
+        """The stored entry if a wiki page is still at the revision we saved, otherwise None"""
+        entry = self.get(url, filepath)
+        if entry is None or revision is None or entry["revision"] != revision:
+            return None
+
+        self.unchanged += 1
+        self.touch(url)
+        return entry
+
+    def unchanged_body(self, url, body, filepath=None):
+        """The stored entry if a re-fetched body is the same as the one we saved, otherwise None"""
+        entry = self.get(url, filepath)
+        if entry is None or entry["digest"] != body_digest(body):
+            return None
+
+        self.unchanged += 1
+        return entry
+
+    def touch(self, url):
+        with self.lock:
+            self.connection.execute("UPDATE entries SET checked_at = ? WHERE url = ?", (time.time(), url))
+            self.connection.commit()
+
+    def remember(self, url, body, filepath, response=None, revision=None):
+        """Store the validators and digest of what we just wrote to filepath"""
+        etag = response.headers.get("ETag") if response is not None else None
+        last_modified = response.headers.get("Last-Modified") if response is not None else None
+        now = time.time()
+
+        with self.lock:
+            self.stored += 1
+            self.connection.execute("""
+                INSERT OR REPLACE INTO entries (url, etag, last_modified, revision, digest, filepath, fetched_at, checked_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (url, etag, last_modified, revision, body_digest(body), filepath, now, now))
+            self.connection.commit()
+
+    def stats(self):
+        return {"not_modified": self.not_modified, "unchanged": self.unchanged, "stored": self.stored}
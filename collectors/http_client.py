@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+collectors/http_client.py - One pooled, metered HTTP layer for every collector
+
+All sessions handed out by an HTTPClient mount the same HTTPAdapter, so the
+Wikipedia and NRC collectors draw from one keep-alive connection pool instead of
+paying a new TCP + TLS handshake for every page. Every request through them:
+  - streams the body and gives up once it passes max_bytes
+  - gets a default timeout if the caller didn't set one
+  - is timed, so we can see per-host request counts, bytes and latency
+
+wikipediaapi keeps its own requests.Session; attach() swaps it for one of ours
+(keeping its headers), so its API calls go through the same pool and metrics.
+"""
+
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'NuclearSROBot/1.0 (Educational Research)',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+MAX_RESPONSE_BYTES = 20 * 1024 * 1024
+DEFAULT_TIMEOUT = 45
+READ_CHUNK_BYTES = 64 * 1024
+
+
+class ResponseTooLarge(Exception):
+    """Raised when a response body goes over the client's max_bytes"""
+
+    def __init__(self, url, max_bytes):
+        super().__init__(f"{url} is bigger than {max_bytes} bytes")
+        self.url = url
+        self.max_bytes = max_bytes
+
+
+class MeteredSession(requests.Session):
+    """requests.Session whose requests stream with a size cap and report their timing to the client"""
+
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.client.timeout)
+        kwargs["stream"] = True
+
+        start_time = time.perf_counter()
+        response = super().request(method, url, **kwargs)
+        try:
+            # Fill response.content ourselves, chunk by chunk, so a huge page can't eat all the memory
+            response._content = self.client.read_body(response)
+        except ResponseTooLarge:
+            self.client.record(url, "too_large", 0, time.perf_counter() - start_time)
+            raise
+        finally:
+            response.close()  # hands the connection back to the pool
+
+        self.client.record(url, response.status_code, len(response._content), time.perf_counter() - start_time)
+        return response
+
+
+class HTTPClient:
+    """Hands out sessions that share one connection pool, and keeps per-host timing metrics"""
+
+    def __init__(self, pool_size=16, max_bytes=MAX_RESPONSE_BYTES, timeout=DEFAULT_TIMEOUT, headers=None):
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.headers = dict(DEFAULT_HEADERS if headers is None else headers)
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+
+        self.lock = threading.Lock()
+        self.hosts = {}
+
+    def session(self, headers=None):
+        """A new session on the shared pool (with our default headers, or the ones given)"""
+        session = MeteredSession(self)
+        session.mount("https://", self.adapter)
+        session.mount("http://", self.adapter)
+        session.headers.update(self.headers if headers is None else headers)
+        return session
+
+    def attach(self, wiki):
+        """Route a wikipediaapi.Wikipedia's (or BatchWikipedia's) requests through our pool, keeping its own headers"""
+        old_session = getattr(wiki, "_session", None)
+        if old_session is not None:
+            wiki._session = self.session(dict(old_session.headers))
+        return wiki
+
+    def read_body(self, response):
+        """The whole (decompressed) body, or ResponseTooLarge once it passes max_bytes"""
+        declared = response.headers.get("Content-Length")
+        if declared and declared.isdigit() and int(declared) > self.max_bytes:
+            raise ResponseTooLarge(response.url, self.max_bytes)
+
+        body = bytearray()
+        for piece in response.iter_content(READ_CHUNK_BYTES):
+            body.extend(piece)
+            if len(body) > self.max_bytes:
+                raise ResponseTooLarge(response.url, self.max_bytes)
+        return bytes(body)
+
+    def record(self, url, status_code, num_bytes, seconds):
+        host = urlparse(url).netloc
+        with self.lock:
+            metrics = self.hosts.setdefault(host, {"requests": 0, "bytes": 0, "seconds": [], "statuses": {}})
+            metrics["requests"] += 1
+            metrics["bytes"] += num_bytes
+            metrics["seconds"].append(seconds)
+            metrics["statuses"][status_code] = metrics["statuses"].get(status_code, 0) + 1
+
+    def stats(self):
+        """Per host: requests, bytes, status counts and mean / p95 / max latency in milliseconds"""
+        with self.lock:
+            report = {}
+            for host, metrics in self.hosts.items():
+                seconds = sorted(metrics["seconds"])
+                report[host] = {
+                    "requests": metrics["requests"],
+                    "bytes": metrics["bytes"],
+                    "statuses": dict(metrics["statuses"]),
+                    "mean_ms": 1000 * sum(seconds) / len(seconds),
+                    "p95_ms": 1000 * seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))],
+                    "max_ms": 1000 * seconds[-1],
+                }
+            return report
+
+    def print_stats(self):
+        print("📡 HTTP requests by host:")
+        for host, row in self.stats().items():
+            print(f"   {host}: {row['requests']} requests, {row['bytes'] / 1024 / 1024:.1f} MB, "
+                  f"mean {row['mean_ms']:.0f} ms, p95 {row['p95_ms']:.0f} ms, max {row['max_ms']:.0f} ms, "
+                  f"statuses {row['statuses']}")
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+collectors/lxml_extract.py - Single-pass NRC page text extraction on lxml
+
+Gives exactly what parse_nrc_page() / extract_formatted_text() in nrc.py give
+(the same "=== HEADER ===" lines, "• " bullets and "1. " numbers), but instead of
+walking the BeautifulSoup tree once per step (headers, then <ul> items, then <ol>
+items, then the text) and rewriting it as it goes, it walks the lxml tree once
+and writes out the finished text.
+
+To come out the same, it copies the BeautifulSoup version's quirks:
+  - a list item nested in another item is folded into the outer item's text
+  - <ol> numbers count every item under the outermost <ol>, nested ones too
+  - a <ul> item inside an <ol> item is already a bullet when the <ol> item is read
+  - script/style/nav/header/footer/aside are left out, but the text after them stays
+  - whitespace-only text outside <pre> becomes one space (or one newline)
+
+scripts/check_nrc_extractor.py compares the two on saved pages, and
+scripts/benchmark_nrc_extractor.py times them.
+"""
+
+import re
+
+from lxml import etree
+from lxml import html as lxml_html
+
+from collectors.text_normalize import collapse_blank_lines
+
+HEADER_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+UNWANTED_TAGS = {'script', 'style', 'nav', 'header', 'footer', 'aside'}
+PRESERVE_WHITESPACE_TAGS = {'pre', 'textarea'}
+ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+DECLARED_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+
+# How much of the BeautifulSoup rewriting has happened when a piece of text is read
+RAW = 0       # nothing yet (a header's own text)
+HEADINGS = 1  # headers are "=== X ===" lines (a <ul> item's text)
+BULLETS = 2   # ... and <ul> items are bullets (an <ol> item's text)
+NUMBERS = 3   # ... and <ol> items are numbered (the finished page)
+
+
+def is_kept_element(node):
+    """True for real elements we keep (comments and processing instructions have a function as their tag)"""
+    return isinstance(node.tag, str) and node.tag not in UNWANTED_TAGS
+
+
+def is_removed(element):
+    return any(ancestor.tag in UNWANTED_TAGS for ancestor in element.iterancestors())
+
+
+def text_node(text, parent):
+    """A text node as BeautifulSoup stores it: all-whitespace text shrinks to ' ' or '\\n' (except in <pre>)"""
+    if text.strip(ASCII_SPACES):
+        return text
+    if parent.tag in PRESERVE_WHITESPACE_TAGS or any(
+            ancestor.tag in PRESERVE_WHITESPACE_TAGS for ancestor in parent.iterancestors()):
+        return text
+    return '\n' if '\n' in text else ' '
+
+
+def joined_text(element, level, numbering=None):
+    """element.get_text() at the given point of the rewriting, stripped"""
+    pieces = []
+    walk(element, pieces, level, False, numbering)
+    return "".join(pieces).strip()
+
+
+def walk(element, pieces, level, in_ul, numbering):
+    """Append the text pieces under element, in document order"""
+    if element.text:
+        pieces.append(text_node(element.text, element))
+    for child in element:
+        if is_kept_element(child):
+            walk_child(child, pieces, level, in_ul, numbering)
+        if child.tail:
+            pieces.append(text_node(child.tail, element))
+
+
+def walk_child(child, pieces, level, in_ul, numbering):
+    tag = child.tag
+
+    if tag in HEADER_TAGS and level >= HEADINGS:
+        header_text = joined_text(child, RAW)
+        if header_text:
+            pieces.append(f"\n\n=== {header_text.upper()} ===\n")
+            return
+
+    elif tag == 'li' and in_ul:
+        if level >= BULLETS:
+            li_text = joined_text(child, HEADINGS)
+            if li_text:
+                pieces.append(f"\n• {li_text}")
+                return
+        # An empty item stays in the tree, so the <ol> around it still counts it
+        if numbering is not None:
+            numbering[0] += 1
+
+    elif tag == 'li' and numbering is not None:
+        numbering[0] += 1
+        number = numbering[0]
+        if level >= NUMBERS:
+            # Reading the item also counts the items nested in it
+            li_text = joined_text(child, BULLETS, numbering)
+            if li_text:
+                pieces.append(f"\n{number}. {li_text}")
+                return
+            numbering[0] = number
+
+    elif tag == 'ol' and numbering is None and level >= NUMBERS:
+        # The outermost <ol> numbers every item under it
+        numbering = [0]
+
+    walk(child, pieces, level, in_ul or tag == 'ul', numbering)
+
+
+def extract_formatted_text_lxml(element):
+    """Same text as extract_formatted_text(), from an lxml element, in one pass"""
+    pieces = []
+    walk(element, pieces, NUMBERS, False, None)
+    text = "\n".join(piece for piece in (piece.strip() for piece in pieces) if piece)
+    return collapse_blank_lines(text)
+
+
+def find_main_content(root):
+    """<main>, div.content, div#content, <article> or <body>, whichever comes first in that list"""
+    candidates = (
+        (root.iter('main'), None),
+        (root.iter('div'), lambda div: 'content' in (div.get('class') or '').split()),
+        (root.iter('div'), lambda div: div.get('id') == 'content'),
+        (root.iter('article'), None),
+        (root.iter('body'), None),
+    )
+    for elements, matches in candidates:
+        for element in elements:
+            if (matches is None or matches(element)) and not is_removed(element):
+                return element
+    return None
+
+
+def html_parser_for(html):
+    """An lxml parser that decodes the page the way BeautifulSoup would (declared charset, UTF-8, then cp1252)"""
+    declared = DECLARED_CHARSET_PATTERN.search(html[:4096])
+    if declared:
+        encoding = declared.group(1).decode('ascii')
+    else:
+        try:
+            html.decode('utf-8')
+            encoding = 'utf-8'
+        except UnicodeDecodeError:
+            encoding = 'windows-1252'
+    try:
+        return lxml_html.HTMLParser(encoding=encoding)
+    except LookupError:
+        return lxml_html.HTMLParser(encoding='utf-8')
+
+
+def parse_nrc_page_lxml(html):
+    """Page title and cleaned-up main text of an NRC page, same as parse_nrc_page() but on lxml"""
+    if isinstance(html, str):
+        html, parser = html.encode('utf-8'), lxml_html.HTMLParser(encoding='utf-8')
+    else:
+        parser = html_parser_for(html)
+    try:
+        root = lxml_html.document_fromstring(html, parser=parser)
+    except (etree.ParserError, ValueError):
+        return "NRC Document", ""
+
+    title = next(root.iter('title'), None)
+    page_title = joined_text(title, RAW) if title is not None else "NRC Document"
+
+    main_content = find_main_content(root)
+    if main_content is not None:
+        text_content = extract_formatted_text_lxml(main_content)
+    else:
+        pieces = []
+        walk(root, pieces, RAW, False, None)
+        text_content = "\n".join(piece for piece in (piece.strip() for piece in pieces) if piece)
+
+    return page_title, text_content
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+collectors/manifest.py - Persistent record of what the crawl has fetched
+
+Every topic / URL the collectors finish is written to a small SQLite file with
+its status, file path, content hash, word count and size. If a crawl dies
+halfway through, the next run sees the unfinished run and skips everything it
+already did instead of starting from zero. create_summary() reads its counts
+from here instead of walking data/raw.
+
+Each document also remembers the digest of the raw download (in the RawStore)
+it was made from, so it can be re-processed later without fetching it again.
+
+A finished run has recorded every page in the current topic lists (and the
+related articles picked for them), so when it finishes, whatever it didn't
+record - topics taken off the lists, related articles no longer picked - is
+marked "stale" and drops out of the summary and the corpus.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# Statuses that don't need fetching again when we resume
+DONE_STATUSES = ("success", "skipped")
+
+
+def file_fingerprint(filepath):
+    """sha1 and size in bytes of a saved file"""
+    with open(filepath, "rb") as file:
+        data = file.read()
+    return hashlib.sha1(data).hexdigest(), len(data)
+
+
+class CrawlManifest:
+    """Status of every document per source ('wikipedia', 'nrc'), plus which crawl run is in progress"""
+
+    def __init__(self, path="data/raw/crawl_manifest.sqlite"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.run_ids = {}
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source TEXT NOT NULL,
+                started_at REAL NOT NULL,
+                finished_at REAL
+            )
+        """)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                source TEXT NOT NULL,
+                name TEXT NOT NULL,
+                category TEXT,
+                kind TEXT,
+                status TEXT NOT NULL,
+                filepath TEXT,
+                content_hash TEXT,
+                word_count INTEGER,
+                size_bytes INTEGER,
+                error TEXT,
+                run_id INTEGER,
+                updated_at REAL NOT NULL,
+                raw_digest TEXT,
+                PRIMARY KEY (source, category, name)
+            )
+        """)
+        # Manifests from before the raw store don't have the column yet
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(documents)")]
+        if "raw_digest" not in columns:
+            self.connection.execute("ALTER TABLE documents ADD COLUMN raw_digest TEXT")
+        self.connection.commit()
+
+    def start_run(self, source, resume=True):
+        """Carry on with the last run of this source if it never finished, otherwise start a new one"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT run_id, finished_at FROM runs WHERE source = ? ORDER BY run_id DESC LIMIT 1", (source,)
+            ).fetchone()
+
+            if resume and row is not None and row[1] is None:
+                run_id = row[0]
+                print(f"⏯️ Resuming unfinished {source} crawl (run {run_id})")
+            else:
+                cursor = self.connection.execute(
+                    "INSERT INTO runs (source, started_at) VALUES (?, ?)", (source, time.time()))
+                self.connection.commit()
+                run_id = cursor.lastrowid
+
+        self.run_ids[source] = run_id
+        return run_id
+
+    def finish_run(self, source):
+        """Close the current run and mark every document it didn't record as stale; returns how many"""
+        with self.lock:
+            now = time.time()
+            self.connection.execute("UPDATE runs SET finished_at = ? WHERE run_id = ?",
+                                    (now, self.run_ids.get(source)))
+            cursor = self.connection.execute(
+                "UPDATE documents SET status = 'stale', updated_at = ? "
+                "WHERE source = ? AND run_id IS NOT ? AND status != 'stale'",
+                (now, source, self.run_ids.get(source)))
+            self.connection.commit()
+
+        if cursor.rowcount:
+            print(f"🧹 {cursor.rowcount} {source} documents are no longer in the topic lists, marked stale")
+        return cursor.rowcount
+
+    def completed(self, source):
+        """{(category, name): document} already done in the current run (and whose file is still there)"""
+        documents = self._select("WHERE source = ? AND run_id = ? AND status IN (?, ?)",
+                                 (source, self.run_ids.get(source)) + DONE_STATUSES)
+        return {(document["category"], document["name"]): document for document in documents
+                if document["filepath"] is None or os.path.exists(document["filepath"])}
+
+    def previous(self, source, category, name):
+        """The last record of a document from any run, or None"""
+        documents = self._select("WHERE source = ? AND category = ? AND name = ?", (source, category, name))
+        return documents[0] if documents else None
+
+    def record(self, source, name, category, status, kind="article", filepath=None, word_count=None, error=None,
+               raw_digest=None):
+        """Write down how one document went in the current run (keeping its raw digest if no new one is given)"""
+        content_hash, size_bytes = None, None
+        if filepath is not None and os.path.exists(filepath):
+            content_hash, size_bytes = file_fingerprint(filepath)
+
+        with self.lock:
+            self.connection.execute("""
+                INSERT OR REPLACE INTO documents
+                    (source, name, category, kind, status, filepath, content_hash, word_count, size_bytes,
+                     error, run_id, updated_at, raw_digest)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, (
+                    SELECT raw_digest FROM documents WHERE source = ? AND category IS ? AND name = ?)))
+            """, (source, name, category, kind, status, filepath, content_hash, word_count, size_bytes,
+                  error, self.run_ids.get(source), time.time(), raw_digest, source, category, name))
+            self.connection.commit()
+
+    def update_processed(self, source, name, category, status, filepath=None, word_count=None):
+        """Write down a re-processed document, leaving which run it belongs to alone"""
+        content_hash, size_bytes = None, None
+        if filepath is not None and os.path.exists(filepath):
+            content_hash, size_bytes = file_fingerprint(filepath)
+
+        with self.lock:
+            self.connection.execute("""
+                UPDATE documents
+                SET status = ?, filepath = ?, content_hash = ?, word_count = ?, size_bytes = ?, updated_at = ?
+                WHERE source = ? AND category IS ? AND name = ?
+            """, (status, filepath, content_hash, word_count, size_bytes, time.time(), source, category, name))
+            self.connection.commit()
+
+    def documents(self, source=None, status="success"):
+        """Every document with the given status (of one source, or all of them)"""
+        if source is None:
+            return self._select("WHERE status = ? ORDER BY source, category, name", (status,))
+        return self._select("WHERE source = ? AND status = ? ORDER BY category, name", (source, status))
+
+    def _select(self, where, parameters):
+        with self.lock:
+            cursor = self.connection.execute(f"SELECT * FROM documents {where}", parameters)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+collectors/planner.py - Fetch every page once, however many categories want it
+
+The topic lists repeat themselves ("Containment building", "ALARA",
+"10 CFR Part 50", ... show up in several categories, and a couple of NRC URLs
+do too), and the same links turn up again and again as related-article
+candidates. The plan works out the distinct pages up front, so the collectors
+fetch each one once and write it into every category that listed it. It also
+keeps track of which related-article titles are already taken.
+"""
+
+
+class CrawlPlan:
+    """Distinct pages (topics or URLs) with the categories that want each, plus claimed related titles"""
+
+    def __init__(self, categories):
+        # {page: [categories that list it]} in the order they first appear
+        self.wanted_by = {}
+        self.listed = 0
+        for category, pages in categories.items():
+            for page in pages:
+                self.listed += 1
+                wanting = self.wanted_by.setdefault(page, [])
+                if category not in wanting:
+                    wanting.append(category)
+
+        # Related-article titles somebody has already fetched (or is fetching right now)
+        self.claimed = set()
+        self.related_saved = 0
+
+    def claim_related(self, title):
+        """True if a related-article candidate still needs fetching (and claims it for the caller)
+
+        Titles that are planned topics anyway, or that another page already
+        looked at, are not fetched again.
+        """
+        if title in self.wanted_by or title in self.claimed:
+            self.related_saved += 1
+            return False
+        self.claimed.add(title)
+        return True
+
+    def saved_requests(self):
+        return self.listed - len(self.wanted_by) + self.related_saved
+
+    def print_report(self, name):
+        related_text = f", {self.related_saved} repeated related links skipped" if self.related_saved else ""
+        print(f"🧮 {name} plan: {self.listed} listed, {len(self.wanted_by)} distinct{related_text} - "
+              f"{self.saved_requests()} fetches saved")
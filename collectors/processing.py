@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+collectors/processing.py - The CPU-heavy half of collection, on a process pool
+
+Parsing NRC HTML and building the Wikipedia training documents is CPU work, so
+it doesn't belong on the crawler's thread next to the network I/O. The
+collectors only fetch: they put what they download in the RawStore and hand the
+stored file to a ProcessingStage, which writes the document in a worker process
+on another core while the crawl keeps going.
+
+Because the processing stage only reads from the raw store, reprocess_all() can
+rebuild every document the manifest knows about on all cores, offline - e.g.
+after changing the text extraction.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+class ProcessingStage:
+    """A pool of worker processes that turn raw downloads into document files"""
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        # spawn, not fork: the crawler has threads running when the first worker starts
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self.processed = 0
+
+    async def run(self, function, *args):
+        """From the crawler's event loop: run function(*args) in a worker process and wait for it"""
+        result = await asyncio.wrap_future(self.executor.submit(function, *args))
+        self.processed += 1
+        return result
+
+    def close(self, cancel_pending=False):
+        """Wait for the running jobs and stop the workers (dropping queued jobs if cancel_pending)"""
+        self.executor.shutdown(cancel_futures=cancel_pending)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        # After an error nobody is waiting for the queued jobs any more
+        self.close(cancel_pending=error_type is not None)
+
+    def stats(self):
+        return {"workers": self.workers, "processed": self.processed}
+
+
+def reprocess_all(manifest, raw_store, stage=None, nrc_folder="data/raw/nrc_documents"):
+    """Rebuild every document file from the raw store, on all cores, without any network requests
+
+    Returns {processed, missing, failed}.
+    """
+    # Imported here because both collectors import this module for ProcessingStage
+    from collectors.nrc import write_nrc_page
+    from collectors.wikipedia import write_article
+
+    own_stage = stage is None
+    if own_stage:
+        stage = ProcessingStage()
+
+    try:
+        # Wikipedia: one job per file. NRC: one job per page, it writes a copy per category itself
+        jobs = {}
+        nrc_pages = {}
+        missing = 0
+        for document in manifest.documents("wikipedia"):
+            if not document["raw_digest"] or not raw_store.has(document["raw_digest"]):
+                missing += 1
+                continue
+            category = "related" if document["kind"] == "related" else document["category"]
+            future = stage.executor.submit(write_article, raw_store.path(document["raw_digest"]), category,
+                                           document["filepath"])
+            jobs[future] = ("wikipedia", document["name"], [document["category"]], document["filepath"])
+
+        for document in manifest.documents("nrc") + manifest.documents("nrc", status="skipped"):
+            if not document["raw_digest"] or not raw_store.has(document["raw_digest"]):
+                missing += 1
+                continue
+            nrc_pages.setdefault((document["name"], document["raw_digest"]), []).append(document["category"])
+
+        for (url, digest), categories in nrc_pages.items():
+            future = stage.executor.submit(write_nrc_page, raw_store.path(digest), url, categories, nrc_folder)
+            jobs[future] = ("nrc", url, categories, None)
+
+        print(f"⚙️ Re-processing {len(jobs)} documents on {stage.workers} processes "
+              f"({missing} have no raw copy and are left as they are)")
+        start_time = time.time()
+        processed = 0
+        failed = 0
+
+        for future in as_completed(jobs):
+            source, name, categories, filepath = jobs[future]
+            try:
+                result = future.result()
+            except Exception as error:
+                print(f"❌ Error re-processing {name}: {error}")
+                failed += 1
+                continue
+
+            if source == "wikipedia":
+                manifest.update_processed(source, name, categories[0], "success", filepath=filepath,
+                                          word_count=result)
+            else:
+                for category, page_result in zip(categories, result):
+                    manifest.update_processed(source, name, category, page_result["status"],
+                                              filepath=page_result.get("filepath"),
+                                              word_count=page_result.get("word_count"))
+            processed += 1
+    except BaseException:
+        # Every job was queued up front, don't run the rest of them after an error
+        if own_stage:
+            stage.close(cancel_pending=True)
+        raise
+    if own_stage:
+        stage.close()
+
+    elapsed_time = time.time() - start_time
+    print(f"✅ Re-processed {processed} documents in {elapsed_time:.1f}s ({failed} failed)")
+    return {"processed": processed, "missing": missing, "failed": failed}
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+collectors/raw_store.py - Content-addressed store for what the crawl downloads
+
+The fetch stage puts every raw NRC page (HTML bytes) and Wikipedia page
+(a JSON snapshot of its text, summary, categories and links) in here under the
+sha1 of its bytes, and the crawl manifest remembers which digest each document
+came from. The processing stage only ever reads from the store, so the whole
+corpus can be re-processed later without touching the network. The same bytes
+are only ever stored once.
+
+Layout: data/raw/store/<first 2 hex chars>/<sha1>
+"""
+
+import os
+import threading
+
+from collectors.http_cache import body_digest
+
+
+class RawStore:
+    """Raw downloads on disk, keyed by the sha1 of their bytes"""
+
+    def __init__(self, root="data/raw/store"):
+        self.root = root
+        self.lock = threading.Lock()
+        self.stored = 0
+        self.reused = 0
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def has(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def put(self, data):
+        """Store bytes (or text, as UTF-8) if we don't have them yet, returns their digest"""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        digest = body_digest(data)
+        filepath = self.path(digest)
+
+        if os.path.exists(filepath):
+            with self.lock:
+                self.reused += 1
+            return digest
+
+        # Written under a temporary name first, so a crash never leaves half a file under the real one
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        partial_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.partial"
+        with open(partial_path, "wb") as file:
+            file.write(data)
+        os.replace(partial_path, filepath)
+
+        with self.lock:
+            self.stored += 1
+        return digest
+
+    def get(self, digest):
+        with open(self.path(digest), "rb") as file:
+            return file.read()
+
+    def stats(self):
+        return {"stored": self.stored, "reused": self.reused}
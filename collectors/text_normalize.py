@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+collectors/text_normalize.py - Compiled text clean-up and keyword matching for the collectors
+
+Everything here is compiled once at import instead of on every call:
+  - normalize_wikipedia_text() does the blank-line clean-up and the
+    "== Heading ==" -> "=== Heading ===" rewrite with the same results as the
+    old re.sub() calls, but its heading pattern starts with a plain "=", so
+    the regex engine jumps from one "=" to the next instead of trying a match
+    at every character of the article
+  - KeywordMatcher checks a text for any of a list of keywords with one
+    lowercase and one search of a combined pattern, instead of lowercasing the
+    text again for every keyword
+  - split_extract() turns the plain-text extract the batch Wikipedia fetcher
+    gets into the same summary and text wikipediaapi gave the collectors
+
+scripts/benchmark_text_normalize.py compares them with the old way on the
+collected corpus.
+"""
+
+import re
+
+BLANK_LINES_PATTERN = re.compile(r'\n\s*\n\s*\n+')
+# Same matches as r'=+\s*([^=]+)\s*=+', written so it starts with a literal "="
+WIKI_HEADING_PATTERN = re.compile(r'==*\s*([^=]+)\s*=+')
+
+
+def collapse_blank_lines(text):
+    """Three or more line breaks (with only whitespace between) -> one blank line"""
+    return BLANK_LINES_PATTERN.sub('\n\n', text)
+
+
+def normalize_wikipedia_text(text):
+    """Collapse blank lines, then turn "== Heading ==" lines into "=== Heading ===" lines of their own"""
+    return WIKI_HEADING_PATTERN.sub(r'\n\n=== \1 ===\n', collapse_blank_lines(text))
+
+
+class KeywordMatcher:
+    """Does a text contain any of these keywords (case-insensitive, anywhere, even inside a word)?"""
+
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        self.pattern = re.compile('|'.join(re.escape(keyword.lower()) for keyword in self.keywords))
+
+    def matches(self, text):
+        return self.pattern.search(text.lower()) is not None
+
+    def filter(self, texts):
+        """The texts that contain a keyword, in order"""
+        return [text for text in texts if self.matches(text)]
+
+
+# "== Heading ==" lines in a TextExtracts plain-text extract (exsectionformat=wiki)
+EXTRACT_SECTION_PATTERN = re.compile(r"\n\n *(==+) (.*?) (==+) *\n")
+
+
+def split_extract(extract):
+    """(summary, text) of a plain-text extract, built the way wikipediaapi builds page.summary and page.text
+
+    The summary is everything before the first heading; the text is the summary
+    followed by each section as its bare title, a line break and its text.
+    """
+    summary = ""
+    sections = []
+    title = None
+    previous_end = 0
+    for match in EXTRACT_SECTION_PATTERN.finditer(extract):
+        if title is None:
+            summary = extract[:match.start()].strip()
+        else:
+            sections.append((title, extract[previous_end:match.start()].strip()))
+        title = match.group(2).strip()
+        previous_end = match.end()
+    if title is not None:
+        sections.append((title, extract[previous_end:].strip()))
+    if summary == "":
+        summary = extract.strip()  # no headings (or nothing before the first one)
+
+    text = summary + "\n\n" if summary else ""
+    for title, section_text in sections:
+        text += title + "\n" + section_text + ("\n\n" if section_text else "")
+    return summary, text.strip()
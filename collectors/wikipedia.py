@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+collectors/wikipedia.py - Concurrent Wikipedia article collection
+
+Each topic is fetched (page text, summary, categories and links) in a worker
+thread through the AsyncCrawler, so many topics are in flight at once while the
+per-host token bucket keeps us polite to Wikipedia. Files land in the same
+data/raw/wikipedia/<category>/ (and related/) layout as before. wikipediaapi's
+API calls go through the shared HTTPClient connection pool.
+
+A CrawlPlan makes sure each page is fetched once: a topic listed in several
+categories is written into each of them from the one fetch, and a related link
+that's a planned topic or was already looked at isn't fetched again.
+
+With an HTTPCache, a page still at the revision we saved last time only costs
+the small info and links requests: its text isn't downloaded and its file isn't
+rewritten.
+
+With a CrawlManifest, every finished topic is recorded as it completes, so a
+crawl that dies partway through resumes where it stopped.
+
+The crawl itself only fetches: each page's text, summary, categories and links
+go into the RawStore as a JSON snapshot, and the ProcessingStage builds the
+article file from that snapshot in a worker process.
+
+With a BatchWikipedia (collectors/wikipedia_batch.py) as the wiki, the info of
+all the topics is loaded up front 50 titles to a request, then the text of just
+the new or changed ones (links only for the rest), and each page's related-link
+candidates are loaded together the same way.
+"""
+
+import json
+import os
+from datetime import datetime
+
+from collectors.crawler import AsyncCrawler
+from collectors.http_client import HTTPClient
+from collectors.planner import CrawlPlan
+from collectors.processing import ProcessingStage
+from collectors.raw_store import RawStore
+from collectors.text_normalize import KeywordMatcher, normalize_wikipedia_text
+
+WIKIPEDIA_HOST = "en.wikipedia.org"
+
+RELATED_KEYWORDS = [
+    'reactor', 'nuclear', 'power', 'steam', 'cooling', 'safety', 'radiation',
+    'control', 'fuel', 'core', 'vessel', 'containment', 'emergency', 'neutron'
+]
+NUCLEAR_LINK_KEYWORDS = ['nuclear', 'reactor', 'power', 'steam', 'cooling', 'safety', 'radiation']
+
+# Compiled once, each checks a title or text in a single search
+RELATED_TITLE_MATCHER = KeywordMatcher(RELATED_KEYWORDS)
+NUCLEAR_LINK_MATCHER = KeywordMatcher(NUCLEAR_LINK_KEYWORDS)
+NUCLEAR_TEXT_MATCHER = KeywordMatcher(['nuclear', 'reactor'])
+
+
+def create_enhanced_wikipedia_content(page, category):
+    """Create enhanced content like your original script"""
+
+    content_sections = []
+
+    # Enhanced header (matching your original!)
+    header = f"""=== NUCLEAR TRAINING DOCUMENT ===
+Title: {page.title}
+Source URL: {page.fullurl}
+Collection Date: {datetime.now().isoformat()}
+Document Type: Nuclear Regulatory/Educational Content
+Category: {category.replace('_', ' ').title()}
+===================================
+
+"""
+
+    # Add comprehensive summary
+    content_sections.append(f"ARTICLE SUMMARY:\n{page.summary}\n")
+
+    # Add main content with better formatting
+    # Clean up common Wikipedia formatting issues (blank lines and headings, in one pass)
+    main_text = normalize_wikipedia_text(page.text)
+
+    content_sections.append(f"FULL ARTICLE CONTENT:\n{main_text}\n")
+
+    # Add categories for context
+    if page.categories:
+        categories = list(page.categories.keys())[:15]
+        content_sections.append(f"RELATED CATEGORIES:\n{chr(10).join(f'- {cat}' for cat in categories)}\n")
+
+    # Add related articles for cross-referencing (like your original!)
+    if page.links:
+        related_links = NUCLEAR_LINK_MATCHER.filter(list(page.links.keys())[:25])
+        if related_links:
+            content_sections.append(
+                f"RELATED NUCLEAR TOPICS:\n{chr(10).join(f'- {link}' for link in related_links)}\n")
+
+    full_content = header + "\n".join(content_sections)
+    return full_content
+
+
+def make_safe_name(topic):
+    """Topic title -> lowercase filename stem"""
+    safe_name = topic.replace(" ", "_").replace("(", "").replace(")", "")
+    safe_name = safe_name.replace("/", "_").replace(":", "_")
+    return safe_name.lower()
+
+
+def load_page(wiki, title, http_cache=None, filepaths=()):
+    """Runs in a worker thread: fetch everything about a page we'll need, so later reads don't hit the network
+
+    Returns (page, cached entry). When the page is still at the revision saved in
+    filepaths[0] (and every other copy is still there), only its info and links
+    are fetched and the cached entry is returned.
+    """
+    page = wiki.page(title)
+    if not page.exists():
+        return page, None
+
+    cached = revision_unchanged(page, http_cache, filepaths)
+    if cached is not None:
+        page.links  # still needed to look for related articles
+        return page, cached
+
+    page.text
+    page.summary
+    page.categories
+    page.links
+    return page, None
+
+
+def revision_unchanged(page, http_cache=None, filepaths=()):
+    """The cached entry when the page is still at the revision saved in filepaths[0] and every copy is there"""
+    if http_cache is None or not filepaths:
+        return None
+    cached = http_cache.unchanged_revision(page.fullurl, page.lastrevid, filepaths[0])
+    if cached is not None and all(os.path.exists(filepath) for filepath in filepaths[1:]):
+        return cached
+    return None
+
+
+def prefetch_pages(wiki, filepaths_by_title, http_cache=None):
+    """Runs in a worker thread: batch-load the pages' info, then the text of only the new or changed ones
+
+    For a BatchWikipedia. Pages still at the revision we saved only get their
+    links (for related articles), so their text isn't downloaded again.
+    """
+    wiki.prefetch(list(filepaths_by_title))
+    changed = []
+    unchanged = []
+    for title, filepaths in filepaths_by_title.items():
+        page = wiki.page(title)  # already loaded by prefetch()
+        if page.exists():
+            if revision_unchanged(page, http_cache, filepaths) is None:
+                changed.append(title)
+            else:
+                unchanged.append(title)
+    wiki.prefetch_content(changed)
+    wiki.prefetch_links(unchanged)
+    return len(changed), len(unchanged)
+
+
+class PageSnapshot:
+    """The parts of a wikipediaapi page that create_enhanced_wikipedia_content() reads, as kept in the raw store"""
+
+    def __init__(self, data):
+        self.title = data["title"]
+        self.fullurl = data["fullurl"]
+        self.lastrevid = data.get("lastrevid")
+        self.summary = data["summary"]
+        self.text = data["text"]
+        # Dicts like wikipediaapi's, in the same order; only the keys are ever used
+        self.categories = dict.fromkeys(data["categories"])
+        self.links = dict.fromkeys(data["links"])
+
+    def exists(self):
+        return True
+
+
+def page_snapshot(page):
+    """JSON bytes of everything create_enhanced_wikipedia_content() needs from a fetched page"""
+    return json.dumps({
+        "title": page.title,
+        "fullurl": page.fullurl,
+        "lastrevid": page.lastrevid,
+        "summary": page.summary,
+        "text": page.text,
+        "categories": list(page.categories.keys()),
+        "links": list(page.links.keys()),
+    }, ensure_ascii=False).encode("utf-8")
+
+
+def write_article(raw_path, category, filepath):
+    """Runs in a worker process: build one article file from a stored page snapshot, returns its word count"""
+    with open(raw_path, 'rb') as file:
+        page = PageSnapshot(json.loads(file.read()))
+
+    content = create_enhanced_wikipedia_content(page, category)
+    with open(filepath, 'w', encoding='utf-8') as file:
+        file.write(content)
+    return len(page.text.split())
+
+
+async def save_article(processing, raw_path, page, category, filepath, http_cache=None):
+    """Have the processing stage write one article file (unless the text is as last time), returns its word count"""
+    if http_cache is None or http_cache.unchanged_body(page.fullurl, page.text, filepath) is None:
+        word_count = await processing.run(write_article, raw_path, category, filepath)
+    else:
+        word_count = len(page.text.split())
+
+    if http_cache is not None:
+        http_cache.remember(page.fullurl, page.text, filepath, revision=page.lastrevid)
+    return word_count
+
+
+def kept_word_count(filepath, manifest=None, category=None, name=None):
+    """Word count of an article file we kept from an earlier run (from the manifest when it knows)"""
+    previous = manifest.previous("wikipedia", category, name) if manifest is not None else None
+    if previous is not None and previous["word_count"] is not None:
+        return previous["word_count"]
+
+    with open(filepath, 'r', encoding='utf-8') as file:
+        return len(file.read().split())
+
+
+async def get_related_articles(crawler, wiki, main_page, category_folder, all_collected, main_topic, max_related=3,
+                               http_cache=None, manifest=None, plan=None, raw_store=None, processing=None):
+    """Get related articles like your original script"""
+
+    if not main_page.links:
+        return
+
+    related_count = 0
+    category_name = os.path.basename(category_folder)
+
+    # Create related folder
+    related_folder = os.path.join(category_folder, "related")
+    os.makedirs(related_folder, exist_ok=True)
+
+    candidates = [link_title for link_title in list(main_page.links.keys())[:20]  # Check first 20 links
+                  if link_title not in all_collected and
+                  RELATED_TITLE_MATCHER.matches(link_title) and
+                  len(link_title) < 60 and
+                  link_title != main_topic]
+
+    # A batch fetcher loads all the candidates together instead of one page at a time
+    if hasattr(wiki, "prefetch") and candidates:
+        filepaths_by_title = {link_title: [os.path.join(related_folder, f"related_{make_safe_name(link_title)}.txt")]
+                              for link_title in candidates}
+        try:
+            await crawler.fetch(WIKIPEDIA_HOST, prefetch_pages, wiki, filepaths_by_title, http_cache)
+        except Exception as error:
+            print(f"  ⚠️ Couldn't prefetch related articles for '{main_topic}': {error}")
+
+    # Look through links for nuclear-related topics
+    for link_title in candidates:
+        if related_count >= max_related:
+            break
+
+        if link_title not in all_collected:
+
+            # Planned topics and links another page already looked at aren't fetched again
+            if plan is not None and not plan.claim_related(link_title):
+                continue
+
+            filepath = os.path.join(related_folder, f"related_{make_safe_name(link_title)}.txt")
+            digest = None
+            try:
+                related_page, cached = await crawler.fetch(WIKIPEDIA_HOST, load_page, wiki, link_title,
+                                                           http_cache, [filepath])
+                if cached is not None:
+                    if link_title in all_collected:
+                        continue
+                    all_collected[link_title] = {
+                        'category': 'related',
+                        'filepath': filepath,
+                        'word_count': kept_word_count(filepath, manifest, category_name, link_title)
+                    }
+                    related_count += 1
+                    print(f"  ♻️ Related article unchanged: {link_title}")
+
+                elif (related_page.exists() and
+                        len(related_page.text) > 800 and
+                        NUCLEAR_TEXT_MATCHER.matches(related_page.text[:2000])):
+                    # Another topic may have grabbed it while we were fetching
+                    if link_title in all_collected:
+                        continue
+
+                    # Save the related article (claimed before we wait on the processing stage)
+                    digest = raw_store.put(page_snapshot(related_page))
+                    all_collected[link_title] = {
+                        'category': 'related',
+                        'filepath': filepath,
+                        'word_count': None
+                    }
+                    try:
+                        all_collected[link_title]['word_count'] = await save_article(
+                            processing, raw_store.path(digest), related_page, "related", filepath, http_cache)
+                    except Exception:
+                        del all_collected[link_title]
+                        raise
+                    related_count += 1
+                    print(f"  📎 Related article: {link_title}")
+
+                if manifest is not None and link_title in all_collected:
+                    manifest.record("wikipedia", link_title, category_name, "success", kind="related",
+                                    filepath=filepath, word_count=all_collected[link_title]['word_count'],
+                                    raw_digest=digest)
+
+            except Exception as error:
+                print(f"  ⚠️ Error getting related article '{link_title}': {error}")
+
+
+def collect_wikipedia_articles(wiki, nuclear_categories, crawler=None, base_folder="data/raw/wikipedia",
+                               http_cache=None, manifest=None, http_client=None, raw_store=None, processing=None):
+    """Fetch every distinct topic once, concurrently, and save it into every category that lists it
+
+    Returns {topic: {category, filepath, word_count}}.
+    """
+    if crawler is None:
+        crawler = AsyncCrawler()
+    if http_client is None:
+        http_client = HTTPClient(pool_size=crawler.concurrency)
+    http_client.attach(wiki)
+    if raw_store is None:
+        raw_store = RawStore()
+    own_processing = processing is None
+
+    plan = CrawlPlan(nuclear_categories)
+    total_articles = len(plan.wanted_by)
+    all_collected = {}
+    category_counts = {category_name: 0 for category_name in nuclear_categories}
+    fetched = 0
+
+    # Pick up what an interrupted run already finished
+    completed = {}
+    if manifest is not None:
+        manifest.start_run("wikipedia")
+        completed = manifest.completed("wikipedia")
+        for (category_name, name), document in completed.items():
+            if document["status"] != "success":
+                continue
+            all_collected.setdefault(name, {
+                'category': 'related' if document["kind"] == "related" else category_name,
+                'filepath': document["filepath"],
+                'word_count': document["word_count"]
+            })
+            if document["kind"] != "related" and category_name in category_counts:
+                category_counts[category_name] += 1
+        if completed:
+            print(f"⏭️ Skipping {len(completed)} articles finished before the interruption")
+
+    def pending(topic, categories):
+        """The categories an interrupted run didn't finish yet for a topic, and their file paths"""
+        categories = [category_name for category_name in categories if (category_name, topic) not in completed]
+        filename = f"{make_safe_name(topic)}.txt"
+        return categories, [os.path.join(base_folder, category_name, filename) for category_name in categories]
+
+    async def collect_topic(topic, categories):
+        nonlocal fetched
+        categories, filepaths = pending(topic, categories)
+        if not categories:
+            return
+
+        filename = os.path.basename(filepaths[0])
+
+        try:
+            page, cached = await crawler.fetch(WIKIPEDIA_HOST, load_page, wiki, topic, http_cache, filepaths)
+            fetched += 1
+            print(f"📄 ({fetched}/{total_articles}) Got: {topic}")
+
+            # Check if the page exists and has enough content
+            if cached is None and not (page.exists() and len(page.text) > 500):
+                print(f"⚠️ Skipped: {topic} (not found or too short)")
+                if manifest is not None:
+                    for category_name in categories:
+                        manifest.record("wikipedia", topic, category_name, "skipped")
+                return
+
+            # One fetch, one raw snapshot, one copy per category that listed it
+            digest = raw_store.put(page_snapshot(page)) if cached is None else None
+            word_counts = []
+            for position, (category_name, filepath) in enumerate(zip(categories, filepaths)):
+                if cached is not None:
+                    word_counts.append(kept_word_count(filepath, manifest, category_name, topic))
+                    print(f"♻️ Unchanged: {category_name}/{filename}")
+                else:
+                    # The HTTP cache follows the first copy
+                    word_counts.append(await save_article(processing, raw_store.path(digest), page, category_name,
+                                                          filepath, http_cache if position == 0 else None))
+                    print(f"✅ Saved: {category_name}/{filename}")
+                category_counts[category_name] += 1
+
+            all_collected[topic] = {
+                'category': categories[0],
+                'filepath': filepaths[0],
+                'word_count': word_counts[0]
+            }
+
+            # Try to get related articles (like your original!)
+            await get_related_articles(crawler, wiki, page, os.path.join(base_folder, categories[0]),
+                                       all_collected, topic, http_cache=http_cache, manifest=manifest, plan=plan,
+                                       raw_store=raw_store, processing=processing)
+
+            # Recorded after its related articles, so a resumed run doesn't skip those
+            if manifest is not None:
+                for category_name, filepath, word_count in zip(categories, filepaths, word_counts):
+                    manifest.record("wikipedia", topic, category_name, "success",
+                                    filepath=filepath, word_count=word_count, raw_digest=digest)
+
+        except Exception as error:
+            print(f"❌ Error getting {topic}: {error}")
+            if manifest is not None:
+                for category_name in categories:
+                    manifest.record("wikipedia", topic, category_name, "error", error=str(error))
+
+    for category_name in nuclear_categories:
+        os.makedirs(os.path.join(base_folder, category_name), exist_ok=True)
+
+    if own_processing:
+        processing = ProcessingStage()
+    try:
+        # A batch fetcher loads every topic up front, 50 titles to a batch (a failed batch is fetched per page later)
+        if hasattr(wiki, "prefetch"):
+            filepaths_by_title = {}
+            for topic, categories in plan.wanted_by.items():
+                filepaths = pending(topic, categories)[1]
+                if filepaths:
+                    filepaths_by_title[topic] = filepaths
+            titles = list(filepaths_by_title)
+            batches = [{title: filepaths_by_title[title] for title in titles[start:start + wiki.batch_size]}
+                       for start in range(0, len(titles), wiki.batch_size)]
+            results = crawler.run([lambda batch=batch: crawler.fetch(WIKIPEDIA_HOST, prefetch_pages, wiki, batch,
+                                                                     http_cache)
+                                   for batch in batches])
+            failed = sum(1 for result in results if isinstance(result, Exception))
+            changed = sum(result[0] for result in results if not isinstance(result, Exception))
+            print(f"📦 Prefetched {len(titles)} topics in {len(batches)} batches: {changed} new or changed, "
+                  f"{failed} batches failed")
+
+        jobs = [lambda topic=topic, categories=categories: collect_topic(topic, categories)
+                for topic, categories in plan.wanted_by.items()]
+        crawler.run(jobs)
+    finally:
+        # Stop our worker processes even if the crawl blew up
+        if own_processing:
+            processing.close()
+    if manifest is not None:
+        manifest.finish_run("wikipedia")
+
+    for category_name, count in category_counts.items():
+        print(f"✅ Category {category_name} complete: {count} articles")
+    plan.print_report("Wikipedia")
+    print(f"🌐 Crawler stats: {crawler.stats()}")
+    if hasattr(wiki, "stats"):
+        print(f"📦 Batch fetch stats: {wiki.stats()}")
+    http_client.print_stats()
+    if http_cache is not None:
+        print(f"🗄️ HTTP cache stats: {http_cache.stats()}")
+    print(f"⚙️ Processing stats: {processing.stats()}, raw store: {raw_store.stats()}")
+    return all_collected
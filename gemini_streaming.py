@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+gemini_streaming.py - Stream Gemini answers piece by piece
+
+Instead of waiting for the whole response.text, we ask Gemini for a streamed
+response and pass each piece on as soon as it arrives, timing how long the first
+piece took (time to first token) and how long the whole answer took.
+
+GeminiClient configures the API and builds the model handle once, so each chat
+turn reuses it instead of calling genai.configure / GenerativeModel again.
+
+FakeGenerativeModel behaves like genai.GenerativeModel but answers from a canned
+text, so the streaming path can be exercised without an API key or network.
+"""
+
+import threading
+import time
+
+
+def stream_generated_text(model, prompt, timings=None):
+    """Yield the text of each streamed chunk and fill timings with time_to_first_token / total_time"""
+    if timings is None:
+        timings = {}
+
+    start_time = time.perf_counter()
+    response = model.generate_content(prompt, stream=True)
+
+    for chunk in response:
+        text = chunk.text
+        if not text:
+            continue
+
+        if "time_to_first_token" not in timings:
+            timings["time_to_first_token"] = time.perf_counter() - start_time
+        yield text
+
+    timings["total_time"] = time.perf_counter() - start_time
+
+
+class GeminiClient:
+    """Configures Gemini once and hands out the same model handle to every request"""
+
+    def __init__(self, api_key, model_name="gemini-1.5-flash", fake=False):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.fake = fake
+        self.model = None
+        self.lock = threading.Lock()
+
+    def get_model(self):
+        """Build the model on first use (safe to call from several threads)"""
+        with self.lock:
+            if self.model is None:
+                if self.fake:
+                    self.model = FakeGenerativeModel()
+                else:
+                    # Only needed for the real model
+                    import google.generativeai as genai
+
+                    genai.configure(api_key=self.api_key)
+                    self.model = genai.GenerativeModel(self.model_name)
+            return self.model
+
+
+class FakeChunk:
+    """Looks like one piece of a streamed Gemini response"""
+
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeResponse:
+    """Looks like a Gemini response: iterate it for chunks or read .text"""
+
+    def __init__(self, pieces, delay):
+        self.pieces = pieces
+        self.delay = delay
+
+    def __iter__(self):
+        for piece in self.pieces:
+            time.sleep(self.delay)
+            yield FakeChunk(piece)
+
+    @property
+    def text(self):
+        return "".join(self.pieces)
+
+
+class FakeGenerativeModel:
+    """Offline stand-in for genai.GenerativeModel that streams a canned answer word by word"""
+
+    def __init__(self, answer=None, delay=0.02, first_token_delay=0.3):
+        self.answer = answer or (
+            "Listen carefully. This is an offline test answer - no Gemini call was made. "
+            "Know your systems, follow your procedures, and never let safety slide."
+        )
+        self.delay = delay
+        self.first_token_delay = first_token_delay
+        self.prompts = []
+
+    def generate_content(self, prompt, stream=False):
+        self.prompts.append(prompt)
+        words = self.answer.split(" ")
+        pieces = [word + " " for word in words[:-1]] + words[-1:]
+
+        if not stream:
+            time.sleep(self.first_token_delay + self.delay * len(pieces))
+            return FakeResponse(pieces, 0)
+
+        time.sleep(self.first_token_delay)
+        return FakeResponse(pieces, self.delay)
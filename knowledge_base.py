@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+knowledge_base.py - On-disk format for the nuclear knowledge base
+
+The knowledge base is a folder with a few flat files instead of one big pickle:
+
+    manifest.json     small JSON file describing everything below
+    embeddings.npy    float32 matrix (num_documents x embedding_dim)
+    offsets.npy       int64 array, chunk i lives at text.bin[offsets[i]:offsets[i+1]]
+    text.bin          all chunk contents as UTF-8, back to back
+    documents.jsonl   one line per chunk with everything except the content
+
+Optional extras (like the search index from retrieval.py) are listed under "files"
+in the manifest too, so uploading and downloading always moves the whole folder.
+
+Every build gets its own timestamped folder in the bucket. Once one is fully
+uploaded, a small pointer blob (LATEST_POINTER_BLOB) is updated to name it, and
+the app loads whatever the pointer names unless it is told a folder explicitly.
+
+The app opens the .npy files with np.memmap so every replica on a machine shares
+the same pages through the OS cache, and startup does not grow with the corpus.
+"""
+
+import array
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+# Bump this whenever the layout of the files changes
+FORMAT_VERSION = 1
+
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+OFFSETS_FILE = "offsets.npy"
+TEXT_FILE = "text.bin"
+DOCUMENTS_FILE = "documents.jsonl"
+
+# Bucket blob naming the newest uploaded knowledge base folder
+LATEST_POINTER_BLOB = "nuclear_knowledge_base_latest.json"
+
+
+def content_hash(text):
+    """Hash of a chunk's text that ignores case and whitespace differences"""
+    normalized = re.sub(r"\s+", " ", text).strip().lower()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def chunk_hash(documents, position):
+    """Content hash of one chunk, straight from the metadata when documents is a ChunkStore"""
+    if hasattr(documents, "content_hash"):
+        return documents.content_hash(position)
+    return content_hash(documents[position].get("content", ""))
+
+
+def first_of_each_hash(documents):
+    """Positions of the first chunk with each content hash (exact duplicates dropped, no embeddings needed)"""
+    seen_hashes = set()
+    positions = []
+    for position in range(len(documents)):
+        text_hash = chunk_hash(documents, position)
+        if text_hash not in seen_hashes:
+            seen_hashes.add(text_hash)
+            positions.append(position)
+    return np.array(positions, dtype=np.int64)
+
+
+def deduplicate_chunks(embeddings, documents, threshold=0.98, block_size=1024, cells=None):
+    """Positions of the chunks to keep after dropping exact and near duplicates
+
+    Exact duplicates are found by content hash. Near duplicates are chunks whose
+    embedding has cosine similarity >= threshold with an earlier chunk we kept.
+    That compares every chunk with every kept one, O(n^2): a few seconds for
+    20,000 chunks, but it grows fast. Give cells (the IVF cell of every chunk,
+    see retrieval.assign_to_centroids) to only compare chunks in the same cell;
+    near duplicates that land in different cells are then kept.
+    """
+    positions = first_of_each_hash(documents)
+    if cells is None:
+        groups = [positions]
+    else:
+        # One group per cell, each still in corpus order
+        position_cells = np.asarray(cells)[positions]
+        order = np.argsort(position_cells, kind="stable")
+        groups = np.split(positions[order], np.flatnonzero(np.diff(position_cells[order])) + 1)
+
+    kept = [group[keep_first_of_near_duplicates(embeddings, group, threshold, block_size)]
+            for group in groups if len(group)]
+    return np.sort(np.concatenate(kept)) if kept else np.zeros(0, dtype=np.int64)
+
+
+def keep_first_of_near_duplicates(embeddings, positions, threshold, block_size=1024):
+    """Indices into positions of the chunks with no kept earlier chunk at cosine similarity >= threshold"""
+    group = np.asarray(embeddings[positions], dtype=np.float32)
+    group /= np.maximum(np.linalg.norm(group, axis=1, keepdims=True), 1e-12)
+
+    kept = []
+    for block_start in range(0, len(group), block_size):
+        block = group[block_start:block_start + block_size]
+
+        # Everything kept before this block in one matrix multiply...
+        if kept:
+            near_earlier = (block @ group[kept].T).max(axis=1) >= threshold
+        else:
+            near_earlier = np.zeros(len(block), dtype=bool)
+
+        # ...then the block's own chunks, in order
+        block_similarities = block @ block.T
+        kept_in_block = []
+        for offset in range(len(block)):
+            if near_earlier[offset]:
+                continue
+            if kept_in_block and block_similarities[offset, kept_in_block].max() >= threshold:
+                continue
+            kept_in_block.append(offset)
+        kept.extend(block_start + offset for offset in kept_in_block)
+
+    return np.array(kept, dtype=np.int64)
+
+
+def plan_incremental_build(previous_knowledge_base, documents, model_name):
+    """Reuse vectors from a previous knowledge base for chunks whose content hash did not change
+
+    Returns (embeddings, positions_to_encode, stats). embeddings already holds the
+    reused vectors; the rows listed in positions_to_encode still need the model.
+    Chunks that are gone from the corpus are simply not carried over.
+    """
+    if previous_knowledge_base is None:
+        return None, list(range(len(documents))), {"reused": 0, "to_encode": len(documents), "deleted": 0}
+
+    if previous_knowledge_base["manifest"].get("model_used") != model_name:
+        # Vectors from another model are useless, start over
+        print(f"⚠️ Previous knowledge base used {previous_knowledge_base['manifest'].get('model_used')}, "
+              f"re-encoding everything with {model_name}")
+        return None, list(range(len(documents))), {"reused": 0, "to_encode": len(documents), "deleted": 0}
+
+    # The hash ignores case and whitespace, which MiniLM's uncased tokenizer ignores too
+    previous_chunks = previous_knowledge_base["documents"]
+    previous_rows = {}
+    for row in range(len(previous_chunks)):
+        previous_rows.setdefault(previous_chunks.content_hash(row), row)
+
+    reused_positions = []
+    reused_rows = []
+    positions_to_encode = []
+    for position in range(len(documents)):
+        row = previous_rows.get(chunk_hash(documents, position))
+        if row is None:
+            positions_to_encode.append(position)
+        else:
+            reused_positions.append(position)
+            reused_rows.append(row)
+
+    embeddings = np.zeros((len(documents), previous_knowledge_base["embedding_dim"]), dtype=np.float32)
+    if reused_rows:
+        embeddings[reused_positions] = previous_knowledge_base["embeddings"][reused_rows]
+
+    stats = {
+        "reused": len(reused_positions),
+        "to_encode": len(positions_to_encode),
+        "deleted": len(previous_chunks) - len(set(reused_rows)),
+    }
+    return embeddings, positions_to_encode, stats
+
+
+class ChunkStore:
+    """List-like view of the chunks that reads content from the memory-mapped text blob"""
+
+    def __init__(self, metadata, offsets, text_blob):
+        self.metadata = metadata
+        self.offsets = offsets
+        self.text_blob = text_blob
+
+    def __len__(self):
+        return len(self.metadata)
+
+    def chunk_id(self, index):
+        """Get the id of one chunk without touching its content"""
+        return self.metadata[int(index)]["id"]
+
+    def content_hash(self, index):
+        """Get the content hash of one chunk (computed on the fly for older knowledge bases)"""
+        metadata = self.metadata[int(index)]
+        if "content_hash" in metadata:
+            return metadata["content_hash"]
+        return content_hash(self.content(index))
+
+    def content(self, index):
+        """Get just the text of one chunk"""
+        start = int(self.offsets[index])
+        end = int(self.offsets[index + 1])
+        return bytes(self.text_blob[start:end]).decode("utf-8")
+
+    def __getitem__(self, index):
+        index = int(index)
+        if index < 0:
+            index += len(self)
+        document = dict(self.metadata[index])
+        document["content"] = self.content(index)
+        return document
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class ChunkSubset:
+    """List-like view of some of the chunks of a ChunkStore (like the ones left after deduplicating)"""
+
+    def __init__(self, chunks, positions):
+        self.chunks = chunks
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    def content_hash(self, index):
+        return self.chunks.content_hash(self.positions[index])
+
+    def content(self, index):
+        return self.chunks.content(self.positions[index])
+
+    def __getitem__(self, index):
+        return self.chunks[self.positions[index]]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class ChunkTexts(ChunkSubset):
+    """Like ChunkSubset, but gives just the text of each chunk (what the encoder needs)"""
+
+    def __getitem__(self, index):
+        return self.content(index)
+
+
+def write_chunk_files(output_dir, documents, keep_metadata=False):
+    """Write the text blob, offsets and documents.jsonl for a stream of documents
+
+    The one place the chunk files get written (knowledge bases and the build's
+    spool both use it). Returns (offsets, metadata); metadata is the list of
+    per-chunk dicts that went into documents.jsonl if keep_metadata, else None.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    metadata_list = [] if keep_metadata else None
+    # 8 bytes per chunk, and the number of documents doesn't have to be known up front
+    offsets = array.array("q", [0])
+    with open(os.path.join(output_dir, TEXT_FILE), "wb") as text_file, \
+            open(os.path.join(output_dir, DOCUMENTS_FILE), "w", encoding="utf-8") as documents_file:
+        for i, document in enumerate(documents):
+            content = document.get("content", "")
+            content_bytes = content.encode("utf-8")
+            text_file.write(content_bytes)
+            offsets.append(offsets[-1] + len(content_bytes))
+
+            metadata = {key: value for key, value in document.items() if key != "content"}
+            metadata.setdefault("id", f"doc_{i}")
+            metadata["content_hash"] = content_hash(content)
+            documents_file.write(json.dumps(metadata, ensure_ascii=False) + "\n")
+            if keep_metadata:
+                metadata_list.append(metadata)
+
+    offsets = np.frombuffer(offsets, dtype=np.int64)
+    np.save(os.path.join(output_dir, OFFSETS_FILE), offsets)
+    return offsets, metadata_list
+
+
+def open_text_blob(output_dir, text_bytes):
+    """Memory-map the text blob of a folder"""
+    if text_bytes > 0:
+        return np.memmap(os.path.join(output_dir, TEXT_FILE), dtype=np.uint8, mode="r")
+    # np.memmap refuses empty files
+    return np.zeros(0, dtype=np.uint8)
+
+
+def spool_documents(documents, spool_dir):
+    """Write a stream of documents into a text blob on disk and return a ChunkStore over it
+
+    Only the metadata (with the content hash) and the offsets stay in memory, so
+    reading a big corpus doesn't hold all of its text in RAM.
+    """
+    offsets, metadata = write_chunk_files(spool_dir, documents, keep_metadata=True)
+    return ChunkStore(metadata, offsets, open_text_blob(spool_dir, int(offsets[-1])))
+
+
+def write_knowledge_base(output_dir, embeddings, documents, model_name, extra_info=None):
+    """Write embeddings and documents to a knowledge base folder and return the manifest"""
+    os.makedirs(output_dir, exist_ok=True)
+
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    if embeddings.shape[0] != len(documents):
+        raise ValueError(f"Got {embeddings.shape[0]} embeddings but {len(documents)} documents")
+
+    # Embedding block
+    np.save(os.path.join(output_dir, EMBEDDINGS_FILE), embeddings)
+
+    # Text blob plus offsets, and the rest of each document as JSON lines
+    offsets, _ = write_chunk_files(output_dir, documents)
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "num_documents": int(embeddings.shape[0]),
+        "embedding_dim": int(embeddings.shape[1]),
+        "embedding_dtype": "float32",
+        "model_used": model_name,
+        "text_bytes": int(offsets[-1]),
+        "files": {
+            "embeddings": EMBEDDINGS_FILE,
+            "offsets": OFFSETS_FILE,
+            "text": TEXT_FILE,
+            "documents": DOCUMENTS_FILE,
+        },
+    }
+    if extra_info:
+        manifest.update(extra_info)
+
+    # Manifest goes last so a half-written folder never looks complete
+    with open(os.path.join(output_dir, MANIFEST_FILE), "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+
+    return manifest
+
+
+def read_manifest_file(manifest_path):
+    """Read and check a manifest file"""
+    with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+        manifest = json.load(manifest_file)
+
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported knowledge base format version: {manifest.get('format_version')} "
+                         f"(expected {FORMAT_VERSION})")
+    return manifest
+
+
+def read_manifest(kb_dir):
+    """Read and check the manifest of a knowledge base folder"""
+    return read_manifest_file(os.path.join(kb_dir, MANIFEST_FILE))
+
+
+def load_knowledge_base(kb_dir):
+    """Open a knowledge base folder with memory maps (nothing big is read into RAM)"""
+    manifest = read_manifest(kb_dir)
+    files = manifest["files"]
+
+    embeddings = np.load(os.path.join(kb_dir, files["embeddings"]), mmap_mode="r")
+    offsets = np.load(os.path.join(kb_dir, files["offsets"]), mmap_mode="r")
+
+    text_blob = open_text_blob(kb_dir, manifest["text_bytes"])
+
+    with open(os.path.join(kb_dir, files["documents"]), "r", encoding="utf-8") as documents_file:
+        metadata = [json.loads(line) for line in documents_file if line.strip()]
+
+    if embeddings.shape != (manifest["num_documents"], manifest["embedding_dim"]):
+        raise ValueError(f"Embedding block shape {embeddings.shape} does not match the manifest")
+    if len(metadata) != manifest["num_documents"] or len(offsets) != manifest["num_documents"] + 1:
+        raise ValueError("Document files do not match the manifest")
+
+    return {
+        "embeddings": embeddings,
+        "documents": ChunkStore(metadata, offsets, text_blob),
+        "num_documents": manifest["num_documents"],
+        "embedding_dim": manifest["embedding_dim"],
+        "manifest": manifest,
+        "path": kb_dir,
+    }
+
+
+def knowledge_base_files(manifest):
+    """All data files that belong to a knowledge base (the manifest itself not included)"""
+    return list(dict.fromkeys(manifest["files"].values()))
+
+
+def add_files_to_manifest(kb_dir, new_files, extra_info=None):
+    """Register extra files (like a search index) written next to an existing knowledge base"""
+    manifest = read_manifest(kb_dir)
+    manifest["files"].update(new_files)
+    if extra_info:
+        manifest.update(extra_info)
+
+    # Write to a temp file and swap it in so readers never see a half-written manifest
+    temp_path = os.path.join(kb_dir, MANIFEST_FILE + ".tmp")
+    with open(temp_path, "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    os.replace(temp_path, os.path.join(kb_dir, MANIFEST_FILE))
+    return manifest
+
+
+def upload_knowledge_base(bucket, kb_dir, prefix):
+    """Upload every file of a knowledge base folder under a prefix in a storage bucket"""
+    manifest = read_manifest(kb_dir)
+
+    # Manifest last, same reason as when writing locally
+    for file_name in knowledge_base_files(manifest) + [MANIFEST_FILE]:
+        blob = bucket.blob(f"{prefix}/{file_name}")
+        blob.upload_from_filename(os.path.join(kb_dir, file_name))
+    return prefix
+
+
+def download_knowledge_base(bucket, prefix, local_dir):
+    """Download a knowledge base folder from a storage bucket unless it is already on disk"""
+    if os.path.exists(os.path.join(local_dir, MANIFEST_FILE)):
+        return local_dir
+
+    os.makedirs(local_dir, exist_ok=True)
+
+    # Get the manifest first (under a temp name) so we know which files to fetch
+    manifest_temp_path = os.path.join(local_dir, MANIFEST_FILE + ".part")
+    bucket.blob(f"{prefix}/{MANIFEST_FILE}").download_to_filename(manifest_temp_path)
+    manifest = read_manifest_file(manifest_temp_path)
+
+    for file_name in knowledge_base_files(manifest):
+        blob = bucket.blob(f"{prefix}/{file_name}")
+        # Download to a temp name first so an interrupted download is never picked up
+        temp_path = os.path.join(local_dir, file_name + ".part")
+        blob.download_to_filename(temp_path)
+        os.replace(temp_path, os.path.join(local_dir, file_name))
+
+    # The manifest only shows up once everything else is in place
+    os.replace(manifest_temp_path, os.path.join(local_dir, MANIFEST_FILE))
+    return local_dir
+
+
+def publish_latest_knowledge_base(bucket, prefix, pointer_blob=LATEST_POINTER_BLOB):
+    """Point the "latest" blob at an uploaded knowledge base folder (call after the upload finished)"""
+    manifest = json.loads(bucket.blob(f"{prefix}/{MANIFEST_FILE}").download_as_text())
+    pointer = {"prefix": prefix, "version": manifest.get("version"), "num_documents": manifest["num_documents"]}
+    bucket.blob(pointer_blob).upload_from_string(json.dumps(pointer), content_type="application/json")
+    return pointer
+
+
+def resolve_knowledge_base_prefix(bucket, prefix=None, pointer_blob=LATEST_POINTER_BLOB):
+    """The knowledge base folder to load: prefix if one is given, otherwise the one the latest pointer names"""
+    if prefix:
+        return prefix
+
+    pointer_blob = bucket.blob(pointer_blob)
+    if not pointer_blob.exists():
+        raise FileNotFoundError(f"No {pointer_blob.name} in the bucket - upload a knowledge base with "
+                                f"scripts/build_features.py --upload or set KNOWLEDGE_BASE_PREFIX")
+    return json.loads(pointer_blob.download_as_text())["prefix"]
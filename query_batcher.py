@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+query_batcher.py - Micro-batching for query encoding
+
+Every Streamlit session runs in its own thread. Instead of each one calling the
+embedding model with a single query, they drop their query in a shared queue.
+One worker thread waits a few milliseconds (or until the batch is full), encodes
+everything in one forward pass, and hands each session its own vectors back.
+"""
+
+import queue
+import threading
+import time
+from collections import Counter
+
+
+class _PendingQuery:
+    """One session's texts waiting to be encoded"""
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class QueryBatcher:
+    """Collects concurrent encode() calls and runs them through the model together"""
+
+    def __init__(self, model, max_batch_size=32, max_wait_ms=5.0, report_every=100):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.report_every = report_every
+
+        self.pending = queue.Queue()
+        self.stats_lock = threading.Lock()
+        self.batch_sizes = Counter()
+        self.queue_depths = Counter()
+        self.max_queue_depth = 0
+        self.batches_run = 0
+
+        self.worker = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+        self.worker.start()
+
+    def encode(self, sentences):
+        """Encode a list of texts, same result as model.encode(sentences) (a numpy array)"""
+        request = _PendingQuery(list(sentences))
+        self.pending.put(request)
+        request.done.wait()
+
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _collect_batch(self):
+        """Block for the first request, then gather more until the batch is full or time is up"""
+        batch = [self.pending.get()]
+        batch_items = len(batch[0].texts)
+        deadline = time.monotonic() + self.max_wait
+
+        while batch_items < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self.pending.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            batch_items += len(request.texts)
+
+        return batch, batch_items
+
+    def _run(self):
+        while True:
+            batch, batch_items = self._collect_batch()
+            self._record(batch_items, self.pending.qsize())
+
+            try:
+                all_texts = [text for request in batch for text in request.texts]
+                embeddings = self.model.encode(all_texts, batch_size=max(len(all_texts), 1),
+                                               show_progress_bar=False)
+
+                # Hand every session back its own rows
+                start = 0
+                for request in batch:
+                    request.result = embeddings[start:start + len(request.texts)]
+                    start += len(request.texts)
+
+            except Exception as error:
+                for request in batch:
+                    request.error = error
+
+            for request in batch:
+                request.done.set()
+
+    def _record(self, batch_items, queue_depth):
+        with self.stats_lock:
+            self.batches_run += 1
+            self.batch_sizes[batch_items] += 1
+            self.queue_depths[queue_depth] += 1
+            self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+
+        if self.report_every and self.batches_run % self.report_every == 0:
+            self.print_stats()
+
+    def stats(self):
+        """Queue depth and batch size histograms (value -> how many batches saw it)"""
+        with self.stats_lock:
+            return {
+                "batches_run": self.batches_run,
+                "queue_depth_now": self.pending.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+                "queue_depth_histogram": dict(sorted(self.queue_depths.items())),
+            }
+
+    def print_stats(self):
+        stats = self.stats()
+        print(f"📦 Query batcher: {stats['batches_run']} batches, "
+              f"queue depth now {stats['queue_depth_now']} (max {stats['max_queue_depth']})")
+        print(f"   Batch sizes: {stats['batch_size_histogram']}")
+        print(f"   Queue depths: {stats['queue_depth_histogram']}")
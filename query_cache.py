@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+query_cache.py - Cache for repeated questions
+
+Students ask the same things over and over ("what is shutdown margin"). This keeps
+the query vector and the ranked search results for recent questions, so a repeat
+skips both the encoder and the corpus scan. Entries expire after a while, the
+least recently used ones are dropped when the cache is full, and everything is
+thrown away when the knowledge base version changes.
+
+Every report_every lookups the hit/miss counters are printed to the log, so the
+size and TTL can be tuned from real traffic.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_query(text):
+    """Lowercase, trim and squash whitespace so trivial differences still hit the cache"""
+    text = re.sub(r"\s+", " ", text.strip().lower())
+    return text.rstrip("?!. ")
+
+
+class QueryCache:
+    """Thread-safe LRU cache with a time-to-live, keyed on (normalized query, top_k)"""
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600, version=None, report_every=100):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version = version
+        self.report_every = report_every
+
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def check_version(self, version):
+        """Drop everything if the knowledge base changed since the entries were stored"""
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+
+    def get(self, query, top_k):
+        """Return the cached entry dict or None"""
+        key = (normalize_query(query), top_k)
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.monotonic() - entry["stored_at"] > self.ttl_seconds:
+                del self.entries[key]
+                self.expired += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+            else:
+                self.entries.move_to_end(key)
+                self.hits += 1
+            lookups = self.hits + self.misses
+
+        if self.report_every and lookups % self.report_every == 0:
+            self.print_stats()
+        return entry
+
+    def put(self, query, top_k, query_vector, indices, scores):
+        """Remember the query vector and ranked results for a query"""
+        key = (normalize_query(query), top_k)
+
+        with self.lock:
+            self.entries[key] = {
+                "query_vector": query_vector,
+                "indices": indices,
+                "scores": scores,
+                "stored_at": time.monotonic(),
+            }
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        """Hit/miss counters so we can size the cache"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "version": self.version,
+            }
+
+    def print_stats(self):
+        stats = self.stats()
+        print(f"🗃️ Query cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"(hit rate {stats['hit_rate']:.1%}), {stats['entries']}/{stats['max_entries']} entries, "
+              f"{stats['expired']} expired, {stats['evictions']} evicted")
@@ -0,0 +1,629 @@
+#!/usr/bin/env python3
+"""
+retrieval.py - Vector search over the nuclear knowledge base
+
+Exact search compares the query with every chunk. That is fine for a few thousand
+chunks, but it grows with the corpus, so this module also has an approximate
+nearest-neighbour index (IVF: the chunks are grouped around k-means centroids and
+a query only scans the closest groups). There is also a quantized index: int8
+codes and 1-bit sign codes that are scanned first, with only a short list
+re-ranked against the float32 embeddings. Both are built offline by
+scripts/build_features.py and stored next to the embeddings.
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+
+from knowledge_base import add_files_to_manifest
+
+# Below this many chunks exact search is fast enough, so we do not bother with the index
+DEFAULT_EXACT_THRESHOLD = 20000
+
+# How many groups to scan per query (more = better recall, slower)
+DEFAULT_NPROBE = 16
+
+# recall@10 an approximate index has to reach in the build's report before it is picked
+DEFAULT_MIN_RECALL = 0.95
+
+IVF_CENTROIDS_FILE = "ivf_centroids.npy"
+IVF_LIST_OFFSETS_FILE = "ivf_list_offsets.npy"
+IVF_LIST_IDS_FILE = "ivf_list_ids.npy"
+
+# Quantized index: how many chunks survive the Hamming prefilter, and the re-rank shortlist (x k)
+DEFAULT_HAMMING_CANDIDATES = 2000
+DEFAULT_RERANK_FACTOR = 4
+
+INT8_CODES_FILE = "int8_codes.npy"
+INT8_SCALES_FILE = "int8_scales.npy"
+SIGN_BITS_FILE = "sign_bits.npy"
+
+# Rough size of the per-block working set in QuantizedIndex.search
+QUANTIZED_BLOCK_BYTES = 64 * 1024 * 1024
+
+# Number of set bits in every possible byte, for Hamming distances
+POPCOUNT_TABLE = np.unpackbits(np.arange(256, dtype=np.uint8)[:, np.newaxis], axis=1).sum(axis=1).astype(np.uint16)
+
+
+def top_k(similarities, k):
+    """Indices and scores of the k largest values in each row, best first
+
+    Uses argpartition so only the k winners get sorted instead of the whole row.
+    """
+    similarities = np.atleast_2d(similarities)
+    k = min(k, similarities.shape[1])
+    if k <= 0:
+        empty = np.zeros((similarities.shape[0], 0), dtype=np.int64)
+        return empty, empty.astype(similarities.dtype)
+
+    if k < similarities.shape[1]:
+        winners = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    else:
+        winners = np.broadcast_to(np.arange(k), (similarities.shape[0], k))
+    winner_scores = np.take_along_axis(similarities, winners, axis=1)
+
+    order = np.argsort(-winner_scores, axis=1)
+    return np.take_along_axis(winners, order, axis=1), np.take_along_axis(winner_scores, order, axis=1)
+
+
+def search_embeddings(embeddings, queries, k):
+    """Exact top-k for a batch of query vectors with a single matrix multiply"""
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    similarities = queries @ np.asarray(embeddings).T
+    return top_k(similarities, k)
+
+
+def drop_duplicate_results(indices, scores, chunk_hash, k):
+    """Keep the first (best) result for each content hash, at most k of them"""
+    seen_hashes = set()
+    kept_indices = []
+    kept_scores = []
+
+    for index, score in zip(indices, scores):
+        text_hash = chunk_hash(index)
+        if text_hash in seen_hashes:
+            continue
+        seen_hashes.add(text_hash)
+        kept_indices.append(index)
+        kept_scores.append(score)
+        if len(kept_indices) == k:
+            break
+
+    return np.asarray(kept_indices, dtype=np.int64), np.asarray(kept_scores, dtype=np.float32)
+
+
+class ExactIndex:
+    """Brute-force search: one dot product against every chunk"""
+
+    index_type = "exact"
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    def __len__(self):
+        return len(self.embeddings)
+
+    def search(self, queries, k):
+        """Return (indices, scores), each of shape (num_queries, k)"""
+        return search_embeddings(self.embeddings, queries, k)
+
+    def bytes_per_query(self, k=10):
+        """Bytes of the knowledge base one query reads: every embedding"""
+        return int(self.embeddings.nbytes)
+
+
+class IVFIndex:
+    """Inverted-file index: chunks are bucketed by their closest centroid"""
+
+    index_type = "ivf"
+
+    def __init__(self, embeddings, centroids, list_offsets, list_ids, nprobe=DEFAULT_NPROBE):
+        self.embeddings = embeddings
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+        self.nprobe = nprobe
+
+    def __len__(self):
+        return len(self.embeddings)
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    def candidates(self, query, nprobe):
+        """Ids of every chunk in the nprobe groups closest to one query"""
+        centroid_scores = self.centroids @ query
+        nprobe = min(nprobe, self.nlist)
+        closest_lists = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+        parts = [self.list_ids[self.list_offsets[c]:self.list_offsets[c + 1]] for c in closest_lists]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    def search(self, queries, k, nprobe=None):
+        """Return (indices, scores), each of shape (num_queries, k); missing slots get -1 / -inf"""
+        queries = np.atleast_2d(to_numpy(queries))
+        nprobe = nprobe or self.nprobe
+
+        all_indices = np.full((len(queries), k), -1, dtype=np.int64)
+        all_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+
+        for row, query in enumerate(queries):
+            candidate_ids = np.sort(self.candidates(query, nprobe))
+            if len(candidate_ids) == 0:
+                continue
+
+            order, scores = top_k(np.asarray(self.embeddings[candidate_ids]) @ query, k)
+
+            all_indices[row, :order.shape[1]] = candidate_ids[order[0]]
+            all_scores[row, :order.shape[1]] = scores[0]
+
+        return all_indices, all_scores
+
+    def index_bytes(self):
+        return int(self.centroids.nbytes + self.list_offsets.nbytes + self.list_ids.nbytes)
+
+    def bytes_per_query(self, k=10, nprobe=None):
+        """Bytes one query reads: the centroids, then the embeddings of about nprobe/nlist of the chunks"""
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        scanned_rows = len(self) * nprobe / self.nlist
+        return int(self.centroids.nbytes + scanned_rows * (self.embeddings.shape[1] * 4 + 8))
+
+    def tuning_settings(self):
+        """The nprobe values worth trying in a recall report"""
+        return [{"nprobe": nprobe} for nprobe in (1, 2, 4, 8, 16, 32, 64) if nprobe <= self.nlist]
+
+
+class QuantizedIndex:
+    """Scan compact codes first (sign bits, then int8), re-rank a short list with the float32 embeddings"""
+
+    index_type = "quantized"
+
+    def __init__(self, embeddings, int8_codes, int8_scales, sign_bits,
+                 hamming_candidates=DEFAULT_HAMMING_CANDIDATES, rerank_factor=DEFAULT_RERANK_FACTOR):
+        self.embeddings = embeddings
+        self.int8_codes = int8_codes
+        self.int8_scales = int8_scales
+        self.sign_bits = sign_bits
+        self.hamming_candidates = hamming_candidates
+        self.rerank_factor = rerank_factor
+
+    def __len__(self):
+        return len(self.int8_codes)
+
+    def search(self, queries, k, hamming_candidates=None, rerank_factor=None):
+        """Return (indices, scores), each of shape (num_queries, k); missing slots get -1 / -inf"""
+        queries = np.atleast_2d(to_numpy(queries))
+        hamming_candidates = min(hamming_candidates or self.hamming_candidates, len(self))
+        shortlist_size = min(k * (rerank_factor or self.rerank_factor), hamming_candidates)
+
+        all_indices = np.full((len(queries), k), -1, dtype=np.int64)
+        all_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        if len(self) == 0:
+            return all_indices, all_scores
+
+        # All three stages run on a block of queries at once; the block is sized so the Hamming
+        # distances and the gathered int8 candidates (as float32) stay around QUANTIZED_BLOCK_BYTES
+        bytes_per_query = max(len(self) * 8, hamming_candidates * self.int8_codes.shape[1] * 4)
+        query_block = max(1, QUANTIZED_BLOCK_BYTES // bytes_per_query)
+        for start in range(0, len(queries), query_block):
+            block = queries[start:start + query_block]
+
+            # Stage 1: Hamming distance on the sign bits, every query of the block in one call
+            distances = hamming_distances(self.sign_bits, np.packbits(block > 0, axis=1))
+            if hamming_candidates < len(self):
+                candidate_ids = np.argpartition(distances, hamming_candidates - 1, axis=1)[:, :hamming_candidates]
+                candidate_ids = np.sort(candidate_ids, axis=1)
+            else:
+                candidate_ids = np.broadcast_to(np.arange(len(self)), (len(block), len(self)))
+
+            # Stage 2: approximate dot products from the int8 codes
+            candidate_codes = np.asarray(self.int8_codes[candidate_ids], dtype=np.float32)
+            int8_scores = np.matmul(candidate_codes, (block * self.int8_scales)[:, :, np.newaxis])[:, :, 0]
+            shortlist, _ = top_k(int8_scores, shortlist_size)
+            shortlist_ids = np.sort(np.take_along_axis(candidate_ids, shortlist, axis=1), axis=1)
+
+            # Stage 3: exact float32 scores for the short list only
+            shortlist_vectors = np.asarray(self.embeddings[shortlist_ids], dtype=np.float32)
+            float_scores = np.matmul(shortlist_vectors, block[:, :, np.newaxis])[:, :, 0]
+            order, scores = top_k(float_scores, k)
+            all_indices[start:start + len(block), :order.shape[1]] = np.take_along_axis(shortlist_ids, order, axis=1)
+            all_scores[start:start + len(block), :order.shape[1]] = scores
+
+        return all_indices, all_scores
+
+    def index_bytes(self):
+        return int(self.int8_codes.nbytes + self.int8_scales.nbytes + self.sign_bits.nbytes)
+
+    def bytes_per_query(self, k=10, hamming_candidates=None, rerank_factor=None):
+        """Bytes one query reads: all sign bits, the int8 rows of the candidates, the float32 rows of the short list"""
+        hamming_candidates = min(hamming_candidates or self.hamming_candidates, len(self))
+        shortlist_size = min(k * (rerank_factor or self.rerank_factor), hamming_candidates)
+        return int(self.sign_bits.nbytes + hamming_candidates * self.int8_codes.shape[1] +
+                   shortlist_size * self.embeddings.shape[1] * 4)
+
+    def tuning_settings(self):
+        """Prefilter sizes and re-rank factors worth trying in a recall report"""
+        settings = []
+        for hamming_candidates in (500, 1000, 2000, 5000):
+            for rerank_factor in (1, 4):
+                settings.append({"hamming_candidates": hamming_candidates, "rerank_factor": rerank_factor})
+        return settings
+
+
+def hamming_distances(packed_codes, packed_queries):
+    """Number of differing bits between every packed code row and each packed query: shape (queries, codes)"""
+    packed_queries = np.atleast_2d(packed_queries)
+    packed_codes = np.asarray(packed_codes)
+    if packed_codes.shape[1] % 8 == 0:
+        # 8 bytes at a time: 6 words per chunk instead of 48 bytes for 384 dims
+        packed_codes = np.ascontiguousarray(packed_codes).view(np.uint64)
+        packed_queries = np.ascontiguousarray(packed_queries).view(np.uint64)
+
+    # One word column at a time against every query, so numpy works on long (queries x codes) rows
+    # instead of summing over a 6-wide axis
+    distances = np.zeros((len(packed_queries), len(packed_codes)), dtype=np.uint16)
+    for word in range(packed_codes.shape[1]):
+        differing = np.bitwise_xor(packed_codes[:, word], packed_queries[:, word, np.newaxis])
+        if hasattr(np, "bitwise_count"):
+            # numpy 2.0+ has a native popcount
+            distances += np.bitwise_count(differing)
+        else:
+            distances += POPCOUNT_TABLE[differing.view(np.uint8)].reshape(differing.shape + (-1,)).sum(
+                axis=-1, dtype=np.uint16)
+    return distances
+
+
+def quantize_int8(embeddings):
+    """Scalar int8 codes with one scale per dimension (value ~= code * scale)"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    scales = np.abs(embeddings).max(axis=0) / 127
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    codes = np.clip(np.round(embeddings / scales), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def build_quantized_index(embeddings):
+    """Build int8 and sign-bit codes for the embeddings"""
+    int8_codes, int8_scales = quantize_int8(embeddings)
+    sign_bits = np.packbits(np.asarray(embeddings) > 0, axis=1)
+    return QuantizedIndex(embeddings, int8_codes, int8_scales, sign_bits)
+
+
+def save_quantized_index(kb_dir, index):
+    """Save the quantized codes into a knowledge base folder and register them in the manifest"""
+    np.save(os.path.join(kb_dir, INT8_CODES_FILE), index.int8_codes)
+    np.save(os.path.join(kb_dir, INT8_SCALES_FILE), index.int8_scales)
+    np.save(os.path.join(kb_dir, SIGN_BITS_FILE), index.sign_bits)
+
+    return add_files_to_manifest(
+        kb_dir,
+        {
+            "int8_codes": INT8_CODES_FILE,
+            "int8_scales": INT8_SCALES_FILE,
+            "sign_bits": SIGN_BITS_FILE,
+        },
+        extra_info={"quantized_index": {"int8_bytes": int(index.int8_codes.nbytes),
+                                        "sign_bytes": int(index.sign_bits.nbytes)}},
+    )
+
+
+def load_quantized_index(knowledge_base, hamming_candidates=DEFAULT_HAMMING_CANDIDATES,
+                         rerank_factor=DEFAULT_RERANK_FACTOR, **unused_options):
+    """Open the quantized codes stored with a loaded knowledge base (memory-mapped)"""
+    files = knowledge_base["manifest"]["files"]
+    kb_dir = knowledge_base["path"]
+
+    return QuantizedIndex(
+        knowledge_base["embeddings"],
+        np.load(os.path.join(kb_dir, files["int8_codes"]), mmap_mode="r"),
+        np.load(os.path.join(kb_dir, files["int8_scales"])),
+        np.load(os.path.join(kb_dir, files["sign_bits"]), mmap_mode="r"),
+        hamming_candidates=hamming_candidates,
+        rerank_factor=rerank_factor,
+    )
+
+
+def train_ivf_centroids(embeddings, nlist, iterations=10, sample_size=50000, seed=0):
+    """Spherical k-means on (a sample of) the embeddings"""
+    rng = np.random.default_rng(seed)
+
+    sample_ids = np.sort(rng.choice(len(embeddings), size=min(len(embeddings), sample_size), replace=False))
+    sample = np.asarray(embeddings[sample_ids], dtype=np.float32)
+
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=nlist)
+
+        # Re-seed empty groups with random points so we keep nlist useful centroids
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.maximum(norms, 1e-12)
+
+    return centroids.astype(np.float32)
+
+
+def assign_to_centroids(embeddings, centroids, block_size=65536):
+    """Closest centroid for every embedding (done in blocks to keep memory flat)"""
+    assignments = np.empty(len(embeddings), dtype=np.int64)
+    for start in range(0, len(embeddings), block_size):
+        block = np.asarray(embeddings[start:start + block_size], dtype=np.float32)
+        assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def default_nlist(num_vectors):
+    """Number of IVF lists for a corpus: about 4 * sqrt(n)"""
+    return max(1, min(int(4 * np.sqrt(num_vectors)), num_vectors))
+
+
+def build_ivf_index(embeddings, nlist=None, iterations=10, centroids=None):
+    """Build an IVF index for the embeddings (nlist defaults to default_nlist)
+
+    Pass centroids that were already trained (on these or nearly the same
+    embeddings) to skip the k-means.
+    """
+    if centroids is None:
+        if nlist is None:
+            nlist = default_nlist(len(embeddings))
+        nlist = max(1, min(nlist, len(embeddings)))
+        centroids = train_ivf_centroids(embeddings, nlist, iterations=iterations)
+    nlist = len(centroids)
+    assignments = assign_to_centroids(embeddings, centroids)
+
+    # Group chunk ids by list, offsets tell where each list starts
+    list_ids = np.argsort(assignments, kind="stable").astype(np.int64)
+    list_offsets = np.zeros(nlist + 1, dtype=np.int64)
+    list_offsets[1:] = np.cumsum(np.bincount(assignments, minlength=nlist))
+
+    return IVFIndex(embeddings, centroids, list_offsets, list_ids)
+
+
+def save_ivf_index(kb_dir, index):
+    """Save an IVF index into a knowledge base folder and register it in the manifest"""
+    np.save(os.path.join(kb_dir, IVF_CENTROIDS_FILE), index.centroids)
+    np.save(os.path.join(kb_dir, IVF_LIST_OFFSETS_FILE), index.list_offsets)
+    np.save(os.path.join(kb_dir, IVF_LIST_IDS_FILE), index.list_ids)
+
+    return add_files_to_manifest(
+        kb_dir,
+        {
+            "ivf_centroids": IVF_CENTROIDS_FILE,
+            "ivf_list_offsets": IVF_LIST_OFFSETS_FILE,
+            "ivf_list_ids": IVF_LIST_IDS_FILE,
+        },
+        extra_info={"ivf_index": {"nlist": index.nlist}},
+    )
+
+
+def load_ivf_index(knowledge_base, nprobe=DEFAULT_NPROBE, **unused_options):
+    """Open the IVF index stored with a loaded knowledge base (memory-mapped)"""
+    files = knowledge_base["manifest"]["files"]
+    kb_dir = knowledge_base["path"]
+
+    return IVFIndex(
+        knowledge_base["embeddings"],
+        np.load(os.path.join(kb_dir, files["ivf_centroids"])),
+        np.load(os.path.join(kb_dir, files["ivf_list_offsets"]), mmap_mode="r"),
+        np.load(os.path.join(kb_dir, files["ivf_list_ids"]), mmap_mode="r"),
+        nprobe=nprobe,
+    )
+
+
+class RetrievalEngine:
+    """Owns the corpus matrix (on the GPU if we have one) so queries only pay for the matmul and top-k"""
+
+    def __init__(self, embeddings, device="cpu", use_fp16=False, search_index=None):
+        self.embeddings = embeddings
+        self.device = device
+        self.use_fp16 = use_fp16
+        self.num_documents = len(embeddings)
+
+        # Approximate index only matters when one was picked for this corpus size
+        if search_index is not None and search_index.index_type == "exact":
+            search_index = None
+        self.search_index = search_index
+
+        # The exact path's corpus matrix. An index answers every query on its own (and
+        # re-ranks from the memory map), so then we don't load a full copy at all
+        self._corpus = None
+        self.corpus_lock = threading.Lock()
+        if search_index is None:
+            self._corpus = self.load_corpus()
+
+    def load_corpus(self):
+        if self.device == "cuda":
+            # torch is only needed for the GPU path
+            import torch
+
+            # Copy once (the memory map is read-only) and keep it resident on the device
+            dtype = torch.float16 if self.use_fp16 else torch.float32
+            return torch.from_numpy(np.array(self.embeddings, dtype=np.float32)).to(self.device, dtype=dtype)
+
+        # Already float32 and contiguous for the memory-mapped file, so this does not copy
+        return np.ascontiguousarray(self.embeddings, dtype=np.float32)
+
+    @property
+    def corpus(self):
+        """The corpus matrix for exact search, loaded on first use when an index was in charge"""
+        if self._corpus is None:
+            with self.corpus_lock:
+                if self._corpus is None:
+                    self._corpus = self.load_corpus()
+        return self._corpus
+
+    @property
+    def mode(self):
+        if self.search_index is not None:
+            return self.search_index.index_type
+        return f"exact-{self.device}"
+
+    def search(self, queries, k):
+        """Return (indices, scores) numpy arrays of shape (num_queries, k), best first"""
+        if self.search_index is not None:
+            return self.search_index.search(to_numpy(queries), k)
+
+        if self.device == "cuda":
+            import torch
+
+            query_tensor = torch.as_tensor(queries).to(self.device, dtype=self.corpus.dtype)
+            if query_tensor.dim() == 1:
+                query_tensor = query_tensor.unsqueeze(0)
+            similarities = query_tensor @ self.corpus.T
+            scores, indices = torch.topk(similarities, min(k, self.num_documents), dim=1)
+            return indices.cpu().numpy(), scores.float().cpu().numpy()
+
+        return search_embeddings(self.corpus, to_numpy(queries), k)
+
+
+def to_numpy(vectors):
+    """Turn a torch tensor (on any device) or array-like into a float32 numpy array"""
+    if hasattr(vectors, "cpu"):
+        vectors = vectors.detach().cpu().float().numpy()
+    return np.asarray(vectors, dtype=np.float32)
+
+
+# Index types we know how to open, and the manifest file key that tells us one was built
+ANN_INDEX_LOADERS = {
+    "ivf": (load_ivf_index, "ivf_centroids"),
+    "quantized": (load_quantized_index, "int8_codes"),
+}
+
+
+def load_search_index(knowledge_base, index_type=None, exact_threshold=DEFAULT_EXACT_THRESHOLD, **options):
+    """Pick the search index for a knowledge base
+
+    index_type defaults to the one the build chose ("ann_index" in the manifest,
+    see choose_search_index); "low_memory" gives the one it found reads the least
+    per query. The remaining options (nprobe, hamming_candidates,
+    rerank_factor) go to its loader; any left as None come from the settings the
+    build measured for it. We stay exact if nothing was built or the corpus is
+    below exact_threshold.
+    """
+    recorded = knowledge_base["manifest"].get("ann_index", {})
+    if index_type == "low_memory":
+        # The index the build found reads the least per query
+        recorded = recorded.get("low_memory", {})
+        index_type = None
+    if not index_type:
+        index_type = recorded.get("type")
+
+    options = {name: value for name, value in options.items() if value is not None}
+    if index_type == recorded.get("type"):
+        options = {**recorded.get("settings", {}), **options}
+    else:
+        # Asked for another index: use the best settings the build measured for it
+        measured = knowledge_base["manifest"].get("ann_index", {}).get("measured", {})
+        options = {**measured.get(index_type, {}).get("settings", {}), **options}
+
+    if index_type and index_type != "exact" and knowledge_base["num_documents"] >= exact_threshold:
+        loader, required_file = ANN_INDEX_LOADERS.get(index_type, (None, None))
+        if loader and required_file in knowledge_base["manifest"]["files"]:
+            return loader(knowledge_base, **options)
+        print(f"⚠️ Index type {index_type} is not available, using exact search")
+
+    return ExactIndex(knowledge_base["embeddings"])
+
+
+def recall_report(embeddings, ann_index, queries=None, k=10, num_queries=200, settings=None):
+    """Compare an approximate index with exact search: recall@k, time and MB read per query for each setting
+
+    settings is a list of keyword arguments for ann_index.search(); by default the
+    index's own tuning_settings() (nprobe for IVF, prefilter/re-rank sizes for quantized).
+    """
+    if queries is None:
+        # No real queries given, so use a random sample of the chunks themselves
+        rng = np.random.default_rng(0)
+        query_ids = np.sort(rng.choice(len(embeddings), size=min(num_queries, len(embeddings)), replace=False))
+        queries = np.asarray(embeddings[query_ids], dtype=np.float32)
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+
+    if settings is None:
+        settings = ann_index.tuning_settings()
+
+    exact_start = time.time()
+    exact_indices, _ = ExactIndex(embeddings).search(queries, k)
+    exact_ms = (time.time() - exact_start) * 1000 / len(queries)
+
+    report = []
+    for options in settings:
+        ann_start = time.time()
+        ann_indices, _ = ann_index.search(queries, k, **options)
+        ann_ms = (time.time() - ann_start) * 1000 / len(queries)
+
+        hits = sum(len(set(exact_row) & set(ann_row)) for exact_row, ann_row in zip(exact_indices, ann_indices))
+        report.append({
+            "settings": options,
+            "recall_at_k": hits / (len(queries) * exact_indices.shape[1]),
+            "ms_per_query": ann_ms,
+            "exact_ms_per_query": exact_ms,
+            "mb_per_query": ann_index.bytes_per_query(k=k, **options) / 1024 / 1024,
+            "exact_mb_per_query": ExactIndex(embeddings).bytes_per_query(k=k) / 1024 / 1024,
+        })
+
+    return report
+
+
+def print_recall_report(report, k=10):
+    """Print the recall report as a small table"""
+    print(f"   recall@{k} | ms/query (exact) | MB read/query (exact) | settings")
+    for row in report:
+        settings = ", ".join(f"{name}={value}" for name, value in row["settings"].items())
+        print(f"   {row['recall_at_k']:>9.3f} | {row['ms_per_query']:.3f} ({row['exact_ms_per_query']:.3f}) | "
+              f"{row['mb_per_query']:.2f} ({row['exact_mb_per_query']:.2f}) | {settings}")
+
+
+def choose_search_index(reports, min_recall=DEFAULT_MIN_RECALL):
+    """Pick what the app should search with, from the recall reports of the indexes we built
+
+    reports is {index_type: recall_report(...)}. Each index is judged by its
+    fastest setting that reaches min_recall. The fastest of those is chosen if it
+    beats exact search (otherwise exact is). "low_memory" is the one that reads
+    the fewest MB per query at min_recall, for deploys where the float32
+    embeddings can't stay in RAM (SEARCH_INDEX_TYPE=low_memory in the app).
+    """
+    exact_ms, exact_mb = None, None
+    best_rows = {}
+    for index_type, report in reports.items():
+        for row in report:
+            exact_ms, exact_mb = row["exact_ms_per_query"], row["exact_mb_per_query"]
+        good_rows = [row for row in report if row["recall_at_k"] >= min_recall]
+        if good_rows:
+            best_rows[index_type] = min(good_rows, key=lambda row: row["ms_per_query"])
+
+    choice = {
+        "type": "exact",
+        "settings": {},
+        "min_recall": min_recall,
+        "low_memory": {"type": "exact", "settings": {}},
+        "measured": {"exact": {"ms_per_query": exact_ms, "mb_per_query": exact_mb}},
+    }
+    for index_type, row in best_rows.items():
+        choice["measured"][index_type] = {key: row[key] for key in
+                                          ("settings", "recall_at_k", "ms_per_query", "mb_per_query")}
+
+    if best_rows:
+        fastest_type, fastest = min(best_rows.items(), key=lambda item: item[1]["ms_per_query"])
+        if fastest["ms_per_query"] < exact_ms:
+            choice.update(type=fastest_type, settings=fastest["settings"])
+
+        smallest_type, smallest = min(best_rows.items(), key=lambda item: item[1]["mb_per_query"])
+        if smallest["mb_per_query"] < exact_mb:
+            choice["low_memory"] = {"type": smallest_type, "settings": smallest["settings"]}
+
+    return choice
+
+
+def save_search_choice(kb_dir, choice):
+    """Record in the manifest which index the app should use (and the measurements behind it)"""
+    return add_files_to_manifest(kb_dir, {}, extra_info={"ann_index": choice})
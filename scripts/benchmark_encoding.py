@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+scripts/benchmark_encoding.py - Compare the old and new encode batching
+
+Encodes the same corpus twice, each time in a fresh process so peak memory is
+measured separately:
+  1. file order, fixed batches of 32 (how build_features.py used to do it)
+  2. sorted by token length, packed up to a token budget (how it does it now)
+
+Usage:
+    python scripts/benchmark_encoding.py --corpus data/processed/nuclear_corpus.jsonl
+"""
+
+import argparse
+import multiprocessing
+import resource
+import time
+
+import numpy as np
+import torch
+from sentence_transformers import SentenceTransformer
+
+from corpus_reader import read_documents_from_jsonl
+from encoding import count_tokens, make_file_order_batches, make_token_budget_batches, padded_tokens
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+
+def read_texts(corpus_path, limit=None):
+    """Chunk contents from a corpus JSONL file"""
+    texts = []
+    for document in read_documents_from_jsonl(corpus_path):
+        texts.append(document.get("content", ""))
+        if limit and len(texts) >= limit:
+            break
+    return texts
+
+
+def run_strategy(strategy, corpus_path, device, batch_size, max_tokens, max_batch_size, limit, results):
+    """Runs in its own process: encode the corpus with one batching strategy and record time + peak memory"""
+    texts = read_texts(corpus_path, limit)
+    model = SentenceTransformer(MODEL_NAME, device=device)
+    token_lengths = count_tokens(model.tokenizer, texts, model.max_seq_length)
+
+    if strategy == "file_order":
+        batches = make_file_order_batches(len(texts), batch_size)
+    else:
+        batches = make_token_budget_batches(token_lengths, max_tokens, max_batch_size)
+
+    if device == "cuda":
+        torch.cuda.reset_peak_memory_stats()
+
+    embeddings = np.zeros((len(texts), model.get_sentence_embedding_dimension()), dtype=np.float32)
+    start_time = time.time()
+    for batch in batches:
+        embeddings[batch] = model.encode([texts[position] for position in batch],
+                                         batch_size=len(batch), show_progress_bar=False)
+    elapsed_time = time.time() - start_time
+
+    results[strategy] = {
+        "chunks": len(texts),
+        "batches": len(batches),
+        "real_tokens": sum(token_lengths),
+        "padded_tokens": padded_tokens(batches, token_lengths),
+        "seconds": elapsed_time,
+        "chunks_per_second": len(texts) / elapsed_time if elapsed_time > 0 else 0.0,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "peak_cuda_mb": torch.cuda.max_memory_allocated() / 1024 / 1024 if device == "cuda" else None,
+        "checksum": float(np.abs(embeddings).sum()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark file-order vs token-budget encode batching")
+    parser.add_argument("--corpus", required=True, help="corpus JSONL file")
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--batch-size", type=int, default=32, help="fixed batch size of the old way")
+    parser.add_argument("--max-tokens", type=int, default=8192, help="token budget per batch of the new way")
+    parser.add_argument("--max-batch-size", type=int, default=256, help="most chunks per batch of the new way")
+    parser.add_argument("--limit", type=int, help="only use the first N chunks")
+    arguments = parser.parse_args()
+
+    spawn = multiprocessing.get_context("spawn")
+    results = spawn.Manager().dict()
+
+    for strategy in ("file_order", "token_budget"):
+        print(f"⏱️ Running {strategy}...")
+        worker = spawn.Process(target=run_strategy, args=(
+            strategy, arguments.corpus, arguments.device, arguments.batch_size,
+            arguments.max_tokens, arguments.max_batch_size, arguments.limit, results))
+        worker.start()
+        worker.join()
+
+    print(f"\n📊 Encoding benchmark on {arguments.device}")
+    print(f"{'strategy':<14}{'chunks':>8}{'batches':>9}{'padded/real tokens':>20}"
+          f"{'seconds':>10}{'chunks/s':>10}{'peak RSS MB':>13}{'peak CUDA MB':>14}")
+    for strategy, row in results.items():
+        cuda_text = f"{row['peak_cuda_mb']:.0f}" if row["peak_cuda_mb"] is not None else "-"
+        print(f"{strategy:<14}{row['chunks']:>8}{row['batches']:>9}"
+              f"{row['padded_tokens'] / max(row['real_tokens'], 1):>20.2f}"
+              f"{row['seconds']:>10.1f}{row['chunks_per_second']:>10.1f}{row['peak_rss_mb']:>13.0f}{cuda_text:>14}")
+
+    if "file_order" in results and "token_budget" in results:
+        speedup = results["file_order"]["seconds"] / max(results["token_budget"]["seconds"], 1e-9)
+        print(f"\n🚀 Token-budget batching is {speedup:.2f}x the speed of file-order batching")
+
+
+if __name__ == "__main__":
+    main()
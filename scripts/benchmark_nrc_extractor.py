@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+scripts/benchmark_nrc_extractor.py - Per-page parse time of the two NRC extractors
+
+Parses every saved page with the BeautifulSoup parse_nrc_page() and the
+single-pass lxml parse_nrc_page_lxml(), several rounds each, and prints the
+median time per page for both, plus whether their output matched.
+
+Usage:
+    python scripts/benchmark_nrc_extractor.py
+    python scripts/benchmark_nrc_extractor.py --pages path/to/saved/html --rounds 20
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# The collectors package lives at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from collectors.lxml_extract import parse_nrc_page_lxml
+from collectors.nrc import parse_nrc_page
+
+FIXTURES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "nrc_pages")
+
+
+def time_parser(parse_page, html, rounds):
+    """Median seconds for one parse of the page"""
+    timings = []
+    for _ in range(rounds):
+        start_time = time.perf_counter()
+        parse_page(html)
+        timings.append(time.perf_counter() - start_time)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BeautifulSoup vs lxml NRC page extraction")
+    parser.add_argument("--pages", default=FIXTURES_FOLDER, help="folder of saved .html pages")
+    parser.add_argument("--rounds", type=int, default=10, help="parses per page per extractor")
+    arguments = parser.parse_args()
+
+    names = sorted(name for name in os.listdir(arguments.pages) if name.endswith(".html"))
+    total_soup = 0.0
+    total_lxml = 0.0
+
+    print(f"{'page':<40}{'KB':>8}{'bs4 ms':>10}{'lxml ms':>10}{'speedup':>9}{'same':>6}")
+    for name in names:
+        with open(os.path.join(arguments.pages, name), "rb") as file:
+            html = file.read()
+
+        soup_seconds = time_parser(parse_nrc_page, html, arguments.rounds)
+        lxml_seconds = time_parser(parse_nrc_page_lxml, html, arguments.rounds)
+        total_soup += soup_seconds
+        total_lxml += lxml_seconds
+        same = "yes" if parse_nrc_page(html) == parse_nrc_page_lxml(html) else "NO"
+
+        print(f"{name[:39]:<40}{len(html) / 1024:>8.1f}{soup_seconds * 1000:>10.2f}{lxml_seconds * 1000:>10.2f}"
+              f"{soup_seconds / max(lxml_seconds, 1e-9):>8.1f}x{same:>6}")
+
+    if names:
+        print(f"\n🚀 Mean per page: BeautifulSoup {total_soup / len(names) * 1000:.2f} ms, "
+              f"lxml {total_lxml / len(names) * 1000:.2f} ms "
+              f"({total_soup / max(total_lxml, 1e-9):.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
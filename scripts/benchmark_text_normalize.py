@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+scripts/benchmark_text_normalize.py - Old vs compiled Wikipedia text clean-up, on the collected corpus
+
+Loads every Wikipedia page snapshot the crawl kept in the raw store and runs the
+text work create_enhanced_wikipedia_content() and get_related_articles() do on
+each page, the old way (re.sub with pattern strings, lowercasing once per
+keyword) and the new way (collectors/text_normalize.py), checks both give the
+same answers and prints the time per corpus pass.
+
+Usage:
+    python scripts/benchmark_text_normalize.py
+    python scripts/benchmark_text_normalize.py --manifest data/raw/crawl_manifest.sqlite --store data/raw/store
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+# The collectors package lives at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from collectors.manifest import CrawlManifest
+from collectors.raw_store import RawStore
+from collectors.text_normalize import normalize_wikipedia_text
+from collectors.wikipedia import (NUCLEAR_LINK_KEYWORDS, NUCLEAR_LINK_MATCHER, NUCLEAR_TEXT_MATCHER,
+                                  RELATED_KEYWORDS, RELATED_TITLE_MATCHER)
+
+
+def old_way(page):
+    """The text work for one page as the collectors used to do it"""
+    main_text = re.sub(r'\n\s*\n\s*\n', '\n\n', page["text"])
+    main_text = re.sub(r'=+\s*([^=]+)\s*=+', r'\n\n=== \1 ===\n', main_text)
+    related_links = [link for link in page["links"][:25]
+                     if any(term in link.lower() for term in NUCLEAR_LINK_KEYWORDS)]
+    related_titles = [link for link in page["links"][:20]
+                      if any(keyword in link.lower() for keyword in RELATED_KEYWORDS)]
+    nuclear_text = ('nuclear' in page["text"].lower()[:2000] or
+                    'reactor' in page["text"].lower()[:2000])
+    return main_text, related_links, related_titles, nuclear_text
+
+
+def new_way(page):
+    """The same text work with the compiled normalizer and keyword matchers"""
+    main_text = normalize_wikipedia_text(page["text"])
+    related_links = NUCLEAR_LINK_MATCHER.filter(page["links"][:25])
+    related_titles = RELATED_TITLE_MATCHER.filter(page["links"][:20])
+    nuclear_text = NUCLEAR_TEXT_MATCHER.matches(page["text"][:2000])
+    return main_text, related_links, related_titles, nuclear_text
+
+
+def load_pages(manifest, raw_store):
+    """Every distinct Wikipedia page snapshot the manifest points at"""
+    pages = {}
+    for document in manifest.documents("wikipedia"):
+        digest = document["raw_digest"]
+        if digest and digest not in pages and raw_store.has(digest):
+            pages[digest] = json.loads(raw_store.get(digest))
+    return list(pages.values())
+
+
+def time_pass(function, pages, rounds):
+    """Best seconds for one pass over all pages"""
+    best = None
+    for _ in range(rounds):
+        start_time = time.perf_counter()
+        for page in pages:
+            function(page)
+        elapsed_time = time.perf_counter() - start_time
+        best = elapsed_time if best is None else min(best, elapsed_time)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Wikipedia text normalizer on the collected corpus")
+    parser.add_argument("--manifest", default="data/raw/crawl_manifest.sqlite", help="crawl manifest")
+    parser.add_argument("--store", default="data/raw/store", help="raw store folder")
+    parser.add_argument("--rounds", type=int, default=5, help="passes over the corpus per way (best is kept)")
+    arguments = parser.parse_args()
+
+    pages = load_pages(CrawlManifest(arguments.manifest), RawStore(arguments.store))
+    if not pages:
+        print("❌ No Wikipedia snapshots in the raw store yet - run scripts/make_dataset.py first")
+        return
+
+    mismatches = sum(1 for page in pages if old_way(page) != new_way(page))
+    total_mb = sum(len(page["text"]) for page in pages) / 1024 / 1024
+
+    old_seconds = time_pass(old_way, pages, arguments.rounds)
+    new_seconds = time_pass(new_way, pages, arguments.rounds)
+
+    print(f"📊 {len(pages)} articles, {total_mb:.1f} MB of text, {mismatches} mismatches")
+    print(f"   old way: {old_seconds * 1000:.1f} ms ({old_seconds / len(pages) * 1000:.2f} ms per article)")
+    print(f"   new way: {new_seconds * 1000:.1f} ms ({new_seconds / len(pages) * 1000:.2f} ms per article)")
+    print(f"🚀 {old_seconds / max(new_seconds, 1e-9):.2f}x faster")
+
+
+if __name__ == "__main__":
+    main()
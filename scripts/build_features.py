@@ -1,246 +1,190 @@
 # Nuclear Embeddings Pre-computation
-print("Importing all the libraries...")
-import json  # for reading JSON files
+#
+# Builds the knowledge base folder (embeddings, chunk text, search indexes) from the corpus JSONL.
+# Runs anywhere now, not just in Colab:
+#
+#   python scripts/build_features.py --corpus data/processed/nuclear_corpus.jsonl --workers 8
+#   python scripts/build_features.py --colab --upload          (old Colab flow, corpus from the bucket)
+#
+# Run with --help to see every option.
+#
+# The CPU encoding workers are spawned processes, and each one imports this file again
+# (as __mp_main__). So nothing is printed at the top level here, and torch, sentence_transformers
+# and Google Cloud Storage are only imported inside the functions that use them (here and in
+# encoding.py), so a worker only loads torch once, when it loads its model.
+import os  # for file paths
+import sys  # so we can import the shared modules from the repo root
+import shutil  # for cleaning up half-written folders
+import argparse  # for the command line options
 import numpy as np  # for math operations on arrays
-import torch  # for GPU operations
-from sentence_transformers import SentenceTransformer  # for creating embeddings
-from google.cloud import storage  # for Google Cloud Storage
-from google.colab import auth, files  # for Google Colab authentication
-import pickle  # for saving our data
 from datetime import datetime  # for timestamps
 import time  # for timing our operations
 
-print("All libraries imported successfully!")
 
-# STEP 1: Connect to Google Cloud
-print("Connecting to Google Cloud...")
-print("You might need to click some buttons to give permission...")
-auth.authenticate_user()
-print(" Connected to Google Cloud!")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from knowledge_base import write_knowledge_base, upload_knowledge_base  # our on-disk format
+from knowledge_base import publish_latest_knowledge_base  # tell the app which folder is the newest
+from knowledge_base import first_of_each_hash, deduplicate_chunks  # drop repeated chunks
+from knowledge_base import spool_documents, ChunkSubset, ChunkTexts  # chunk text on disk, not in RAM
+from knowledge_base import load_knowledge_base, download_knowledge_base, plan_incremental_build  # reuse old vectors
+from retrieval import build_ivf_index, save_ivf_index, recall_report, print_recall_report  # fast search index
+from retrieval import default_nlist, train_ivf_centroids, assign_to_centroids  # IVF cells (dedup + index)
+from retrieval import build_quantized_index, save_quantized_index  # compact int8 / sign-bit codes
+from retrieval import choose_search_index, save_search_choice  # record which index the app uses
+from retrieval import search_embeddings  # shared top-k search
+from encoding import count_tokens, make_token_budget_batches, padded_tokens, encode_texts  # batched encoding
+from corpus_reader import read_documents_from_jsonl, read_documents_from_blob  # streamed corpus reading
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+PROJECT_ID = "mylittlerickover-prod"
+BUCKET_NAME = "mylittlerickover-prod-nuclear-vertex-final"
+
+# The name of our file with all the nuclear documents in the bucket
+CORPUS_BLOB_NAME = "nuclear_corpus_final_20250802_130023.jsonl"
+
+# Settings for this run (command line options override these)
+# Previous knowledge base to reuse vectors from: a local folder or a folder name in the bucket
+# (leave empty to encode every chunk from scratch)
+PREVIOUS_KNOWLEDGE_BASE = os.environ.get("PREVIOUS_KNOWLEDGE_BASE", "")
+# Batches are packed by token length: at most this many padded tokens per batch
+# (lower it if you get memory errors; 8192 = the old 32 chunks x 256 tokens worst case)
+ENCODE_MAX_TOKENS = int(os.environ.get("ENCODE_MAX_TOKENS", "8192"))
+# ...and never more than this many chunks in one batch
+ENCODE_BATCH_SIZE = int(os.environ.get("ENCODE_BATCH_SIZE", "256"))
+# Up to this many chunks, every chunk is compared with every other one to find near duplicates
+# (a few seconds at 20,000); above it, only with the chunks in the same IVF cell
+NEAR_DUPLICATE_FULL_SCAN_LIMIT = int(os.environ.get("NEAR_DUPLICATE_FULL_SCAN_LIMIT", "20000"))
+
+
+def get_bucket():
+    """Connect to our Cloud Storage bucket"""
+    from google.cloud import storage  # only needed when we talk to the bucket
 
-# STEP 2: Download our nuclear documents from the cloud
-print("📚 Getting our nuclear documents from the cloud...")
-
-
-def get_nuclear_documents_from_cloud():
     print("Creating connection to Google Cloud Storage...")
-    my_storage_client = storage.Client(project="mylittlerickover-prod")
-    my_bucket = my_storage_client.bucket("mylittlerickover-prod-nuclear-vertex-final")
-
-    # The name of our file with all the nuclear documents
-    my_file_name = "nuclear_corpus_final_20250802_130023.jsonl"
-    print(f"Looking for file: {my_file_name}")
-
-    my_blob = my_bucket.blob(my_file_name)
+    my_storage_client = storage.Client(project=PROJECT_ID)
+    return my_storage_client.bucket(BUCKET_NAME)
 
 
-    file_content = my_blob.download_as_text()
-    print("File downloaded successfully!")
+def get_nuclear_documents_from_cloud(file_name=CORPUS_BLOB_NAME):
+    """Stream the corpus JSONL from the bucket, one document per line (nothing is kept here)"""
+    my_bucket = get_bucket()
+    print(f"Looking for file: {file_name}")
 
-    # Now let's turn the file content into a list of documents
-    list_of_documents = []
-    lines_in_file = file_content.strip().split('\n')
+    my_blob = my_bucket.blob(file_name)
 
+    # Read straight from the bucket line by line (no full copy of the file in memory)
     print("Processing each line in the file...")
-    for line_number, single_line in enumerate(lines_in_file):
-        if single_line.strip():  # make sure the line isn't empty
-            try:
-                document = json.loads(single_line)  # convert JSON text to Python object
-                list_of_documents.append(document)
-
-                # Show progress every 1000 documents
-                if (line_number + 1) % 1000 == 0:
-                    print(f"Processed {line_number + 1} documents so far...")
-
-            except json.JSONDecodeError:
-                print(f"Warning: Couldn't read line {line_number + 1}, skipping it...")
-                continue
-
-    print(f"✅ Successfully loaded {len(list_of_documents)} nuclear document chunks!")
-    return list_of_documents
+    return read_documents_from_blob(my_blob)
 
 
-# Actually get the documents
-nuclear_documents = get_nuclear_documents_from_cloud()
+def pick_device(requested_device):
+    """Use the GPU if we have one (and nobody asked for something else)"""
+    if requested_device != 'auto':
+        return requested_device
 
-# Let's look at the first document
-print("\n📖 Here's what the first document looks like:")
-print(f"Title: {nuclear_documents[0].get('title', 'No title')}")
-print(f"Content preview: {nuclear_documents[0].get('content', 'No content')[:150]}...")
+    import torch  # for checking the GPU
 
-# STEP 3: Set up our AI model that will create embeddings
-print("\n Setting up our AI embedding model...")
+    if torch.cuda.is_available():
+        print("🎉 Great! We have a GPU available!")
+        return 'cuda'
 
-# Check if we have a GPU available (this makes things much faster)
-if torch.cuda.is_available():
-    my_device = 'cuda'
-    print("🎉 Great! We have a GPU available!")
-else:
-    my_device = 'cpu'
     print("⚠️ No GPU found, using CPU (this will be slower)")
+    return 'cpu'
 
-print(f"Using device: {my_device}")
-
-# Load our embedding model
-print("Loading the sentence transformer model...")
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
-
-# Move the model to GPU if available
-print(f"Moving model to {my_device}...")
-embedding_model = embedding_model.to(my_device)
-
-print(f"✅ Model is ready and running on {my_device}!")
-
-# STEP 4: Create embeddings for all our documents
-print("\n Now we'll create embeddings for all our nuclear documents...")
-print("This is the slow part, but we only have to do it once!")
-
-# First, let's extract just the text content from each document
-all_document_texts = []
-all_document_ids = []
-
-print("Extracting text from each document...")
-for i, document in enumerate(nuclear_documents):
-    text_content = document.get('content', '')  # get the content, or empty string if none
-    document_id = document.get('id', f'doc_{i}')  # get the id, or make one up
-
-    all_document_texts.append(text_content)
-    all_document_ids.append(document_id)
 
-    # Show progress every 5000 documents
-    if (i + 1) % 5000 == 0:
-        print(f"Extracted text from {i + 1}/{len(nuclear_documents)} documents")
+def load_embedding_model(device):
+    """Load our embedding model onto the device"""
+    from sentence_transformers import SentenceTransformer  # for creating embeddings
 
-print(f"✅ Extracted text from all {len(all_document_texts)} documents!")
+    print(f"Loading the sentence transformer model onto {device}...")
+    embedding_model = SentenceTransformer(MODEL_NAME)
+    return embedding_model.to(device)
 
-# Now let's create embeddings in batches (so we don't run out of memory)
-print("\nCreating embeddings in batches...")
-how_many_at_once = 32  # Process 32 documents at a time (adjust if you get memory errors)
-all_embedding_batches = []  # We'll store each batch here
 
-total_batches = (len(all_document_texts) + how_many_at_once - 1) // how_many_at_once
-print(f"We'll process {total_batches} batches of {how_many_at_once} documents each")
+def load_previous_knowledge_base(previous_name):
+    """Open the previous knowledge base (downloading it from the bucket if it is not a local folder)"""
+    if not previous_name:
+        return None
 
-start_time = time.time()
+    print(f"\n♻️ Looking for unchanged chunks in {previous_name}...")
+    previous_folder = previous_name
+    if not os.path.isdir(previous_folder):
+        previous_folder = download_knowledge_base(get_bucket(), previous_name,
+                                                  os.path.join("data", "outputs", previous_name))
+    return load_knowledge_base(previous_folder)
 
-for batch_number in range(0, len(all_document_texts), how_many_at_once):
-    current_batch_number = batch_number // how_many_at_once + 1
 
-    # Get the texts for this batch
-    batch_end = min(batch_number + how_many_at_once, len(all_document_texts))
-    current_batch_texts = all_document_texts[batch_number:batch_end]
+def build_search_indexes(knowledge_base_folder, embeddings_matrix, ivf_centroids=None):
+    """Build the IVF and quantized indexes next to the embeddings, report their recall and pick one for the app"""
+    # Build the approximate search index next to the embeddings (with the centroids deduplication used)
+    print("\n🗂️ Building the approximate nearest-neighbour (IVF) search index...")
+    index_start_time = time.time()
+    search_index = build_ivf_index(embeddings_matrix, centroids=ivf_centroids)
+    save_ivf_index(knowledge_base_folder, search_index)
+    print(f"✅ Built IVF index with {search_index.nlist} lists in {time.time() - index_start_time:.1f} seconds "
+          f"({search_index.index_bytes() / 1024 / 1024:.1f} MB on top of the embeddings)")
 
-    print(f"Processing batch {current_batch_number}/{total_batches} ({len(current_batch_texts)} documents)...")
+    # Check how much we lose compared to exact search so we can pick nprobe safely
+    print("\n📏 Recall of the IVF index against exact search:")
+    ivf_report = recall_report(embeddings_matrix, search_index, k=10)
+    print_recall_report(ivf_report, k=10)
 
-    # Create embeddings for this batch
-    batch_embeddings = embedding_model.encode(
-        current_batch_texts,
-        convert_to_tensor=True,
-        show_progress_bar=False  # We'll show our own progress
-    )
+    # Build the quantized codes (int8 per-dimension scales + 1-bit signs) for the compact scan
+    print("\n🗜️ Building the quantized (int8 + sign bit) search codes...")
+    quantized_index = build_quantized_index(embeddings_matrix)
+    save_quantized_index(knowledge_base_folder, quantized_index)
+    print(f"✅ float32: {embeddings_matrix.nbytes / 1024 / 1024:.1f} MB, "
+          f"int8: {quantized_index.int8_codes.nbytes / 1024 / 1024:.1f} MB, "
+          f"sign bits: {quantized_index.sign_bits.nbytes / 1024 / 1024:.2f} MB")
 
-    # Move embeddings back to CPU and convert to numpy
-    batch_embeddings_numpy = batch_embeddings.cpu().numpy()
-    all_embedding_batches.append(batch_embeddings_numpy)
+    print("\n📏 Recall of the quantized search (with float32 re-ranking) against exact search:")
+    quantized_report = recall_report(embeddings_matrix, quantized_index, k=10)
+    print_recall_report(quantized_report, k=10)
 
-    # Show estimated time remaining
-    if current_batch_number % 10 == 0:
-        elapsed_time = time.time() - start_time
-        estimated_total_time = elapsed_time * total_batches / current_batch_number
-        estimated_remaining = estimated_total_time - elapsed_time
-        print(f"   Estimated time remaining: {estimated_remaining / 60:.1f} minutes")
+    # Write down which index the app should use, measured on this corpus
+    choice = choose_search_index({"ivf": ivf_report, "quantized": quantized_report})
+    manifest = save_search_choice(knowledge_base_folder, choice)
+    chosen_settings = ", ".join(f"{name}={value}" for name, value in choice["settings"].items())
+    print(f"\n🎯 The app will search with: {choice['type']} {chosen_settings} "
+          f"(fastest with recall@10 >= {choice['min_recall']})")
+    print(f"   Lowest memory at that recall: {choice['low_memory']['type']} (SEARCH_INDEX_TYPE=low_memory)")
 
-# Combine all the batches into one big array
-print("\nCombining all batches into one big embedding matrix...")
-final_embeddings_matrix = np.vstack(all_embedding_batches)
+    return manifest
 
-print(f"✅ Created embeddings! Shape: {final_embeddings_matrix.shape}")
-print(f"   Number of documents: {final_embeddings_matrix.shape[0]}")
-print(f"   Embedding size for each document: {final_embeddings_matrix.shape[1]}")
 
-# STEP 5: Package everything up nicely
-print("\n📦 Packaging everything into a nice data structure...")
+def save_knowledge_base_to_cloud(knowledge_base_folder, folder_name):
+    """Upload the finished knowledge base folder to the bucket"""
+    bucket = get_bucket()
 
-# Create our complete knowledge base
-nuclear_knowledge_base = {
-    'embeddings_matrix': final_embeddings_matrix.astype(np.float32),  # Use float32 to save memory
-    'all_documents': nuclear_documents,
-    'document_ids': all_document_ids,
-    'model_used': 'all-MiniLM-L6-v2',
-    'embedding_dimensions': final_embeddings_matrix.shape[1],
-    'total_documents': len(nuclear_documents),
-    'creation_date': datetime.now().isoformat(),
-    'device_used_for_creation': my_device,
-    'notes': 'Pre-computed embeddings for fast nuclear document search'
-}
+    print(f"Uploading to cloud storage under {folder_name}/ ...")
+    upload_knowledge_base(bucket, knowledge_base_folder, folder_name)
 
-# Calculate file size
-size_in_bytes = final_embeddings_matrix.nbytes
-size_in_mb = size_in_bytes / 1024 / 1024
+    # Only now that every file is up does the app get pointed at the new folder
+    publish_latest_knowledge_base(bucket, folder_name)
+    print(f"✅ Successfully uploaded {folder_name} and made it the latest knowledge base!")
+    return folder_name
 
-print(f"Our knowledge base contains:")
-print(f"   - Total documents: {nuclear_knowledge_base['total_documents']}")
-print(f"   - Embedding dimensions: {nuclear_knowledge_base['embedding_dimensions']}")
-print(f"   - Approximate size: {size_in_mb:.1f} MB")
-print(f"   - Created on: {nuclear_knowledge_base['creation_date']}")
 
-# STEP 6: Save everything to Google Cloud Storage
-print("\n☁️ Saving our knowledge base to Google Cloud Storage...")
-
-
-def save_knowledge_base_to_cloud(knowledge_base_data, file_name):
-    print(f"Connecting to Google Cloud Storage...")
-    storage_client = storage.Client(project="mylittlerickover-prod")
-    bucket = storage_client.bucket("mylittlerickover-prod-nuclear-vertex-final")
-
-    print(f"Creating blob for file: {file_name}")
-    blob = bucket.blob(file_name)
-
-    print("Converting our data to pickle format...")
-    # Use pickle to save our Python object
-    pickled_knowledge_base = pickle.dumps(knowledge_base_data, protocol=pickle.HIGHEST_PROTOCOL)
-    pickled_size_mb = len(pickled_knowledge_base) / 1024 / 1024
-
-    print(f"Uploading {pickled_size_mb:.1f} MB to cloud storage...")
-    blob.upload_from_string(pickled_knowledge_base, content_type='application/octet-stream')
-
-    print(f"✅ Successfully uploaded {file_name}!")
-    return file_name
-
-
-# Create a filename with current timestamp
-current_timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-knowledge_base_filename = f"nuclear_embeddings_precomputed_{current_timestamp}.pkl"
-
-# Actually save it
-saved_filename = save_knowledge_base_to_cloud(nuclear_knowledge_base, knowledge_base_filename)
-
-# STEP 7: Test our fast search function
-print("\n Testing our fast search function...")
-
-
-def search_nuclear_documents(user_query, number_of_results=5):
+def search_nuclear_documents(embedding_model, embeddings_matrix, nuclear_documents, user_query,
+                             number_of_results=5):
     print(f"Searching for: '{user_query}'")
 
     # Turn the user's query into an embedding
     print("Creating embedding for the query...")
-    query_embedding = embedding_model.encode([user_query], convert_to_tensor=True)
-    query_embedding_numpy = query_embedding.cpu().numpy()
-
-    # Calculate how similar the query is to each document
-    print("Calculating similarities with all documents...")
-    similarity_scores = np.dot(final_embeddings_matrix, query_embedding_numpy.T).flatten()
+    query_embedding_numpy = embedding_model.encode([user_query])
 
-    # Find the most similar documents
+    # Calculate how similar the query is to each document and keep only the best ones
     print(f"Finding top {number_of_results} most similar documents...")
-    top_document_indices = np.argsort(similarity_scores)[-number_of_results:][::-1]
+    top_indices, top_scores = search_embeddings(embeddings_matrix, query_embedding_numpy, number_of_results)
+    top_document_indices = top_indices[0]
+    similarity_scores = top_scores[0]
 
     # Prepare the results
     search_results = []
     for position, doc_index in enumerate(top_document_indices):
         result = {
             'rank': position + 1,
-            'similarity_score': float(similarity_scores[doc_index]),
+            'similarity_score': float(similarity_scores[position]),
             'document_data': nuclear_documents[doc_index],
             'document_title': nuclear_documents[doc_index].get('title', 'No title'),
             'content_preview': nuclear_documents[doc_index].get('content', '')[:200] + "..."
@@ -250,27 +194,220 @@ def search_nuclear_documents(user_query, number_of_results=5):
     return search_results
 
 
-# Test the search with a sample query
-test_query = "nuclear reactor safety"
-print(f"\nTesting search with query: '{test_query}'")
-test_results = search_nuclear_documents(test_query, 3)
-
-print(f"\nTop 3 results for '{test_query}':")
-for result in test_results:
-    print(f"\n{result['rank']}. {result['document_title']}")
-    print(f"   Similarity: {result['similarity_score']:.3f}")
-    print(f"   Preview: {result['content_preview']}")
-
-# FINAL SUCCESS MESSAGE
-print("\n" + "=" * 60)
-print("🎉 SUCCESS! Pre-computation is complete!")
-print("=" * 60)
-print(f"📁 Your embeddings are saved as: {saved_filename}")
-print(f"📊 Total documents processed: {len(nuclear_documents)}")
-print(f"💾 File size: {size_in_mb:.1f} MB")
-print("\n🚀 Next steps:")
-print("1. Update your Cloud Run app to download this file")
-print("2. Load the embeddings instead of computing them each time")
-print("3. Enjoy super fast nuclear document search!")
-print("\n💡 Pro tip: Save this filename somewhere safe!")
-print(f"   Filename: {saved_filename}")
\ No newline at end of file
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Build the nuclear knowledge base (embeddings + search indexes)")
+    parser.add_argument("--corpus", help="local corpus JSONL file, .gz / .zst ok (default: read from the bucket)")
+    parser.add_argument("--corpus-blob", default=CORPUS_BLOB_NAME, help="corpus file name in the bucket")
+    parser.add_argument("--output-dir", default=os.path.join("data", "outputs"),
+                        help="where the knowledge base folder is written")
+    parser.add_argument("--previous", default=PREVIOUS_KNOWLEDGE_BASE,
+                        help="previous knowledge base (folder or bucket folder name) to reuse vectors from")
+    parser.add_argument("--max-tokens", type=int, default=ENCODE_MAX_TOKENS,
+                        help="padded tokens per encode batch (chunks are sorted by length and packed up to this)")
+    parser.add_argument("--batch-size", type=int, default=ENCODE_BATCH_SIZE, help="most chunks per encode batch")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="encoding worker processes on CPU (each loads its own model)")
+    parser.add_argument("--device", default="auto", help="cpu, cuda or auto")
+    parser.add_argument("--duplicate-threshold", type=float, default=0.98,
+                        help="cosine similarity above which two chunks count as the same")
+    parser.add_argument("--upload", action="store_true", help="upload the finished folder to the bucket")
+    parser.add_argument("--colab", action="store_true", help="log in with Google Colab first")
+    return parser.parse_args()
+
+
+def main():
+    arguments = parse_arguments()
+    run_start_time = time.time()
+
+    # STEP 1: Connect to Google Cloud (only needed inside Colab)
+    if arguments.colab:
+        from google.colab import auth  # only exists inside Colab
+        print("Connecting to Google Cloud...")
+        print("You might need to click some buttons to give permission...")
+        auth.authenticate_user()
+        print(" Connected to Google Cloud!")
+
+    # STEP 2: Get our nuclear documents
+    if arguments.corpus:
+        print(f"📚 Reading our nuclear documents from {arguments.corpus}...")
+        document_stream = read_documents_from_jsonl(arguments.corpus)
+    else:
+        print("📚 Getting our nuclear documents from the cloud...")
+        document_stream = get_nuclear_documents_from_cloud(arguments.corpus_blob)
+
+    # The chunk text goes into a text blob on disk as it streams in; only the small metadata
+    # and the offsets stay in memory (plus the embeddings, once we have them)
+    spool_folder = os.path.join(arguments.output_dir, f"corpus_spool_{os.getpid()}")
+    try:
+        nuclear_documents = spool_documents(document_stream, spool_folder)
+        print(f"✅ Successfully loaded {len(nuclear_documents)} nuclear document chunks!")
+
+        if len(nuclear_documents) == 0:
+            print("❌ No documents found, nothing to build")
+            return
+
+        build_from_chunks(arguments, nuclear_documents, run_start_time)
+    finally:
+        shutil.rmtree(spool_folder, ignore_errors=True)
+
+
+def build_from_chunks(arguments, nuclear_documents, run_start_time):
+    """Embed, deduplicate, write and index the spooled chunks (a ChunkStore)"""
+    # Let's look at the first document
+    print("\n📖 Here's what the first document looks like:")
+    print(f"Title: {nuclear_documents[0].get('title', 'No title')}")
+    print(f"Content preview: {nuclear_documents[0].get('content', 'No content')[:150]}...")
+
+    # STEP 3: Decide where the model runs
+    print("\n Setting up our AI embedding model...")
+    my_device = pick_device(arguments.device)
+    print(f"Using device: {my_device}")
+
+    # STEP 4: Create embeddings for all our documents
+    print("\n Now we'll create embeddings for all our nuclear documents...")
+
+    # Chunks with exactly the same text only need one vector, so drop the repeats before encoding
+    unique_positions = first_of_each_hash(nuclear_documents)
+    exact_duplicates = len(nuclear_documents) - len(unique_positions)
+    nuclear_documents = ChunkSubset(nuclear_documents, unique_positions)
+    print(f"✅ Dropped {exact_duplicates} chunks with the same text as an earlier one, {len(nuclear_documents)} left")
+
+    # Reuse vectors from the previous knowledge base for chunks that did not change
+    previous_knowledge_base = load_previous_knowledge_base(arguments.previous)
+    final_embeddings_matrix, positions_to_encode, incremental_stats = plan_incremental_build(
+        previous_knowledge_base, nuclear_documents, MODEL_NAME)
+    print(f"✅ Reusing {incremental_stats['reused']} vectors, encoding {incremental_stats['to_encode']} new or "
+          f"changed chunks, dropping {incremental_stats['deleted']} deleted chunks")
+
+    # Read from the text blob one batch at a time, not copied into a list
+    texts_to_encode = ChunkTexts(nuclear_documents, positions_to_encode)
+    embedding_model = load_embedding_model(my_device)
+    chunks_per_second = None
+    if texts_to_encode:
+        # Pack similar-length chunks together so batches carry almost no padding
+        print("\nPacking chunks into token-budget batches...")
+        token_lengths = count_tokens(embedding_model.tokenizer, texts_to_encode, embedding_model.max_seq_length)
+        batches = make_token_budget_batches(token_lengths, arguments.max_tokens, arguments.batch_size)
+        print(f"✅ {len(batches)} batches, {padded_tokens(batches, token_lengths)} padded tokens "
+              f"for {sum(token_lengths)} real tokens")
+
+        print("\nCreating embeddings in batches...")
+        workers = arguments.workers if my_device == 'cpu' else 1
+        new_embeddings, chunks_per_second = encode_texts(texts_to_encode, batches, MODEL_NAME, my_device,
+                                                         workers=workers, embedding_model=embedding_model)
+
+        # Put the new vectors next to the reused ones in one big array
+        if final_embeddings_matrix is None:
+            final_embeddings_matrix = np.zeros((len(nuclear_documents), new_embeddings.shape[1]), dtype=np.float32)
+        final_embeddings_matrix[positions_to_encode] = new_embeddings
+
+    print(f"✅ Created embeddings! Shape: {final_embeddings_matrix.shape}")
+
+    # Drop near-duplicate chunks so every search result slot carries something new. The IVF
+    # centroids are trained once: big corpora only compare chunks within a cell, and the
+    # search index below reuses them
+    print("\n🧹 Removing near-duplicate chunks...")
+    ivf_centroids = train_ivf_centroids(final_embeddings_matrix, default_nlist(len(final_embeddings_matrix)))
+    cells = None
+    if len(nuclear_documents) > NEAR_DUPLICATE_FULL_SCAN_LIMIT:
+        cells = assign_to_centroids(final_embeddings_matrix, ivf_centroids)
+        print(f"   {len(nuclear_documents)} chunks, so only comparing chunks in the same one of "
+              f"{len(ivf_centroids)} IVF cells")
+    chunks_to_keep = deduplicate_chunks(final_embeddings_matrix, nuclear_documents,
+                                        threshold=arguments.duplicate_threshold, cells=cells)
+    near_duplicates = len(nuclear_documents) - len(chunks_to_keep)
+    removed_chunks = exact_duplicates + near_duplicates
+
+    final_embeddings_matrix = np.ascontiguousarray(final_embeddings_matrix[chunks_to_keep], dtype=np.float32)
+    nuclear_documents = ChunkSubset(nuclear_documents, chunks_to_keep)
+    print(f"✅ Removed {near_duplicates} near-duplicate chunks ({removed_chunks} duplicates in all), "
+          f"{len(nuclear_documents)} left")
+
+    # STEP 5: Write everything into the knowledge base folder
+    print("\n📦 Writing everything into the knowledge base folder...")
+
+    # Create a folder name with current timestamp (this is also the version of the knowledge base)
+    current_timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    knowledge_base_name = f"nuclear_knowledge_base_{current_timestamp}"
+    knowledge_base_folder = os.path.join(arguments.output_dir, knowledge_base_name)
+
+    # Build in a temporary folder and rename it at the end, so a crash never leaves a half-built knowledge base
+    partial_folder = knowledge_base_folder + ".partial"
+    if os.path.exists(partial_folder):
+        shutil.rmtree(partial_folder)
+
+    try:
+        # Flat float32 embedding block + text blob + small JSON manifest
+        nuclear_knowledge_base = write_knowledge_base(
+            partial_folder,
+            final_embeddings_matrix,
+            nuclear_documents,
+            model_name=MODEL_NAME,
+            extra_info={
+                'version': current_timestamp,
+                'creation_date': datetime.now().isoformat(),
+                'device_used_for_creation': my_device,
+                'duplicates_removed': removed_chunks,
+                'exact_duplicates_removed': exact_duplicates,
+                'duplicate_threshold': arguments.duplicate_threshold,
+                'near_duplicates_within_ivf_cells': cells is not None,
+                'incremental_build': incremental_stats,
+                'previous_knowledge_base': arguments.previous or None,
+                'encode_chunks_per_second': chunks_per_second,
+                'notes': 'Pre-computed embeddings for fast nuclear document search'
+            }
+        )
+
+        build_search_indexes(partial_folder, final_embeddings_matrix, ivf_centroids)
+        os.rename(partial_folder, knowledge_base_folder)
+
+    except BaseException:
+        shutil.rmtree(partial_folder, ignore_errors=True)
+        raise
+
+    # Calculate file size
+    size_in_bytes = final_embeddings_matrix.nbytes + nuclear_knowledge_base['text_bytes']
+    size_in_mb = size_in_bytes / 1024 / 1024
+
+    print(f"\nOur knowledge base contains:")
+    print(f"   - Total documents: {nuclear_knowledge_base['num_documents']}")
+    print(f"   - Embedding dimensions: {nuclear_knowledge_base['embedding_dim']}")
+    print(f"   - Approximate size: {size_in_mb:.1f} MB")
+    print(f"   - Created on: {nuclear_knowledge_base['creation_date']}")
+    print(f"   - Saved locally in: {knowledge_base_folder}")
+
+    # STEP 6: Save everything to Google Cloud Storage
+    if arguments.upload:
+        print("\n☁️ Saving our knowledge base to Google Cloud Storage...")
+        save_knowledge_base_to_cloud(knowledge_base_folder, knowledge_base_name)
+
+    # STEP 7: Test our fast search function
+    print("\n Testing our fast search function...")
+    test_query = "nuclear reactor safety"
+    print(f"\nTesting search with query: '{test_query}'")
+    test_results = search_nuclear_documents(embedding_model, final_embeddings_matrix,
+                                            nuclear_documents, test_query, 3)
+
+    print(f"\nTop 3 results for '{test_query}':")
+    for result in test_results:
+        print(f"\n{result['rank']}. {result['document_title']}")
+        print(f"   Similarity: {result['similarity_score']:.3f}")
+        print(f"   Preview: {result['content_preview']}")
+
+    # FINAL SUCCESS MESSAGE
+    print("\n" + "=" * 60)
+    print("🎉 SUCCESS! Pre-computation is complete!")
+    print("=" * 60)
+    print(f"📁 Your knowledge base is saved as: {knowledge_base_folder}")
+    print(f"📊 Total documents processed: {len(nuclear_documents)}")
+    print(f"💾 Size: {size_in_mb:.1f} MB")
+    print(f"⏱️ Whole build took {(time.time() - run_start_time) / 60:.1f} minutes")
+    print("\n🚀 Next steps:")
+    if not arguments.upload:
+        print("1. Re-run with --upload (or upload the folder yourself) to put it in Cloud Storage")
+    print(f"2. Restart your Cloud Run app to load it (or pin it with KNOWLEDGE_BASE_PREFIX={knowledge_base_name})")
+    print("3. Enjoy super fast nuclear document search!")
+
+
+if __name__ == "__main__":
+    main()
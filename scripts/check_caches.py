@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+scripts/check_caches.py - Check the query and answer caches' eviction, expiry and invalidation
+
+Fills a small QueryCache the way app.py does and checks:
+  - the least recently used entry is dropped when the cache is full, and a
+    lookup counts as a use
+  - entries older than the TTL are treated as misses and removed
+  - check_version throws everything away when the knowledge base changes,
+    and keeps it when it does not
+  - the hit/miss/eviction counters add up
+
+Then fills a small AnswerCache in a temporary SQLite file and checks:
+  - a question whose vector is just above the similarity threshold gets the
+    stored answer, and one just below it does not
+  - the least recently used answer is dropped when the cache is full
+  - answers, their chunk ids and the eviction order survive closing and
+    reopening the file, and check_version drops answers from another version
+
+Usage:
+    python scripts/check_caches.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# The caches live at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from answer_cache import AnswerCache
+from query_cache import QueryCache
+
+TOP_K = 5
+
+
+def check(problems, passed, message):
+    print(f"{'✅' if passed else '❌'} {message}")
+    if not passed:
+        problems.append(message)
+
+
+def store(cache, query):
+    """Put a query in the cache with stand-in vector and results"""
+    cache.put(query, TOP_K, query_vector=[0.0], indices=[1, 2, 3], scores=[0.9, 0.8, 0.7])
+
+
+def check_query_cache(problems):
+    # LRU eviction: a, b, c in a cache of 2, with a looked up before c arrives
+    cache = QueryCache(max_entries=2, ttl_seconds=60, version="v1", report_every=0)
+    store(cache, "What is shutdown margin?")
+    store(cache, "What is xenon poisoning?")
+    check(problems, cache.get("  what is SHUTDOWN margin ", TOP_K) is not None,
+          "the same question with other case, spacing and punctuation hits")
+    store(cache, "What is a scram?")
+    check(problems, cache.get("What is xenon poisoning?", TOP_K) is None,
+          "least recently used entry is evicted when the cache is full")
+    check(problems, cache.get("What is shutdown margin?", TOP_K) is not None and
+          cache.get("What is a scram?", TOP_K) is not None,
+          "recently used entries are kept")
+    check(problems, cache.get("What is a scram?", TOP_K + 1) is None, "a different top_k is a different entry")
+
+    stats = cache.stats()
+    check(problems, (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (3, 2, 1, 2),
+          f"counters: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evicted, "
+          f"{stats['entries']} entries")
+
+    # TTL expiry
+    cache = QueryCache(max_entries=10, ttl_seconds=0.05, version="v1", report_every=0)
+    store(cache, "What is decay heat?")
+    check(problems, cache.get("What is decay heat?", TOP_K) is not None, "fresh entry hits")
+    time.sleep(0.1)
+    check(problems, cache.get("What is decay heat?", TOP_K) is None and cache.stats()["expired"] == 1 and
+          cache.stats()["entries"] == 0,
+          "entry older than the TTL misses and is removed")
+
+    # Knowledge base version changes
+    cache = QueryCache(max_entries=10, ttl_seconds=60, version="v1", report_every=0)
+    store(cache, "What is a reactor period?")
+    cache.check_version("v1")
+    check(problems, cache.get("What is a reactor period?", TOP_K) is not None, "same version keeps the entries")
+    cache.check_version("v2")
+    check(problems, cache.get("What is a reactor period?", TOP_K) is None and cache.stats()["version"] == "v2",
+          "new knowledge base version drops every entry")
+
+
+def vector_at(similarity):
+    """Unit vector with the given cosine similarity to [1, 0, 0, 0]"""
+    return np.array([similarity, np.sqrt(1 - similarity ** 2), 0, 0], dtype=np.float32)
+
+
+def check_answer_cache(problems):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        path = os.path.join(cache_dir, "answers.sqlite")
+
+        cache = AnswerCache(path, max_entries=2, threshold=0.95, version="v1", report_every=0)
+        cache.add("What is shutdown margin?", vector_at(1.0), "Shutdown margin is...", ["chunk_1", "chunk_2"])
+        found = cache.lookup(vector_at(0.96))
+        check(problems, found is not None and found["answer"] == "Shutdown margin is..." and
+              found["chunk_ids"] == ["chunk_1", "chunk_2"],
+              "similarity 0.96 (threshold 0.95) gets the stored answer and its chunks")
+        check(problems, cache.lookup(vector_at(0.94)) is None, "similarity 0.94 is a miss")
+
+        # a, b, c in a cache of 2, with a used before c arrives
+        cache.add("What is xenon poisoning?", [0, 0, 1, 0], "Xenon-135 absorbs...", ["chunk_3"])
+        cache.lookup(vector_at(1.0))
+        cache.add("What is a scram?", [0, 0, 0, 1], "A scram is...", ["chunk_4"])
+        check(problems, cache.lookup([0, 0, 1, 0]) is None and cache.lookup(vector_at(1.0)) is not None and
+              cache.lookup([0, 0, 0, 1]) is not None,
+              "least recently used answer is evicted when the cache is full")
+
+        stats = cache.stats()
+        check(problems, (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (4, 2, 1, 2),
+              f"counters: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evicted, "
+              f"{stats['entries']} entries")
+        cache.connection.close()
+
+        # Reopen the same file, like the app does after a restart
+        cache = AnswerCache(path, max_entries=2, threshold=0.95, report_every=0)
+        found = cache.lookup([0, 0, 0, 1])
+        check(problems, found is not None and found["answer"] == "A scram is..." and found["chunk_ids"] == ["chunk_4"],
+              f"answers survive reopening the cache ({cache.stats()['entries']} entries)")
+        cache.add("What is decay heat?", [0, 1, 0, 0], "Decay heat is...", ["chunk_5"])
+        check(problems, cache.lookup(vector_at(1.0)) is None and cache.lookup([0, 0, 0, 1]) is not None,
+              "the least recently used answer from before the reopen is evicted first")
+
+        cache.check_version("v1")
+        check(problems, cache.lookup([0, 0, 0, 1]) is not None and cache.lookup([0, 1, 0, 0]) is None,
+              "check_version keeps answers from the same version and drops the rest")
+        cache.check_version("v2")
+        check(problems, cache.stats()["entries"] == 0, "new knowledge base version drops every answer")
+        cache.connection.close()
+
+
+def main():
+    problems = []
+
+    check_query_cache(problems)
+    check_answer_cache(problems)
+
+    print(f"📊 {len(problems)} problems")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
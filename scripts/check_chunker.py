@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+scripts/check_chunker.py - Check every corpus chunk fits in the embedding model's max_seq_length
+
+all-MiniLM-L6-v2 only reads the first 256 word pieces of a text; anything past
+that is missing from the chunk's embedding but still shows up in the retrieved
+context. This counts the word pieces of:
+  - a few dense technical sample documents (units, numbers, isotopes, acronyms),
+    chunked with the model's tokenizer like create_corpus() does
+  - every chunk of a corpus JSONL, if there is one
+and fails if any chunk is longer than the model's max_seq_length. It also says
+how many sample chunks the character cap alone would have let through too long.
+
+Usage:
+    python scripts/check_chunker.py
+    python scripts/check_chunker.py --corpus data/processed/nuclear_corpus.jsonl
+"""
+
+import argparse
+import os
+import sys
+
+from sentence_transformers import SentenceTransformer
+
+# The collectors package lives at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from collectors.chunker import iter_document_chunks, token_counter
+from corpus_reader import read_documents_from_jsonl
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+SAMPLE_PARAGRAPHS = [
+    "The primary coolant is kept at about 15.5 MPa (2,250 psi) and enters the core at 275 °C (527 °F), "
+    "leaving at 315 °C (599 °F). The fuel is UO2 enriched to 3–5% U-235, with Gd2O3 burnable absorbers "
+    "and 1,200–2,000 ppm of boron as H3BO3 in the RCS at BOL.",
+    "Per 10 CFR 50.46, the calculated PCT shall not exceed 2,200 °F (1,204 °C), ECR shall not exceed 17%, "
+    "and hydrogen generation shall not exceed 1% of the hypothetical amount (see NUREG-0800, SRP 15.6.5; "
+    "RG 1.157; 10 CFR 50 App. K).",
+    "Xe-135 has a thermal absorption cross section of about 2.6×10^6 b; I-135 (t½ = 6.6 h) decays to Xe-135 "
+    "(t½ = 9.1 h). Sm-149 is stable, with σa ≈ 4.1×10^4 b. βeff ≈ 0.0065 for U-235 and ≈ 0.0021 for Pu-239.",
+    "The reactor protection system trips the reactor when any two of four channels exceed their setpoints, "
+    "for example high flux at 109% RTP, low RCS flow at 90% of design, or high pressurizer pressure at "
+    "2,385 psig. The operator then verifies the trip and enters the emergency operating procedures.",
+]
+
+
+def sample_document(copies=6):
+    """A collected-document-shaped text made of dense technical paragraphs"""
+    header = "Title: Sample\nSource URL: sample\n===================================\n\nFULL ARTICLE CONTENT:\n"
+    return header + "\n\n".join(SAMPLE_PARAGRAPHS * copies) + "\n\n" + " ".join(SAMPLE_PARAGRAPHS * copies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check corpus chunks fit in the embedding model's max_seq_length")
+    parser.add_argument("--corpus", default="data/processed/nuclear_corpus.jsonl", help="corpus JSONL to check too")
+    arguments = parser.parse_args()
+
+    model = SentenceTransformer(MODEL_NAME)
+    count_tokens = token_counter(model.tokenizer)
+    max_tokens = model.max_seq_length
+    problems = 0
+
+    character_chunks = list(iter_document_chunks(sample_document(), "wikipedia"))
+    too_long = sum(1 for chunk in character_chunks if count_tokens(chunk["content"]) > max_tokens)
+    print(f"📏 Character cap alone: {too_long} of {len(character_chunks)} sample chunks over {max_tokens} tokens")
+
+    token_chunks = list(iter_document_chunks(sample_document(), "wikipedia", count_tokens=count_tokens,
+                                             max_tokens=max_tokens))
+    longest = max(count_tokens(chunk["content"]) for chunk in token_chunks)
+    if longest > max_tokens:
+        problems += 1
+    print(f"{'✅' if longest <= max_tokens else '❌'} With the tokenizer: {len(token_chunks)} sample chunks, "
+          f"longest {longest} tokens (max {max_tokens})")
+
+    if os.path.exists(arguments.corpus):
+        num_chunks = 0
+        over = []
+        for record in read_documents_from_jsonl(arguments.corpus):
+            num_chunks += 1
+            if count_tokens(record["content"]) > max_tokens:
+                over.append(record["id"])
+        if over:
+            problems += 1
+        print(f"{'❌' if over else '✅'} {arguments.corpus}: {len(over)} of {num_chunks} chunks over {max_tokens} "
+              f"tokens{' (e.g. ' + ', '.join(over[:5]) + ')' if over else ''}")
+    else:
+        print(f"⏭️ No corpus at {arguments.corpus} to check")
+
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+scripts/check_crawler.py - Check the AsyncCrawler against local stand-in HTTP servers
+
+Starts two small HTTP servers on 127.0.0.1 (two ports, so two "hosts") and
+crawls them the way the NRC collector does (download_page through a pooled
+HTTPClient session), then checks:
+  - requests to each host are spaced by its token-bucket rate
+  - no more fetches are in flight than the concurrency cap
+  - 503s are retried, with the right retry and failure counts
+  - a 429 with Retry-After is waited out (longer than the backoff alone)
+
+Usage:
+    python scripts/check_crawler.py
+"""
+
+import http.server
+import os
+import sys
+import threading
+import time
+
+# The collectors package lives at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from collectors.crawler import AsyncCrawler, RetryableHTTPError
+from collectors.http_client import HTTPClient
+from collectors.nrc import download_page
+
+RATE = 5.0  # requests per second per host in the spacing check
+SLACK = 0.02  # seconds of timer slack allowed on the spacing
+
+
+class StandInServer:
+    """A local HTTP server that records when each path was hit and can fail on purpose
+
+    /page/<n>            200
+    /slow/<n>            200 after 0.2s (to pile up fetches in flight)
+    /flaky/<k>/<n>       503 for the first k hits, then 200
+    /down/<n>            always 503
+    /busy/<seconds>/<n>  429 with Retry-After: <seconds> on the first hit, then 200
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = []  # (time, path)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.host = f"127.0.0.1:{self.httpd.server_port}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def url(self, path):
+        return f"http://{self.host}{path}"
+
+    def times(self, prefix=""):
+        with self.lock:
+            return [when for when, path in self.hits if path.startswith(prefix)]
+
+    def handle(self, request):
+        with self.lock:
+            earlier = sum(1 for _, path in self.hits if path == request.path)
+            self.hits.append((time.monotonic(), request.path))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            parts = request.path.strip("/").split("/")
+            status, headers = 200, {}
+            if parts[0] == "slow":
+                time.sleep(0.2)
+            elif parts[0] == "flaky" and earlier < int(parts[1]):
+                status = 503
+            elif parts[0] == "down":
+                status = 503
+            elif parts[0] == "busy" and earlier == 0:
+                status, headers = 429, {"Retry-After": parts[1]}
+
+            body = f"<html><body><p>{request.path}</p></body></html>".encode()
+            request.send_response(status)
+            for name, value in headers.items():
+                request.send_header(name, value)
+            request.send_header("Content-Type", "text/html")
+            request.send_header("Content-Length", str(len(body)))
+            request.end_headers()
+            request.wfile.write(body)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def close(self):
+        self.httpd.shutdown()
+
+
+def crawl(crawler, session, server, paths):
+    """Fetch the paths through the crawler like the NRC collector does, results in order"""
+    jobs = [lambda path=path: crawler.fetch(server.host, download_page, session, server.url(path)) for path in paths]
+    return crawler.run(jobs)
+
+
+def check(problems, passed, message):
+    print(f"{'✅' if passed else '❌'} {message}")
+    if not passed:
+        problems.append(message)
+
+
+def main():
+    servers = [StandInServer(), StandInServer()]
+    session = HTTPClient(pool_size=8).session()
+    problems = []
+
+    # Spacing: both hosts at RATE/s, fetched together - each spaced on its own, not one after the other
+    crawler = AsyncCrawler(concurrency=8, host_rates={server.host: RATE for server in servers})
+    jobs = [lambda server=server, n=n: crawler.fetch(server.host, download_page, session, server.url(f"/page/{n}"))
+            for n in range(10) for server in servers]
+    start_time = time.monotonic()
+    crawler.run(jobs)
+    elapsed_time = time.monotonic() - start_time
+    for server in servers:
+        times = sorted(server.times("/page/"))
+        smallest_gap = min(later - earlier for earlier, later in zip(times, times[1:]))
+        check(problems, len(times) == 10 and smallest_gap >= 1 / RATE - SLACK,
+              f"{server.host}: {len(times)} requests, smallest gap {smallest_gap * 1000:.0f} ms "
+              f"(limit {1000 / RATE:.0f} ms)")
+    check(problems, elapsed_time < 2 * 10 / RATE,
+          f"both hosts crawled side by side in {elapsed_time:.1f}s (one after the other would be {20 / RATE:.1f}s)")
+
+    # Concurrency cap: 12 slow pages, 3 at a time
+    server = servers[0]
+    crawler = AsyncCrawler(concurrency=3, default_rate=1000)
+    results = crawl(crawler, session, server, [f"/slow/{n}" for n in range(12)])
+    check(problems, all(result.status_code == 200 for result in results) and server.max_in_flight == 3,
+          f"concurrency cap 3: at most {server.max_in_flight} requests in flight")
+
+    # Retries: a page that fails twice then works, and one that never does
+    crawler = AsyncCrawler(concurrency=4, default_rate=1000, max_retries=2, backoff_seconds=0.05)
+    results = crawl(crawler, session, server, ["/flaky/2/1", "/down/1"])
+    check(problems, getattr(results[0], "status_code", None) == 200 and len(server.times("/flaky/")) == 3,
+          f"flaky page: {len(server.times('/flaky/'))} requests, then 200")
+    check(problems, isinstance(results[1], RetryableHTTPError) and len(server.times("/down/")) == 3,
+          f"dead page: {len(server.times('/down/'))} requests, then {type(results[1]).__name__}")
+    check(problems, crawler.stats() == {"fetches": 6, "retries": 4, "failures": 1},
+          f"crawler stats {crawler.stats()}")
+
+    # Retry-After: 1 second, when the backoff alone would only be ~50 ms
+    crawler = AsyncCrawler(concurrency=4, default_rate=1000, max_retries=2, backoff_seconds=0.05)
+    results = crawl(crawler, session, server, ["/busy/1/1"])
+    times = server.times("/busy/")
+    waited = times[1] - times[0] if len(times) == 2 else 0
+    check(problems, getattr(results[0], "status_code", None) == 200 and waited >= 1 - SLACK,
+          f"429 with Retry-After: 1 waited {waited:.2f}s before trying again")
+
+    for server in servers:
+        server.close()
+
+    print(f"📊 {len(problems)} problems")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+scripts/check_http_client.py - Check the pooled HTTPClient against local fixture servers
+
+Starts two small HTTP/1.1 servers on 127.0.0.1 that count the connections
+opened to them, sends requests through HTTPClient sessions and checks:
+  - keep-alive connections are reused (far fewer connections than requests),
+    for one session, for two sessions on the same pool and for parallel threads
+  - gzip bodies come back decompressed
+  - ResponseTooLarge is raised for a body over max_bytes, both when the
+    Content-Length says so and when the body is streamed without one
+  - the per-host stats count requests, bytes and status codes correctly
+
+Usage:
+    python scripts/check_http_client.py
+"""
+
+import gzip
+import http.server
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# The collectors package lives at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from collectors.http_client import HTTPClient, ResponseTooLarge
+
+MAX_BYTES = 64 * 1024
+PAGE_BYTES = 10 * 1000
+
+
+class QuietHTTPServer(http.server.ThreadingHTTPServer):
+    """Doesn't print a traceback when the client hangs up on an oversized body (it's meant to)"""
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def page_body(path):
+    return (path.encode() + b" ") * (PAGE_BYTES // (len(path) + 1)) + b"\n"
+
+
+class FixtureServer:
+    """A local HTTP/1.1 server that counts connections
+
+    /page/<n>    200, PAGE_BYTES-ish of text (gzipped if the client accepts it)
+    /big         200, over MAX_BYTES, with a Content-Length
+    /big-stream  200, over MAX_BYTES, streamed with no Content-Length
+    /missing     404
+    /error       500
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with server.lock:
+                    server.connections += 1
+
+            def do_GET(self):
+                with server.lock:
+                    server.requests += 1
+                server.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = QuietHTTPServer(("127.0.0.1", 0), Handler)
+        self.host = f"127.0.0.1:{self.httpd.server_port}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def url(self, path):
+        return f"http://{self.host}{path}"
+
+    def handle(self, request):
+        if request.path == "/big-stream":
+            request.send_response(200)
+            request.send_header("Connection", "close")
+            request.end_headers()
+            for _ in range(MAX_BYTES // 1024 + 16):
+                request.wfile.write(b"x" * 1024)
+            request.close_connection = True
+            return
+
+        status, headers = 200, {}
+        body = page_body(request.path)
+        if request.path == "/big":
+            body = b"x" * (MAX_BYTES * 2)
+        elif request.path == "/missing":
+            status, body = 404, b"not found"
+        elif request.path == "/error":
+            status, body = 500, b"broken"
+        elif "gzip" in request.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+
+        request.send_response(status)
+        for name, value in headers.items():
+            request.send_header(name, value)
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+    def close(self):
+        self.httpd.shutdown()
+
+
+def check(problems, passed, message):
+    print(f"{'✅' if passed else '❌'} {message}")
+    if not passed:
+        problems.append(message)
+
+
+def main():
+    problems = []
+    first, second = FixtureServer(), FixtureServer()
+    client = HTTPClient(pool_size=4, max_bytes=MAX_BYTES)
+
+    # Keep-alive: 20 requests from one session, then 20 from a second session on the same pool
+    for session in (client.session(), client.session()):
+        for n in range(20):
+            response = session.get(first.url(f"/page/{n}"))
+            if response.content != page_body(f"/page/{n}"):
+                check(problems, False, f"/page/{n} came back different (gzip not decoded?)")
+    check(problems, first.requests == 40 and first.connections == 1,
+          f"two sessions, {first.requests} requests over {first.connections} connection(s)")
+
+    # Parallel threads share the pool: no more connections than pool_size
+    session = client.session()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        responses = list(executor.map(lambda n: session.get(second.url(f"/page/{n}")), range(40)))
+    check(problems, all(response.status_code == 200 for response in responses) and second.connections <= 4,
+          f"4 threads, {second.requests} requests over {second.connections} connection(s)")
+
+    # Size cap, with and without a Content-Length
+    for path in ("/big", "/big-stream"):
+        try:
+            session.get(first.url(path))
+            check(problems, False, f"{path}: no ResponseTooLarge")
+        except ResponseTooLarge:
+            check(problems, True, f"{path}: ResponseTooLarge over {MAX_BYTES} bytes")
+
+    # Error statuses come back as responses and are counted
+    session.get(first.url("/missing"))
+    session.get(first.url("/error"))
+
+    stats = client.stats()
+    first_stats, second_stats = stats.get(first.host, {}), stats.get(second.host, {})
+    check(problems, first_stats.get("statuses") == {200: 40, "too_large": 2, 404: 1, 500: 1},
+          f"{first.host} statuses {first_stats.get('statuses')}")
+    check(problems, first_stats.get("requests") == 44 and second_stats.get("requests") == 40,
+          f"requests per host: {first_stats.get('requests')} and {second_stats.get('requests')}")
+    expected_bytes = (sum(len(page_body(f"/page/{n}")) for n in range(20)) * 2 +
+                      len(b"not found") + len(b"broken"))
+    check(problems, first_stats.get("bytes") == expected_bytes,
+          f"{first.host} bytes {first_stats.get('bytes')} (expected {expected_bytes}, decompressed)")
+    check(problems, all(row["max_ms"] >= row["p95_ms"] >= 0 for row in stats.values()), "latency stats filled in")
+
+    first.close()
+    second.close()
+    print(f"📊 {len(problems)} problems")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+scripts/check_knowledge_base.py - Check the knowledge base folder format end to end
+
+Writes a small knowledge base into a temporary folder (with non-ASCII and empty
+chunks), opens it again the way the app does, and checks:
+  - the embeddings and offsets come back as memory maps, equal to what was written
+  - every chunk's content and metadata survive the round trip
+  - the manifest records the current format version, and a folder with another
+    version is refused instead of being read wrong
+
+It also checks deduplicate_chunks on chunks made to repeat: exact copies (also
+differing only in case and spacing) and near copies above the threshold are
+dropped in favour of the first one, chunks just below it are kept, the result
+doesn't depend on the block size, and with IVF cells only chunks in the same
+cell are compared.
+
+Usage:
+    python scripts/check_knowledge_base.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# knowledge_base.py lives at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from knowledge_base import (FORMAT_VERSION, MANIFEST_FILE, deduplicate_chunks, first_of_each_hash,
+                            load_knowledge_base, write_knowledge_base)
+
+SAMPLE_DOCUMENTS = [
+    {"id": "reactor", "title": "Nuclear reactor", "source": "wikipedia",
+     "content": "A nuclear reactor initiates and controls a fission chain reaction."},
+    {"id": "xenon", "title": "Xenon-135", "source": "wikipedia",
+     "content": "Xe-135 has σa ≈ 2.6×10^6 b; I-135 (t½ = 6.6 h) decays to it at 275 °C."},
+    {"id": "empty", "title": "Empty chunk", "source": "nrc", "content": ""},
+    {"title": "No id or source", "content": "Chunks without an id get one from their position."},
+]
+
+
+def check(problems, passed, message):
+    print(f"{'✅' if passed else '❌'} {message}")
+    if not passed:
+        problems.append(message)
+
+
+def unit_vector_at(similarity, direction, other_direction, dimensions=8):
+    """Unit vector with the given cosine similarity to the basis vector number direction"""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    vector[direction] = similarity
+    vector[other_direction] = np.sqrt(1 - similarity ** 2)
+    return vector
+
+
+def check_deduplicate_chunks(problems):
+    # 0: original, 1: exact copy, 2: same text in other case and spacing, 3: near copy of 0 (0.99),
+    # 4: close but not the same (0.95), 5: another topic, 6: near copy of 5 (0.985)
+    documents = [{"content": text} for text in [
+        "The reactor trips on high flux.", "The reactor trips on high flux.",
+        "  THE REACTOR   trips on high flux. ", "The reactor trips at high flux.",
+        "The reactor trips on low flow.", "Xenon-135 builds up after a shutdown.",
+        "Xenon 135 builds up after shutdown.",
+    ]]
+    embeddings = np.array([
+        unit_vector_at(1.0, 0, 1), unit_vector_at(1.0, 0, 1), unit_vector_at(1.0, 0, 1),
+        unit_vector_at(0.99, 0, 1), unit_vector_at(0.95, 0, 2), unit_vector_at(1.0, 3, 4),
+        unit_vector_at(0.985, 3, 4),
+    ])
+
+    first = first_of_each_hash(documents)
+    check(problems, first.tolist() == [0, 3, 4, 5, 6],
+          f"exact copies (also in other case and spacing) found by hash before encoding: keeps {first.tolist()}")
+
+    kept = deduplicate_chunks(embeddings, documents, threshold=0.98)
+    check(problems, kept.tolist() == [0, 4, 5], f"near copies at >= 0.98 dropped, 0.95 kept: keeps {kept.tolist()}")
+    check(problems, np.array_equal(deduplicate_chunks(embeddings, documents, threshold=0.98, block_size=2), kept),
+          "same chunks kept with blocks of 2")
+
+    # Cells: chunk 3 in a cell of its own is not compared with chunk 0 any more
+    cells = np.array([0, 0, 0, 1, 0, 2, 2])
+    kept = deduplicate_chunks(embeddings, documents, threshold=0.98, cells=cells)
+    check(problems, kept.tolist() == [0, 3, 4, 5], f"with IVF cells only chunks in one cell are compared: "
+          f"keeps {kept.tolist()}")
+
+    # A bigger random corpus: one cell for everything is the same as no cells
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((3000, 16)).astype(np.float32)
+    copies = rng.choice(3000, size=300, replace=False)
+    embeddings[copies[150:]] = embeddings[copies[:150]] + 0.01 * rng.standard_normal((150, 16))
+    documents = [{"content": f"chunk {i}"} for i in range(len(embeddings))]
+    kept = deduplicate_chunks(embeddings, documents, threshold=0.98)
+    check(problems, np.array_equal(kept, deduplicate_chunks(embeddings, documents, threshold=0.98,
+                                                            cells=np.zeros(len(embeddings), dtype=np.int64))),
+          f"one cell for everything keeps the same {len(kept)} of {len(embeddings)} chunks as no cells")
+
+
+def main():
+    problems = []
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((len(SAMPLE_DOCUMENTS), 8)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as kb_dir:
+        manifest = write_knowledge_base(kb_dir, embeddings, SAMPLE_DOCUMENTS, "all-MiniLM-L6-v2",
+                                        extra_info={"build_time": "check"})
+        knowledge_base = load_knowledge_base(kb_dir)
+
+        loaded_embeddings = knowledge_base["embeddings"]
+        check(problems, isinstance(loaded_embeddings, np.memmap) and np.array_equal(loaded_embeddings, embeddings),
+              f"embeddings come back memory-mapped and unchanged {loaded_embeddings.shape}")
+        check(problems, isinstance(knowledge_base["documents"].offsets, np.memmap),
+              "chunk offsets come back memory-mapped")
+
+        documents = knowledge_base["documents"]
+        contents = [document["content"] for document in documents]
+        check(problems, contents == [document["content"] for document in SAMPLE_DOCUMENTS],
+              f"all {len(contents)} chunk contents survive the round trip (non-ASCII and empty included)")
+        check(problems, [documents[i]["title"] for i in range(len(documents))] ==
+              [document["title"] for document in SAMPLE_DOCUMENTS],
+              "chunk metadata survives the round trip")
+        check(problems, documents.chunk_id(3) == "doc_3", f"chunk without an id is called {documents.chunk_id(3)}")
+
+        loaded_manifest = knowledge_base["manifest"]
+        check(problems, loaded_manifest == manifest and loaded_manifest["format_version"] == FORMAT_VERSION,
+              f"manifest read back as written, format_version {loaded_manifest['format_version']}")
+        check(problems, loaded_manifest["build_time"] == "check", "extra info is kept in the manifest")
+
+        # A folder written by another version of the format must be refused
+        manifest_path = os.path.join(kb_dir, MANIFEST_FILE)
+        with open(manifest_path, "w", encoding="utf-8") as manifest_file:
+            json.dump({**manifest, "format_version": FORMAT_VERSION + 1}, manifest_file)
+        try:
+            load_knowledge_base(kb_dir)
+            refused = False
+        except ValueError as error:
+            refused = "format version" in str(error)
+        check(problems, refused, f"format_version {FORMAT_VERSION + 1} is refused")
+
+        # Drop the loaded maps before the folder goes away (Windows keeps mapped files open)
+        del knowledge_base, documents, loaded_embeddings
+
+    check_deduplicate_chunks(problems)
+
+    print(f"📊 {len(problems)} problems")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+scripts/check_nrc_extractor.py - Golden-output check for the NRC page extractors
+
+Every saved page in scripts/fixtures/nrc_pages/*.html has a .expected.txt next
+to it (page title, a blank line, then the extracted text) made by the
+BeautifulSoup parse_nrc_page(). This parses every page with both it and the
+single-pass lxml parse_nrc_page_lxml() and checks they both still give exactly
+that text.
+
+Usage:
+    python scripts/check_nrc_extractor.py                     # compare against the golden files
+    python scripts/check_nrc_extractor.py --update            # rewrite the golden files from BeautifulSoup
+    python scripts/check_nrc_extractor.py --fetch URL [URL ...]  # save more live pages as fixtures first
+"""
+
+import argparse
+import difflib
+import os
+import re
+import sys
+from urllib.parse import urlparse
+
+# The collectors package lives at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from collectors.http_client import HTTPClient
+from collectors.lxml_extract import parse_nrc_page_lxml
+from collectors.nrc import parse_nrc_page
+
+FIXTURES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "nrc_pages")
+PARSERS = {"beautifulsoup": parse_nrc_page, "lxml": parse_nrc_page_lxml}
+
+
+def expected_path(html_path):
+    return html_path[:-len(".html")] + ".expected.txt"
+
+
+def format_output(page_title, text_content):
+    return f"{page_title}\n\n{text_content}\n"
+
+
+def fetch_fixtures(urls, folder):
+    """Save the raw HTML of each URL as a fixture, named after its path"""
+    session = HTTPClient().session()
+    for url in urls:
+        response = session.get(url)
+        if response.status_code != 200:
+            print(f"❌ {url}: HTTP {response.status_code}")
+            continue
+        name = re.sub(r'[^\w-]', '_', urlparse(url).path.strip('/').replace('.html', '')) or "index"
+        with open(os.path.join(folder, f"{name}.html"), "wb") as file:
+            file.write(response.content)
+        print(f"💾 Saved fixture: {name}.html")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the NRC extractors against saved golden output")
+    parser.add_argument("--fixtures", default=FIXTURES_FOLDER, help="folder of saved .html pages")
+    parser.add_argument("--update", action="store_true", help="rewrite the golden files from BeautifulSoup")
+    parser.add_argument("--fetch", nargs="+", metavar="URL", help="download these pages as new fixtures")
+    arguments = parser.parse_args()
+
+    if arguments.fetch:
+        fetch_fixtures(arguments.fetch, arguments.fixtures)
+
+    html_paths = sorted(os.path.join(arguments.fixtures, name)
+                        for name in os.listdir(arguments.fixtures) if name.endswith(".html"))
+    failures = 0
+
+    for html_path in html_paths:
+        with open(html_path, "rb") as file:
+            html = file.read()
+        name = os.path.basename(html_path)
+
+        if arguments.update or not os.path.exists(expected_path(html_path)):
+            with open(expected_path(html_path), "w", encoding="utf-8") as file:
+                file.write(format_output(*parse_nrc_page(html)))
+            print(f"📝 Wrote golden output for {name}")
+
+        with open(expected_path(html_path), "r", encoding="utf-8") as file:
+            expected = file.read()
+
+        for parser_name, parse_page in PARSERS.items():
+            output = format_output(*parse_page(html))
+            if output == expected:
+                print(f"✅ {name} ({parser_name})")
+                continue
+
+            failures += 1
+            print(f"❌ {name} ({parser_name}) differs from the golden output:")
+            diff = difflib.unified_diff(expected.splitlines(), output.splitlines(),
+                                        "expected", parser_name, lineterm="")
+            for line in list(diff)[:40]:
+                print(f"   {line}")
+
+    print(f"\n📊 {len(html_paths)} pages, {failures} mismatches")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
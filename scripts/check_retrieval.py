@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+scripts/check_retrieval.py - Check the corpus search helpers against plain numpy
+
+Uses random vectors (no real embeddings or model needed) and checks:
+  - top_k gives the same winners, best first, as a full argsort, for k = 0,
+    k = 1, a few, the whole row and more than the row
+  - on clustered vectors (shaped like real embeddings, which bunch up by topic)
+    the IVF index reaches the recall floor against ExactIndex with its default
+    nprobe, finds everything when it scans every list, and still does after a
+    save and load through a knowledge base folder
+  - hamming_distances counts the same differing bits as unpacking them, for
+    code widths that do and do not split into 64-bit words
+  - the quantized index (sign-bit prefilter, int8 pass, float32 re-rank) reaches
+    the same recall floor with its default settings, and the index the build
+    records in the manifest is what load_search_index opens by default
+
+Usage:
+    python scripts/check_retrieval.py
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# retrieval.py lives at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from knowledge_base import load_knowledge_base, write_knowledge_base
+from retrieval import (DEFAULT_HAMMING_CANDIDATES, DEFAULT_MIN_RECALL, DEFAULT_NPROBE, DEFAULT_RERANK_FACTOR,
+                       build_ivf_index, build_quantized_index, choose_search_index, hamming_distances,
+                       load_search_index, recall_report, save_ivf_index, save_quantized_index, save_search_choice,
+                       search_embeddings, top_k)
+
+NUM_VECTORS = 4000
+EMBEDDING_DIM = 32
+NUM_TOPICS = 40
+
+
+def check(problems, passed, message):
+    print(f"{'✅' if passed else '❌'} {message}")
+    if not passed:
+        problems.append(message)
+
+
+def check_top_k(problems, rng):
+    similarities = rng.standard_normal((7, 50)).astype(np.float32)
+    full_order = np.argsort(-similarities, axis=1)
+
+    for k in (0, 1, 10, 50, 80):
+        indices, scores = top_k(similarities, k)
+        expected = full_order[:, :k]
+        check(problems, np.array_equal(indices, expected) and
+              np.array_equal(scores, np.take_along_axis(similarities, expected, axis=1)),
+              f"top_k with k={k} matches argsort {indices.shape}")
+
+    indices, scores = top_k(similarities[0], 5)
+    check(problems, indices.shape == (1, 5) and np.array_equal(indices[0], full_order[0, :5]),
+          "top_k on a single row gives one row of winners")
+
+    embeddings = rng.standard_normal((200, 16)).astype(np.float32)
+    queries = rng.standard_normal((3, 16)).astype(np.float32)
+    indices, _ = search_embeddings(embeddings, queries, 10)
+    check(problems, np.array_equal(indices, np.argsort(-(queries @ embeddings.T), axis=1)[:, :10]),
+          "search_embeddings matches a full sort of every similarity")
+
+
+def clustered_embeddings(rng):
+    """Unit vectors bunched around a few topic directions, plus queries near some of them"""
+    topics = rng.standard_normal((NUM_TOPICS, EMBEDDING_DIM))
+    embeddings = topics[rng.integers(0, NUM_TOPICS, NUM_VECTORS)] + 0.35 * rng.standard_normal(
+        (NUM_VECTORS, EMBEDDING_DIM))
+    embeddings = (embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)).astype(np.float32)
+
+    queries = embeddings[rng.choice(NUM_VECTORS, size=100, replace=False)]
+    queries = (queries + 0.1 * rng.standard_normal(queries.shape)).astype(np.float32)
+    return embeddings, queries
+
+
+def recall_at(report, **settings):
+    """recall@k of the report row with exactly these settings"""
+    return next(row["recall_at_k"] for row in report if row["settings"] == settings)
+
+
+def check_ivf(problems, embeddings, queries):
+    index = build_ivf_index(embeddings)
+    report = recall_report(embeddings, index, queries=queries,
+                           settings=[{"nprobe": DEFAULT_NPROBE}, {"nprobe": index.nlist}])
+
+    recall = recall_at(report, nprobe=DEFAULT_NPROBE)
+    check(problems, recall >= DEFAULT_MIN_RECALL,
+          f"IVF recall@10 {recall:.3f} with nprobe={DEFAULT_NPROBE} (floor {DEFAULT_MIN_RECALL})")
+    recall = recall_at(report, nprobe=index.nlist)
+    check(problems, recall == 1.0, f"IVF recall@10 {recall:.3f} when all {index.nlist} lists are scanned")
+
+    with tempfile.TemporaryDirectory() as kb_dir:
+        documents = [{"content": f"chunk {i}"} for i in range(len(embeddings))]
+        write_knowledge_base(kb_dir, embeddings, documents, "check")
+        save_ivf_index(kb_dir, index)
+        loaded_index = load_search_index(load_knowledge_base(kb_dir), "ivf", exact_threshold=0)
+        check(problems, type(loaded_index).__name__ == "IVFIndex" and
+              np.array_equal(loaded_index.search(queries, 10)[0], index.search(queries, 10)[0]),
+              "IVF index gives the same results after a save and load")
+        del loaded_index
+
+
+def check_hamming_distances(problems, rng):
+    for num_bytes in (48, 5):
+        codes = rng.integers(0, 256, (300, num_bytes), dtype=np.uint8)
+        queries = rng.integers(0, 256, (4, num_bytes), dtype=np.uint8)
+        expected = np.unpackbits(queries[:, np.newaxis, :] ^ codes[np.newaxis, :, :], axis=2).sum(axis=2)
+        distances = hamming_distances(codes, queries)
+        check(problems, distances.shape == (4, 300) and np.array_equal(distances, expected),
+              f"hamming_distances on {num_bytes}-byte codes matches unpacked bits")
+
+
+def check_quantized(problems, embeddings, queries):
+    index = build_quantized_index(embeddings)
+    report = recall_report(embeddings, index, queries=queries)
+
+    recall = recall_at(report, hamming_candidates=DEFAULT_HAMMING_CANDIDATES, rerank_factor=DEFAULT_RERANK_FACTOR)
+    check(problems, recall >= DEFAULT_MIN_RECALL,
+          f"quantized recall@10 {recall:.3f} with hamming_candidates={DEFAULT_HAMMING_CANDIDATES}, "
+          f"rerank_factor={DEFAULT_RERANK_FACTOR} (floor {DEFAULT_MIN_RECALL})")
+    mb_per_query = report[0]["mb_per_query"]
+    check(problems, mb_per_query < report[0]["exact_mb_per_query"],
+          f"quantized search reads {mb_per_query:.2f} MB/query (exact {report[0]['exact_mb_per_query']:.2f})")
+
+    with tempfile.TemporaryDirectory() as kb_dir:
+        documents = [{"content": f"chunk {i}"} for i in range(len(embeddings))]
+        write_knowledge_base(kb_dir, embeddings, documents, "check")
+        save_quantized_index(kb_dir, index)
+        choice = choose_search_index({"quantized": report})
+        save_search_choice(kb_dir, choice)
+
+        knowledge_base = load_knowledge_base(kb_dir)
+        expected_type = {"exact": "ExactIndex", "quantized": "QuantizedIndex"}[choice["type"]]
+        loaded_index = load_search_index(knowledge_base, exact_threshold=0)
+        check(problems, type(loaded_index).__name__ == expected_type,
+              f"the build chose {choice['type']} and the app opens {type(loaded_index).__name__}")
+        loaded_index = load_search_index(knowledge_base, "quantized", exact_threshold=0)
+        settings = choice["measured"]["quantized"]["settings"]
+        check(problems, loaded_index.hamming_candidates == settings["hamming_candidates"] and
+              np.array_equal(loaded_index.search(queries, 10)[0], index.search(queries, 10, **settings)[0]),
+              f"quantized index opens with the measured settings {settings} and gives the same results")
+        del knowledge_base, loaded_index
+
+
+def main():
+    problems = []
+    rng = np.random.default_rng(0)
+
+    check_top_k(problems, rng)
+
+    embeddings, queries = clustered_embeddings(rng)
+    check_ivf(problems, embeddings, queries)
+    check_hamming_distances(problems, rng)
+    check_quantized(problems, embeddings, queries)
+
+    print(f"📊 {len(problems)} problems")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+scripts/check_streaming.py - Check stream_generated_text with the offline fake Gemini model
+
+No API key or network needed. Streams a canned answer from FakeGenerativeModel
+and checks:
+  - the pieces arrive one by one and join back into the whole answer
+  - time_to_first_token covers the wait for the first piece only, and
+    total_time the whole stream
+  - empty pieces are skipped
+  - an error raised mid-stream reaches the caller after the pieces that came
+    before it, instead of being swallowed or ending the answer silently
+
+Usage:
+    python scripts/check_streaming.py
+"""
+
+import os
+import sys
+import time
+
+# gemini_streaming.py lives at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gemini_streaming import FakeChunk, FakeGenerativeModel, stream_generated_text
+
+ANSWER = "Know your systems, follow your procedures, and never let safety slide."
+FIRST_TOKEN_DELAY = 0.1  # seconds before the fake model starts answering
+DELAY = 0.01  # seconds between pieces
+SLACK = 0.005  # seconds of timer slack allowed
+
+
+def check(problems, passed, message):
+    print(f"{'✅' if passed else '❌'} {message}")
+    if not passed:
+        problems.append(message)
+
+
+class BrokenGenerativeModel:
+    """Streams a few pieces (one of them empty) and then fails, like a dropped connection"""
+
+    def generate_content(self, prompt, stream=False):
+        return self.pieces()
+
+    def pieces(self):
+        yield FakeChunk("Listen ")
+        yield FakeChunk("")
+        yield FakeChunk("carefully. ")
+        raise ConnectionError("stream interrupted")
+
+
+def main():
+    problems = []
+
+    # A whole answer, piece by piece
+    model = FakeGenerativeModel(ANSWER, delay=DELAY, first_token_delay=FIRST_TOKEN_DELAY)
+    timings = {}
+    arrivals = []
+    start_time = time.perf_counter()
+    pieces = []
+    for text in stream_generated_text(model, "What matters most?", timings):
+        arrivals.append(time.perf_counter() - start_time)
+        pieces.append(text)
+
+    check(problems, "".join(pieces) == ANSWER and len(pieces) == len(ANSWER.split(" ")),
+          f"{len(pieces)} pieces join back into the whole answer")
+    check(problems, model.prompts == ["What matters most?"], "the prompt reaches the model once")
+    check(problems, arrivals[-1] - arrivals[0] >= (len(pieces) - 1) * DELAY - SLACK,
+          f"pieces arrive as they are generated ({(arrivals[-1] - arrivals[0]) * 1000:.0f} ms "
+          f"from first to last)")
+
+    first_token = timings.get("time_to_first_token", 0)
+    total_time = timings.get("total_time", 0)
+    # The first piece must be timed when it arrives, not when the rest of the answer has come in
+    check(problems, FIRST_TOKEN_DELAY + DELAY - SLACK <= first_token <= total_time - (len(pieces) - 2) * DELAY,
+          f"time to first token {first_token * 1000:.0f} ms "
+          f"(model waits {(FIRST_TOKEN_DELAY + DELAY) * 1000:.0f} ms)")
+    check(problems, total_time >= FIRST_TOKEN_DELAY + len(pieces) * DELAY - SLACK and total_time > first_token,
+          f"total time {total_time * 1000:.0f} ms "
+          f"(model takes {(FIRST_TOKEN_DELAY + len(pieces) * DELAY) * 1000:.0f} ms)")
+
+    # An error halfway through the stream
+    timings = {}
+    pieces = []
+    try:
+        for text in stream_generated_text(BrokenGenerativeModel(), "What matters most?", timings):
+            pieces.append(text)
+        error = None
+    except ConnectionError as raised:
+        error = raised
+
+    check(problems, pieces == ["Listen ", "carefully. "], f"pieces before the error are passed on: {pieces}")
+    check(problems, error is not None, f"the mid-stream error reaches the caller: {error!r}")
+    check(problems, "time_to_first_token" in timings and "total_time" not in timings,
+          "a failed stream has a time to first token but no total time")
+
+    print(f"📊 {len(problems)} problems")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+scripts/check_wikipedia_batch.py - Check the batch Wikipedia fetcher against recorded API responses
+
+scripts/fixtures/mediawiki/responses.json holds the titles asked for and every
+MediaWiki API response a BatchWikipedia got for them (continuations included).
+This replays them without the network and checks each page (title, url,
+summary, text, categories, links, exists) against expected.json, which holds
+what wikipediaapi - the fetcher the collectors used before - gives for the same
+titles. It also checks every recorded response was asked for exactly once.
+
+--record fetches the titles live with both: the batch fetcher's responses go
+into responses.json and wikipediaapi's pages into expected.json, so the
+expected output never comes from the code it checks. Record template-heavy
+articles ({{convert}}, {{val}}, {{chem}}...) - their numbers and units have to
+come through in the text.
+
+responses.json says where it came from: "source" is "recorded" (with the API
+URL and date) when --record wrote it, "hand-written" otherwise. The committed
+fixtures are still hand-written in the API's response format (a lead with
+converted units, sections, a redirect, a normalized title, a missing page and a
+continuation), with expected.json worked out by hand from them, so they only
+show the fetcher agrees with how we think the API answers. The check says so
+every run; --require-recorded makes it fail instead, for use after re-recording
+them with --record where en.wikipedia.org is reachable.
+
+Usage:
+    python scripts/check_wikipedia_batch.py
+    python scripts/check_wikipedia_batch.py --record "Pressurized water reactor" "Uranium-235" "PWR" ...
+    python scripts/check_wikipedia_batch.py --require-recorded
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+# The collectors package lives at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from collectors.http_client import HTTPClient
+from collectors.wikipedia import create_enhanced_wikipedia_content
+from collectors.wikipedia_batch import API_URL, BatchWikipedia
+
+FIXTURES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "mediawiki")
+USER_AGENT = 'NuclearLearningBot/1.0 (Educational)'
+
+
+def params_key(params):
+    return json.dumps(params, sort_keys=True)
+
+
+class RecordedResponse:
+    def __init__(self, data):
+        self.status_code = 200
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+class RecordedSession:
+    """Answers the fetcher's API requests from recorded responses, matched on their parameters"""
+
+    def __init__(self, responses):
+        self.headers = {}
+        self.responses = {params_key(response["params"]): response["json"] for response in responses}
+        self.used = []
+
+    def get(self, url, params=None):
+        key = params_key(params)
+        if key not in self.responses:
+            raise KeyError(f"No recorded response for {params}")
+        self.used.append(key)
+        return RecordedResponse(self.responses[key])
+
+
+class RecordingSession:
+    """Sends the fetcher's requests for real and keeps every response"""
+
+    def __init__(self, session):
+        self.session = session
+        self.headers = session.headers
+        self.responses = []
+
+    def get(self, url, params=None):
+        response = self.session.get(url, params=params)
+        response.raise_for_status()
+        self.responses.append({"params": params, "json": response.json()})
+        return response
+
+
+def page_record(page):
+    if not page.exists():
+        return {"exists": False}
+    return {
+        "exists": True,
+        "title": page.title,
+        "fullurl": page.fullurl,
+        "summary": page.summary,
+        "text": page.text,
+        "categories": list(page.categories.keys()),
+        "links": list(page.links.keys()),
+    }
+
+
+def fetch_all(wiki, titles):
+    """Everything the collectors read, the batched way: info for all, then content for all"""
+    wiki.prefetch(titles)
+    wiki.prefetch_content(titles)
+    return {title: page_record(wiki.page(title)) for title in titles}
+
+
+def record(titles, folder):
+    """Fetch the titles live with the batch fetcher and with wikipediaapi, and save both"""
+    try:
+        import wikipediaapi
+    except ImportError:
+        print("❌ --record needs wikipediaapi installed (pip install wikipedia-api) for the expected output")
+        sys.exit(1)
+
+    session = RecordingSession(HTTPClient().session({"User-Agent": USER_AGENT}))
+    fetch_all(BatchWikipedia(user_agent=USER_AGENT, session=session), titles)
+    with open(os.path.join(folder, "responses.json"), "w", encoding="utf-8") as file:
+        json.dump({"source": "recorded", "api_url": API_URL,
+                   "recorded_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                   "titles": titles, "responses": session.responses}, file, ensure_ascii=False, indent=1)
+
+    wiki = wikipediaapi.Wikipedia(language='en', user_agent=USER_AGENT)
+    expected = {title: page_record(wiki.page(title)) for title in titles}
+    with open(os.path.join(folder, "expected.json"), "w", encoding="utf-8") as file:
+        json.dump(expected, file, ensure_ascii=False, indent=1)
+    print(f"💾 Recorded {len(session.responses)} responses and wikipediaapi's pages for {len(titles)} titles")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the batch Wikipedia fetcher against recorded API responses")
+    parser.add_argument("--fixtures", default=FIXTURES_FOLDER, help="folder with responses.json and expected.json")
+    parser.add_argument("--record", nargs="+", metavar="TITLE", help="record live responses for these titles first")
+    parser.add_argument("--require-recorded", action="store_true",
+                        help="fail if the fixtures were not recorded from the live API")
+    arguments = parser.parse_args()
+
+    if arguments.record:
+        record(arguments.record, arguments.fixtures)
+
+    with open(os.path.join(arguments.fixtures, "responses.json"), encoding="utf-8") as file:
+        recorded = json.load(file)
+    with open(os.path.join(arguments.fixtures, "expected.json"), encoding="utf-8") as file:
+        expected = json.load(file)
+
+    session = RecordedSession(recorded["responses"])
+    wiki = BatchWikipedia(user_agent=USER_AGENT, session=session)
+    pages = fetch_all(wiki, recorded["titles"])
+
+    problems = 0
+    if recorded.get("source") == "recorded":
+        print(f"📼 Responses recorded from {recorded.get('api_url')} on {recorded.get('recorded_at')}")
+    elif arguments.require_recorded:
+        print(f"❌ Responses are {recorded.get('source', 'hand-written')}, not recorded from the API "
+              f"(re-record them with --record)")
+        problems += 1
+    else:
+        print(f"⚠️ Responses are {recorded.get('source', 'hand-written')}, not recorded from the API: this only "
+              f"checks the fetcher against how we expect the API to answer (re-record them with --record)")
+    if sorted(session.used) != sorted(session.responses):
+        print(f"❌ {len(session.used)} requests for {len(session.responses)} recorded responses")
+        problems += 1
+    for title, page in pages.items():
+        expected_page = expected.get(title, {})
+        if page != expected_page:
+            different = [key for key in page if page[key] != expected_page.get(key)]
+            print(f"❌ {title}: {', '.join(different) or 'missing from expected.json'} differ")
+            problems += 1
+        elif page["exists"] and page["summary"] not in create_enhanced_wikipedia_content(wiki.page(title), "check"):
+            print(f"❌ {title}: summary didn't make it into the article file")
+            problems += 1
+        else:
+            print(f"✅ {title}")
+
+    print(f"📊 {len(pages)} titles in {wiki.stats()['requests']} requests, {problems} problems")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+scripts/corpus_reader.py - Read the corpus JSONL one line at a time
+
+Instead of download_as_text() + split('\\n') (the whole file as one string, then
+again as a list of lines, then again as documents), the corpus is read as a
+stream from a local file or straight from the bucket, decompressing on the fly
+if it ends in .gz or .zst, and each line is turned into a document as it comes
+in. Only the parsed documents are ever kept.
+
+.zst files need the zstandard package (pip install zstandard).
+"""
+
+import gzip
+import io
+import json
+
+PROGRESS_EVERY = 1000
+
+
+def compression_of(name):
+    """'gzip', 'zstd' or None, from the file name"""
+    if name.endswith(".gz"):
+        return "gzip"
+    if name.endswith(".zst") or name.endswith(".zstd"):
+        return "zstd"
+    return None
+
+
+def decompressed(binary_stream, compression):
+    """Wrap a binary stream so reading it gives the decompressed bytes"""
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=binary_stream, mode="rb")
+    if compression == "zstd":
+        # Only needed for .zst corpora
+        import zstandard
+
+        return zstandard.ZstdDecompressor().stream_reader(binary_stream)
+    return binary_stream
+
+
+def iter_jsonl_documents(binary_stream, compression=None, show_progress=False):
+    """Yield one document per non-empty JSONL line of a (possibly compressed) binary stream"""
+    text_stream = io.TextIOWrapper(decompressed(binary_stream, compression), encoding="utf-8")
+    count = 0
+
+    for line_number, single_line in enumerate(text_stream, 1):
+        if not single_line.strip():
+            continue
+        try:
+            document = json.loads(single_line)
+        except json.JSONDecodeError:
+            print(f"Warning: Couldn't read line {line_number}, skipping it...")
+            continue
+
+        count += 1
+        if show_progress and count % PROGRESS_EVERY == 0:
+            print(f"Processed {count} documents so far...")
+        yield document
+
+
+def read_documents_from_jsonl(file_path, compression=None):
+    """Read documents one line at a time from a local JSONL file (.jsonl, .jsonl.gz or .jsonl.zst)"""
+    with open(file_path, "rb") as corpus_file:
+        yield from iter_jsonl_documents(corpus_file, compression or compression_of(file_path))
+
+
+def read_documents_from_blob(blob, compression=None, chunk_size=8 * 1024 * 1024):
+    """Stream documents from a Cloud Storage blob without downloading it into memory first"""
+    with blob.open("rb", chunk_size=chunk_size) as blob_stream:
+        yield from iter_jsonl_documents(blob_stream, compression or compression_of(blob.name), show_progress=True)
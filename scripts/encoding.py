@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+scripts/encoding.py - Batching and encoding helpers for the embedding build
+
+A batch costs roughly (number of chunks) x (longest chunk in tokens), because
+everything is padded to the longest one. So instead of slicing the chunks in file
+order into groups of 32, we sort them by token length and pack each batch up to
+a token budget: lots of short chunks per batch, few long ones, hardly any
+padding. The vectors are written back in the original order at the end.
+
+torch and sentence_transformers are only imported inside the functions that load
+the model, so importing this file (which every spawned worker does through
+build_features.py) stays cheap.
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Batches handed to each CPU worker at a time (enough to keep it busy)
+BATCHES_IN_FLIGHT_PER_WORKER = 4
+
+
+def count_tokens(tokenizer, texts, max_length, chunk_size=1000):
+    """Token length of every text (with special tokens, capped at the model's max length)"""
+    token_lengths = []
+    for start in range(0, len(texts), chunk_size):
+        # Index one by one, so texts can be any list-like (like a ChunkTexts over the text blob)
+        chunk_texts = [texts[position] for position in range(start, min(start + chunk_size, len(texts)))]
+        encoded = tokenizer(chunk_texts, add_special_tokens=True, truncation=True, max_length=max_length)
+        token_lengths.extend(len(ids) for ids in encoded["input_ids"])
+    return token_lengths
+
+
+def make_file_order_batches(num_texts, batch_size):
+    """The old way: fixed-size batches in file order"""
+    return [list(range(start, min(start + batch_size, num_texts))) for start in range(0, num_texts, batch_size)]
+
+
+def make_token_budget_batches(token_lengths, max_tokens, max_batch_size):
+    """Sort by token length and pack batches so (chunks x longest chunk) stays under max_tokens"""
+    order = sorted(range(len(token_lengths)), key=lambda position: token_lengths[position])
+
+    batches = []
+    current_batch = []
+    for position in order:
+        # Sorted ascending, so this chunk is the longest in the batch if we add it
+        padded_cost = (len(current_batch) + 1) * max(token_lengths[position], 1)
+        if current_batch and (padded_cost > max_tokens or len(current_batch) >= max_batch_size):
+            batches.append(current_batch)
+            current_batch = []
+        current_batch.append(position)
+
+    if current_batch:
+        batches.append(current_batch)
+    return batches
+
+
+def padded_tokens(batches, token_lengths):
+    """Total tokens the model really processes (every chunk padded to its batch's longest)"""
+    return sum(len(batch) * max(token_lengths[position] for position in batch) for batch in batches)
+
+
+# Every worker process keeps its own copy of the model here
+worker_model = None
+
+
+def start_encode_worker(model_name, threads_per_worker):
+    """Runs once in each worker process: load the model and share the CPU fairly"""
+    global worker_model
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(threads_per_worker)
+    worker_model = SentenceTransformer(model_name, device='cpu')
+
+
+def encode_batch_in_worker(batch_texts):
+    """Runs in a worker process: encode one batch of texts"""
+    return worker_model.encode(batch_texts, batch_size=len(batch_texts), show_progress_bar=False)
+
+
+def encode_texts(texts, batches, model_name, device, workers=1, embedding_model=None):
+    """Encode texts batch by batch (over a process pool on CPU), results in the original order
+
+    Returns the embeddings matrix and the throughput in chunks/sec.
+    """
+    total_batches = len(batches)
+    print(f"We'll process {total_batches} batches "
+          f"(between {min(map(len, batches), default=0)} and {max(map(len, batches), default=0)} chunks each)")
+
+    embeddings = None
+    start_time = time.time()
+
+    def store_batch(batch_positions, batch_vectors, batch_number):
+        nonlocal embeddings
+        batch_vectors = np.asarray(batch_vectors, dtype=np.float32)
+        if embeddings is None:
+            embeddings = np.zeros((len(texts), batch_vectors.shape[1]), dtype=np.float32)
+        # Rows go back to where the chunk was in the input, whatever order the batches ran in
+        embeddings[batch_positions] = batch_vectors
+
+        # Show progress and estimated time remaining
+        if batch_number % 10 == 0 or batch_number == total_batches:
+            elapsed_time = time.time() - start_time
+            estimated_remaining = elapsed_time * total_batches / batch_number - elapsed_time
+            print(f"   Batch {batch_number}/{total_batches}, "
+                  f"estimated time remaining: {estimated_remaining / 60:.1f} minutes")
+
+    if device == 'cpu' and workers > 1:
+        # One model per worker process, each with its share of the CPU cores
+        threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+        print(f"Encoding with {workers} worker processes ({threads_per_worker} threads each)...")
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=start_encode_worker,
+                                 initargs=(model_name, threads_per_worker)) as pool:
+            # pool.map() hands every batch to the pool up front, texts and all, so give it a few
+            # batches per worker at a time and only those batches' texts are in memory
+            window = workers * BATCHES_IN_FLIGHT_PER_WORKER
+            for window_start in range(0, total_batches, window):
+                window_batches = batches[window_start:window_start + window]
+                batch_texts = [[texts[position] for position in batch] for batch in window_batches]
+                for batch_number, (batch, batch_vectors) in enumerate(
+                        zip(window_batches, pool.map(encode_batch_in_worker, batch_texts)), window_start + 1):
+                    store_batch(batch, batch_vectors, batch_number)
+    else:
+        if embedding_model is None:
+            from sentence_transformers import SentenceTransformer
+
+            embedding_model = SentenceTransformer(model_name, device=device)
+        for batch_number, batch in enumerate(batches, 1):
+            batch_vectors = embedding_model.encode(
+                [texts[position] for position in batch],
+                batch_size=len(batch),
+                show_progress_bar=False  # We'll show our own progress
+            )
+            store_batch(batch, batch_vectors, batch_number)
+
+    elapsed_time = time.time() - start_time
+    chunks_per_second = len(texts) / elapsed_time if elapsed_time > 0 else 0.0
+    print(f"✅ Encoded {len(texts)} chunks in {elapsed_time:.1f} seconds ({chunks_per_second:.1f} chunks/sec)")
+    return embeddings, chunks_per_second
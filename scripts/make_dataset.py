@@ -5,24 +5,31 @@ This script downloads nuclear information from Wikipedia and NRC websites
 """
 
 # Import basic things we need
-import requests
-import time
 import os
+import sys
 from datetime import datetime
 
-# For reading web pages
-from bs4 import BeautifulSoup
-import wikipediaapi
-
-
-def get_wikipedia_articles():
+# The collectors package lives at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from collectors.crawler import AsyncCrawler  # concurrent, rate-limited fetching
+from collectors.http_client import HTTPClient  # one pooled, metered HTTP layer for both collectors
+from collectors.http_cache import HTTPCache  # conditional GETs for pages we already have
+from collectors.manifest import CrawlManifest  # what we've fetched, so a crawl can resume
+from collectors.raw_store import RawStore  # raw downloads, so documents can be re-made offline
+from collectors.processing import ProcessingStage, reprocess_all  # parsing on all cores
+from collectors.wikipedia import collect_wikipedia_articles
+from collectors.wikipedia_batch import BatchWikipedia  # 50 Wikipedia pages per API request
+from collectors.nrc import collect_nrc_pages
+from collectors.chunker import iter_saved_documents, load_tokenizer, write_corpus_jsonl  # corpus JSONL
+
+
+def get_wikipedia_articles(http_client=None, raw_store=None, processing=None):
     """Download articles from Wikipedia about nuclear stuff"""
     print("📖 Getting Wikipedia articles...")
-    print("⚠️  This will take 20-30 minutes - we're getting LOTS of articles!")
+    print("⚠️  Getting LOTS of articles - a few minutes with the concurrent crawler")
 
-    # Set up Wikipedia
-    wiki = wikipediaapi.Wikipedia(
-        language='en',
+    # Set up Wikipedia (fetched in batches of 50 titles per request)
+    wiki = BatchWikipedia(
         user_agent='NuclearLearningBot/1.0 (Educational)'
     )
 
@@ -209,7 +216,6 @@ def get_wikipedia_articles():
 
     # Count total articles we're going to get
     total_articles = sum(len(topics) for topics in nuclear_categories.values())
-    current_count = 0
 
     print(f"📚 Getting {total_articles} articles across {len(nuclear_categories)} categories!")
     print("Categories:")
@@ -217,179 +223,20 @@ def get_wikipedia_articles():
         print(f"  • {category.replace('_', ' ').title()}: {len(topics)} articles")
     print()
 
-    # Process each category
-    all_collected = {}
-
-    for category_name, topics in nuclear_categories.items():
-        print(f"📂 Starting category: {category_name.replace('_', ' ').title()}")
-
-        # Create folder for this category
-        category_folder = f"data/raw/wikipedia/{category_name}"
-        if not os.path.exists(category_folder):
-            os.makedirs(category_folder)
-
-        category_collected = 0
-
-        # Get each article in this category
-        for topic in topics:
-            current_count += 1
-            print(f"📄 ({current_count}/{total_articles}) Getting: {topic}")
-
-            try:
-                # Get the Wikipedia page
-                page = wiki.page(topic)
-
-                # Check if the page exists and has enough content
-                if page.exists() and len(page.text) > 500:
-
-                    # Create a safe filename
-                    safe_name = topic.replace(" ", "_").replace("(", "").replace(")", "")
-                    safe_name = safe_name.replace("/", "_").replace(":", "_")
-                    filename = f"{safe_name.lower()}.txt"
-                    filepath = os.path.join(category_folder, filename)
-
-                    # Create enhanced content (like your original script!)
-                    content = create_enhanced_wikipedia_content(page, category_name)
-
-                    # Save the article to a file
-                    with open(filepath, 'w', encoding='utf-8') as file:
-                        file.write(content)
-
-                    all_collected[topic] = {
-                        'category': category_name,
-                        'filepath': filepath,
-                        'word_count': len(page.text.split())
-                    }
-                    category_collected += 1
-                    print(f"✅ Saved: {filename}")
-
-                    # Try to get related articles (like your original!)
-                    get_related_articles(wiki, page, category_folder, all_collected, topic)
-
-                else:
-                    print(f"⚠️ Skipped: {topic} (not found or too short)")
-
-            except Exception as error:
-                print(f"❌ Error getting {topic}: {error}")
-
-            # Wait a bit to be nice to Wikipedia's servers
-            time.sleep(2)
-
-        print(f"✅ Category {category_name} complete: {category_collected} articles")
-        print()
+    # Fetch all topics concurrently (rate limited per host, retried on temporary errors)
+    # Pages still at the revision we saved last run are not downloaded or rewritten again
+    all_collected = collect_wikipedia_articles(wiki, nuclear_categories, AsyncCrawler(), http_cache=HTTPCache(),
+                                               manifest=CrawlManifest(), http_client=http_client,
+                                               raw_store=raw_store, processing=processing)
 
     print(f"🎉 Wikipedia collection finished! Got {len(all_collected)} total articles")
     return all_collected
 
 
-def create_enhanced_wikipedia_content(page, category):
-    """Create enhanced content like your original script"""
-
-    content_sections = []
-
-    # Enhanced header (matching your original!)
-    header = f"""=== NUCLEAR TRAINING DOCUMENT ===
-Title: {page.title}
-Source URL: {page.fullurl}
-Collection Date: {datetime.now().isoformat()}
-Document Type: Nuclear Regulatory/Educational Content
-Category: {category.replace('_', ' ').title()}
-===================================
-
-"""
-
-    # Add comprehensive summary
-    content_sections.append(f"ARTICLE SUMMARY:\n{page.summary}\n")
-
-    # Add main content with better formatting
-    main_text = page.text
-
-    # Clean up common Wikipedia formatting issues (like your original!)
-    main_text = re.sub(r'\n\s*\n\s*\n', '\n\n', main_text)
-    main_text = re.sub(r'=+\s*([^=]+)\s*=+', r'\n\n=== \1 ===\n', main_text)
-
-    content_sections.append(f"FULL ARTICLE CONTENT:\n{main_text}\n")
-
-    # Add categories for context (like your original!)
-    if page.categories:
-        categories = list(page.categories.keys())[:15]
-        content_sections.append(f"RELATED CATEGORIES:\n{chr(10).join(f'- {cat}' for cat in categories)}\n")
-
-    # Add related articles for cross-referencing (like your original!)
-    if page.links:
-        nuclear_keywords = ['nuclear', 'reactor', 'power', 'steam', 'cooling', 'safety', 'radiation']
-        related_links = [link for link in list(page.links.keys())[:25]
-                         if any(term in link.lower() for term in nuclear_keywords)]
-        if related_links:
-            content_sections.append(
-                f"RELATED NUCLEAR TOPICS:\n{chr(10).join(f'- {link}' for link in related_links)}\n")
-
-    full_content = header + "\n".join(content_sections)
-    return full_content
-
-
-def get_related_articles(wiki, main_page, category_folder, all_collected, main_topic, max_related=3):
-    """Get related articles like your original script"""
-
-    if not main_page.links:
-        return
-
-    related_count = 0
-    nuclear_keywords = [
-        'reactor', 'nuclear', 'power', 'steam', 'cooling', 'safety', 'radiation',
-        'control', 'fuel', 'core', 'vessel', 'containment', 'emergency', 'neutron'
-    ]
-
-    # Create related folder
-    related_folder = os.path.join(category_folder, "related")
-    if not os.path.exists(related_folder):
-        os.makedirs(related_folder)
-
-    # Look through links for nuclear-related topics
-    for link_title in list(main_page.links.keys())[:20]:  # Check first 20 links
-        if related_count >= max_related:
-            break
-
-        if (link_title not in all_collected and
-                any(keyword in link_title.lower() for keyword in nuclear_keywords) and
-                len(link_title) < 60 and
-                link_title != main_topic):
-
-            try:
-                related_page = wiki.page(link_title)
-                if (related_page.exists() and
-                        len(related_page.text) > 800 and
-                        ('nuclear' in related_page.text.lower()[:2000] or
-                         'reactor' in related_page.text.lower()[:2000])):
-                    # Save the related article
-                    safe_name = link_title.replace(" ", "_").replace("(", "").replace(")", "")
-                    safe_name = safe_name.replace("/", "_").replace(":", "_")
-                    filename = f"related_{safe_name.lower()}.txt"
-                    filepath = os.path.join(related_folder, filename)
-
-                    content = create_enhanced_wikipedia_content(related_page, "related")
-
-                    with open(filepath, 'w', encoding='utf-8') as file:
-                        file.write(content)
-
-                    all_collected[link_title] = {
-                        'category': 'related',
-                        'filepath': filepath,
-                        'word_count': len(related_page.text.split())
-                    }
-                    related_count += 1
-                    print(f"  📎 Related article: {link_title}")
-
-                    time.sleep(1)  # Rate limiting
-
-            except Exception as error:
-                print(f"  ⚠️ Error getting related article '{link_title}': {error}")
-
-
-def get_nrc_pages():
+def get_nrc_pages(http_client=None, raw_store=None, processing=None):
     """Download pages from NRC website - COMPREHENSIVE like your original!"""
     print("🏛️ Getting NRC documents...")
-    print("⚠️  This will take 10-15 minutes - getting comprehensive regulatory docs!")
+    print("⚠️  Getting comprehensive regulatory docs!")
 
     # COMPREHENSIVE NRC sources (matching your original script!)
     nrc_sources = {
@@ -442,237 +289,40 @@ def get_nrc_pages():
 
     # Count total URLs
     total_urls = sum(len(urls) for urls in nrc_sources.values())
-    current_count = 0
 
     print(f"📄 Getting {total_urls} NRC documents across {len(nrc_sources)} categories!")
 
-    # Process each category of NRC documents
-    nrc_results = []
-
-    for category, urls in nrc_sources.items():
-        print(f"📂 Starting NRC category: {category.replace('_', ' ').title()}")
-
-        # Create folder for this category
-        nrc_folder = f"data/raw/nrc_documents/{category}"
-        if not os.path.exists(nrc_folder):
-            os.makedirs(nrc_folder)
-
-        category_success = 0
-
-        # Get each page in this category
-        for url in urls:
-            current_count += 1
-            print(f"📄 ({current_count}/{total_urls}) Getting: {url}")
-
-            try:
-                # Download the web page with better headers (like your original!)
-                headers = {
-                    'User-Agent': 'NuclearSROBot/1.0 (Educational Research)',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                    'Accept-Language': 'en-US,en;q=0.5',
-                    'Accept-Encoding': 'gzip, deflate',
-                    'Connection': 'keep-alive',
-                }
-
-                response = requests.get(url, timeout=45, headers=headers)
-
-                # Check if download worked
-                if response.status_code == 200:
-
-                    # Parse the HTML with better cleaning (like your original!)
-                    soup = BeautifulSoup(response.content, 'html.parser')
-
-                    # Get the page title
-                    title = soup.find('title')
-                    page_title = title.get_text().strip() if title else "NRC Document"
-
-                    # Remove stuff we don't want (like your original!)
-                    for unwanted in soup(['script', 'style', 'nav', 'header', 'footer',
-                                          'aside', '.navigation', '.sidebar', '.breadcrumb']):
-                        unwanted.decompose()
-
-                    # Get main content with better targeting (like your original!)
-                    main_content = (soup.find('main') or
-                                    soup.find('div', class_='content') or
-                                    soup.find('div', id='content') or
-                                    soup.find('article') or
-                                    soup.body)
-
-                    if main_content:
-                        text_content = extract_formatted_text(main_content)
-                    else:
-                        text_content = soup.get_text(separator='\n', strip=True)
-
-                    # Only save if we got enough content
-                    if len(text_content) > 500:
-
-                        # Create enhanced filename (like your original!)
-                        filename = create_nrc_filename(url, page_title, category)
-                        filepath = os.path.join(nrc_folder, filename)
-
-                        # Create enhanced content (like your original!)
-                        content = create_enhanced_nrc_content(text_content, url, page_title, category)
-
-                        # Save the document
-                        with open(filepath, 'w', encoding='utf-8') as file:
-                            file.write(content)
-
-                        nrc_results.append({
-                            'url': url,
-                            'category': category,
-                            'filepath': filepath,
-                            'status': 'success'
-                        })
-                        category_success += 1
-                        print(f"✅ Saved: {filename}")
-                    else:
-                        print(f"⚠️ Skipped: {url} (not enough content)")
-                        nrc_results.append({'url': url, 'status': 'skipped', 'reason': 'too_short'})
-
-                else:
-                    print(f"❌ Failed to download {url} (status: {response.status_code})")
-                    nrc_results.append({'url': url, 'status': 'error', 'error': f'HTTP {response.status_code}'})
-
-            except Exception as error:
-                print(f"❌ Error getting {url}: {error}")
-                nrc_results.append({'url': url, 'status': 'error', 'error': str(error)})
-
-            # Wait between downloads (like your original rate limiting!)
-            time.sleep(3)
-
-        print(f"✅ NRC category {category} complete: {category_success} documents")
-        print()
+    # Fetch all pages concurrently over the shared connection pool
+    # Pages we already have are requested conditionally (ETag / Last-Modified)
+    nrc_results = collect_nrc_pages(nrc_sources, AsyncCrawler(), http_cache=HTTPCache(),
+                                    manifest=CrawlManifest(), http_client=http_client,
+                                    raw_store=raw_store, processing=processing)
 
     successful_nrc = sum(1 for r in nrc_results if r.get('status') == 'success')
     print(f"🎉 NRC collection finished! Got {successful_nrc} documents")
     return nrc_results
 
 
-def extract_formatted_text(element):
-    """Extract well-formatted text from HTML (like your original!)"""
-
-    # Replace headers with formatted versions
-    for header in element.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
-        header_text = header.get_text().strip()
-        if header_text:
-            header.replace_with(f"\n\n=== {header_text.upper()} ===\n")
-
-    # Replace lists with formatted versions
-    for ul in element.find_all('ul'):
-        for li in ul.find_all('li'):
-            li_text = li.get_text().strip()
-            if li_text:
-                li.replace_with(f"\n• {li_text}")
-
-    for ol in element.find_all('ol'):
-        for i, li in enumerate(ol.find_all('li'), 1):
-            li_text = li.get_text().strip()
-            if li_text:
-                li.replace_with(f"\n{i}. {li_text}")
-
-    # Get text and clean up
-    text = element.get_text(separator='\n', strip=True)
-    text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)  # Clean excessive newlines
-
-    return text
-
-
-def create_nrc_filename(url, title, category):
-    """Create good filename from URL and title (like your original!)"""
-
-    # Use title if it's good
-    if title and title != "NRC Document" and len(title) < 100:
-        safe_title = re.sub(r'[^\w\s-]', '', title).strip()
-        safe_title = re.sub(r'[-\s]+', '_', safe_title)
-        filename = f"{safe_title.lower()}.txt"
-    else:
-        # Fall back to URL-based naming
-        from urllib.parse import urlparse
-        parsed_url = urlparse(url)
-        path_parts = [p for p in parsed_url.path.split('/') if p]
-        if path_parts:
-            filename = '_'.join(path_parts[-2:]) + '.txt'
-        else:
-            filename = parsed_url.netloc.replace('.', '_') + '.txt'
-
-    # Clean filename
-    filename = re.sub(r'[^\w.-]', '_', filename)
-    return filename
-
-
-def create_enhanced_nrc_content(content, url, title, category):
-    """Create enhanced NRC content (like your original!)"""
-
-    # Enhanced header (matching your original!)
-    header = f"""=== NUCLEAR TRAINING DOCUMENT ===
-Title: {title}
-Source URL: {url}
-Collection Date: {datetime.now().isoformat()}
-Document Type: Nuclear Regulatory/Educational Content
-Document Category: {category.replace('_', ' ').title()}
-Regulatory Authority: U.S. Nuclear Regulatory Commission
-===================================
-
-=== DOCUMENT CONTENT ===
-{content}
-"""
-
-    return header
-
-
 def create_summary():
     """Create comprehensive summary (like your original!)"""
     print("📊 Creating collection summary...")
 
-    # Count files we collected by category
+    # Count what we collected from the crawl manifest instead of walking data/raw
+    # (topics taken off the lists are marked stale there and don't count)
     wiki_count = 0
     nrc_count = 0
     total_size = 0
     categories_found = {}
 
-    # Count Wikipedia files by category
-    wiki_base = "data/raw/wikipedia"
-    if os.path.exists(wiki_base):
-        for category_folder in os.listdir(wiki_base):
-            category_path = os.path.join(wiki_base, category_folder)
-            if os.path.isdir(category_path):
-                category_count = 0
-                for filename in os.listdir(category_path):
-                    if filename.endswith('.txt'):
-                        wiki_count += 1
-                        category_count += 1
-                        filepath = os.path.join(category_path, filename)
-                        total_size += os.path.getsize(filepath)
-
-                # Also check related subfolder
-                related_path = os.path.join(category_path, "related")
-                if os.path.exists(related_path):
-                    for filename in os.listdir(related_path):
-                        if filename.endswith('.txt'):
-                            wiki_count += 1
-                            category_count += 1
-                            filepath = os.path.join(related_path, filename)
-                            total_size += os.path.getsize(filepath)
-
-                if category_count > 0:
-                    categories_found[f"Wikipedia - {category_folder}"] = category_count
-
-    # Count NRC files by category
-    nrc_base = "data/raw/nrc_documents"
-    if os.path.exists(nrc_base):
-        for category_folder in os.listdir(nrc_base):
-            category_path = os.path.join(nrc_base, category_folder)
-            if os.path.isdir(category_path):
-                category_count = 0
-                for filename in os.listdir(category_path):
-                    if filename.endswith('.txt'):
-                        nrc_count += 1
-                        category_count += 1
-                        filepath = os.path.join(category_path, filename)
-                        total_size += os.path.getsize(filepath)
-
-                if category_count > 0:
-                    categories_found[f"NRC - {category_folder}"] = category_count
+    for document in CrawlManifest().documents():
+        if document['source'] == 'wikipedia':
+            wiki_count += 1
+            label = f"Wikipedia - {document['category']}"
+        else:
+            nrc_count += 1
+            label = f"NRC - {document['category']}"
+        total_size += document['size_bytes'] or 0
+        categories_found[label] = categories_found.get(label, 0) + 1
 
     # Convert size to MB
     total_size_mb = total_size / (1024 * 1024)
@@ -739,27 +389,71 @@ Ready for RAG chatbot implementation!
     print(f"📊 Collected {wiki_count + nrc_count} documents ({total_size_mb:.1f} MB)")
 
 
+def create_corpus(output_path="data/processed/nuclear_corpus.jsonl"):
+    """Chunk every saved document straight into the corpus JSONL that build_features.py reads"""
+    print("✂️ Chunking documents into the corpus...")
+
+    # One document in memory at a time; chunks go to the file as they're made, each small
+    # enough for the embedding model's tokenizer to read all of it
+    counts = write_corpus_jsonl(iter_saved_documents(CrawlManifest()), output_path, tokenizer=load_tokenizer())
+
+    print(f"✅ Corpus saved: {output_path} ({counts['chunks']} chunks from {counts['documents']} documents)")
+    return output_path
+
+
 def collect_all_data():
     """Main function to collect all the data we need"""
     print("🚀 Starting data collection...")
 
     try:
-        # Get Wikipedia articles
-        get_wikipedia_articles()
+        # One connection pool for Wikipedia and NRC
+        http_client = HTTPClient()
+
+        # The crawl only fetches; parsing happens in worker processes on the other cores
+        raw_store = RawStore()
+        # The with block stops the worker processes even if a collector fails
+        with ProcessingStage() as processing:
+            # Get Wikipedia articles
+            get_wikipedia_articles(http_client, raw_store, processing)
 
-        # Get NRC documents
-        get_nrc_pages()
+            # Get NRC documents
+            get_nrc_pages(http_client, raw_store, processing)
 
         # Create summary
         create_summary()
 
+        # Chunk everything into the corpus JSONL
+        create_corpus()
+
         print("🎉 Data collection complete!")
-        print("Next step: python setup.py build")
+        print("Next step: python scripts/build_features.py --corpus data/processed/nuclear_corpus.jsonl")
 
     except Exception as error:
         print(f"❌ Data collection failed: {error}")
 
 
-# If someone runs this file directly
+def reprocess_all_data():
+    """Re-make every document from the raw downloads on all cores, without touching the network"""
+    print("⚙️ Re-processing collected data...")
+
+    try:
+        reprocess_all(CrawlManifest(), RawStore())
+
+        # Create summary
+        create_summary()
+
+        # Chunk everything into the corpus JSONL
+        create_corpus()
+
+        print("🎉 Re-processing complete!")
+
+    except Exception as error:
+        print(f"❌ Re-processing failed: {error}")
+
+
+# If someone runs this file directly (add --reprocess to rebuild from the raw store instead of crawling)
 if __name__ == "__main__":
-    collect_all_data()
\ No newline at end of file
+    if "--reprocess" in sys.argv:
+        reprocess_all_data()
+    else:
+        collect_all_data()
\ No newline at end of file